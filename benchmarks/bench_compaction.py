@@ -0,0 +1,113 @@
+"""Сжатие старых записей воды и калорий: освобождённое место и задержка записей во время прохода
+
+Заполняет базу --users пользователями по --days дней с --entries записями
+воды и калорий в день и выполняет проход compaction.Compactor с окном
+--keep-days дней. Пока идёт проход, отдельная задача записывает воду
+пользователю каждые 5 мс (как нажатия в боте) - печатается p50/p99 её записи:
+с --batch 2000 запись ждёт одну короткую пачку, с очень большим --batch -
+весь проход. В конце проверяется, что суммы по дням не изменились.
+
+Запуск: python -m benchmarks.bench_compaction --users 200 --days 365 --entries 8 --batch 2000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import config
+from utils import water
+from utils.compaction import Compactor
+from utils.database import init_db, create_user
+from utils.storage import storage
+
+DAY_TOTALS = '''
+    SELECT COUNT(*), SUM(total) FROM (
+        SELECT user_id, date, SUM(amount) AS total FROM water GROUP BY user_id, date
+        UNION ALL
+        SELECT user_id, date, SUM(calories) FROM calories GROUP BY user_id, date
+    )
+'''
+
+
+async def fill(users, days, entries):
+    today = datetime.now()
+    for user_id in range(1, users + 1):
+        await create_user(user_id, f'user{user_id}', 'Bench', 'User')
+        water_rows, calorie_rows = [], []
+        for offset in range(days):
+            day = today - timedelta(days=offset)
+            date = day.strftime('%Y-%m-%d')
+            water_rows += [(user_id, date, 250, day.timestamp() + hour * 3600) for hour in range(entries)]
+            calorie_rows += [(user_id, date, random.randint(50, 900)) for _ in range(entries)]
+        await storage.executemany('INSERT INTO water (user_id, date, amount, created_at) VALUES (?, ?, ?, ?)',
+                                  water_rows)
+        await storage.executemany('INSERT INTO calories (user_id, date, calories) VALUES (?, ?, ?)', calorie_rows)
+
+
+async def taps(stop: asyncio.Event, latencies: list):
+    """Запись воды пользователем во время прохода"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await water.add_water(1, 200)
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.005)
+
+
+def mb(size):
+    return size / 1024 / 1024
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--entries', type=int, default=8, help='записей воды и калорий в день')
+    parser.add_argument('--keep-days', type=int, default=30)
+    parser.add_argument('--batch', type=int, default=config.COMPACTION_BATCH, help='исходных строк в одной транзакции')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        await storage.start(path)
+        await init_db()
+        await fill(args.users, args.days, args.entries)
+        days_before, sum_before = await storage.fetchone(DAY_TOTALS)
+        rows_before = (await storage.fetchone('SELECT COUNT(*) FROM water'))[0] + \
+            (await storage.fetchone('SELECT COUNT(*) FROM calories'))[0]
+
+        stop = asyncio.Event()
+        latencies = []
+        writer = asyncio.create_task(taps(stop, latencies))
+        report = await Compactor(keep_days=args.keep_days, batch=args.batch).run()
+        stop.set()
+        await writer
+
+        days_after, sum_after = await storage.fetchone(DAY_TOTALS)
+        rows_after = (await storage.fetchone('SELECT COUNT(*) FROM water'))[0] + \
+            (await storage.fetchone('SELECT COUNT(*) FROM calories'))[0]
+        await storage.close()
+        file_size = os.path.getsize(path)
+
+    removed = sum(report['rows'].values())
+    print(f"строк воды и калорий: {rows_before} -> {rows_after} (удалено {removed}, сжато дней {report['days']})")
+    print(f"база: {mb(report['size_before']):.1f} -> {mb(report['size_after']):.1f} МБ, "
+          f"возвращено {report['pages']} страниц ({mb(report['bytes']):.1f} МБ), файл после закрытия {mb(file_size):.1f} МБ")
+    print(f"проход: {report['seconds']:.2f} с, пачка {args.batch} строк")
+    if latencies:
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"запись воды во время прохода: {len(latencies)} записей, "
+              f"p50 {statistics.median(latencies):.1f} мс, p99 {p99:.1f} мс, максимум {latencies[-1]:.1f} мс")
+    # Записи воды во время прохода - за сегодня, их добавляем к сумме до прохода
+    taps_total = 200 * len(latencies)
+    same = days_before == days_after and sum_before + taps_total == sum_after
+    print(f"суммы по дням {'не изменились' if same else 'ИЗМЕНИЛИСЬ'}: "
+          f"{days_before} дней, {sum_before + taps_total} / {sum_after}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
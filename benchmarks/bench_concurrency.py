@@ -0,0 +1,126 @@
+"""Задержка апдейтов при смешанной нагрузке: по одному, задачами без порядка, очередями пользователей
+
+Апдейты приходят потоком с заданной частотой (--rate в секунду) от --users
+пользователей: открытие трекеров, сводка, история и пары "кнопка + число"
+для калорий и воды. Каждый вызов Bot API отвечает через --latency секунд.
+Задержка - от прихода апдейта до конца его обработки.
+
+"по одному": следующий апдейт обрабатывается после предыдущего.
+"задачи без порядка": каждый апдейт - отдельная задача, как handle_as_tasks
+в aiogram без user_queue; число может обработаться раньше кнопки, и ввод теряется.
+"очереди пользователей": задачи через user_queue (параллельно по пользователям,
+по порядку внутри пользователя, не больше UPDATE_CONCURRENCY одновременно).
+"потеряно вводов" - записи калорий и воды, которых нет в базе после прогона.
+
+Очередь отправки отключена, чтобы замерять обработку, а не лимиты Telegram.
+
+Запуск: python -m benchmarks.bench_concurrency --users 200 --updates 2000 --rate 500
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from benchmarks.fakes import load_bot, message_update
+from utils.send_queue import send_queue
+from utils.storage import storage
+from utils.user_queue import user_queue
+
+TAPS = ('🍽 Калории', '💧 Вода', '📈 Сегодня', '📊 История', '🏃‍♂️ Активность')
+INPUTS = (('➖ Вычесть калории', 'calories'), ('➖ Выпил воды', 'water'))
+
+
+def make_stream(users, updates):
+    """Поток (user_id, текст) с сохранением порядка действий каждого пользователя и ожидаемые вводы"""
+    scripts = {user_id: [] for user_id in range(1, users + 1)}
+    expected = 0
+    total = 0
+    while total < updates:
+        user_id = random.randint(1, users)
+        if random.random() < 0.5:
+            scripts[user_id].append(random.choice(TAPS))
+            total += 1
+        else:
+            button, _ = random.choice(INPUTS)
+            scripts[user_id] += [button, str(random.randint(1, 500))]
+            expected += 1
+            total += 2
+    # Действия разных пользователей перемешиваются, порядок внутри пользователя сохраняется
+    pending = [(user_id, script) for user_id, script in scripts.items() if script]
+    positions = {user_id: 0 for user_id, _ in pending}
+    stream = []
+    while pending:
+        index = random.randrange(len(pending))
+        user_id, script = pending[index]
+        stream.append((user_id, script[positions[user_id]]))
+        positions[user_id] += 1
+        if positions[user_id] == len(script):
+            pending[index] = pending[-1]
+            pending.pop()
+    return stream, expected
+
+
+async def run(bot_module, stream, rate, mode):
+    latencies = []
+    tasks = []
+
+    async def process(update, arrived):
+        await bot_module.dp.feed_update(bot_module.bot, update)
+        latencies.append(time.perf_counter() - arrived)
+
+    started = time.perf_counter()
+    for i, (user_id, text) in enumerate(stream):
+        arrival = started + i / rate
+        delay = arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        update = message_update(user_id, text, bot=bot_module.bot)
+        if mode == 'sequential':
+            await process(update, arrival)
+        else:
+            tasks.append(asyncio.create_task(process(update, arrival)))
+    await asyncio.gather(*tasks)
+    return latencies, time.perf_counter() - started
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--updates', type=int, default=2000)
+    parser.add_argument('--rate', type=float, default=500, help='апдейтов в секунду')
+    parser.add_argument('--latency', type=float, default=0.02, help='задержка ответа Bot API, секунды')
+    args = parser.parse_args()
+
+    bot_module, _ = load_bot(args.latency)
+    stream, expected = make_stream(args.users, args.updates)
+    print(f"апдейтов: {len(stream)}, вводов калорий и воды: {expected}")
+    print(f"{'режим':24} {'p50':>9} {'p99':>9} {'max':>9} {'время':>8} {'потеряно вводов':>16}")
+    for name, mode in (('по одному', 'sequential'), ('задачи без порядка', 'unordered'),
+                       ('очереди пользователей', 'ordered')):
+        with tempfile.TemporaryDirectory() as tmp:
+            await storage.start(os.path.join(tmp, 'bench.db'))
+            await bot_module.dp.emit_startup(bot=bot_module.bot)
+            await send_queue.stop()
+            if mode != 'ordered':
+                await user_queue.stop()
+            for user_id in range(1, args.users + 1):
+                await bot_module.dp.feed_update(bot_module.bot, message_update(user_id, '/start', bot=bot_module.bot))
+
+            latencies, elapsed = await run(bot_module, stream, args.rate, mode)
+            row = await storage.fetchone('SELECT (SELECT COUNT(*) FROM calories) + (SELECT COUNT(*) FROM water)')
+            await bot_module.dp.emit_shutdown(bot=bot_module.bot)
+        print(f"{name:24} {percentile(latencies, 0.5) * 1000:6.0f} ms {percentile(latencies, 0.99) * 1000:6.0f} ms "
+              f"{max(latencies) * 1000:6.0f} ms {elapsed:6.1f} s {expected - row[0]:16}")
+    print(f"user_queue: {user_queue.stats()}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+"""Сводка "📈 Сегодня": четыре функции трекеров подряд против одного запроса
+
+"четыре функции": calories/water/activity/weight.get_today по очереди;
+для калорий и воды - с пустым и с прогретым кэшем итогов за сегодня.
+"один запрос": dashboard.get_today.
+
+Запуск: python -m benchmarks.bench_dashboard --users 1000 --rounds 5
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from utils import activity, calories, dashboard, water, weight
+from utils.database import init_db, create_user
+from utils.storage import storage
+from utils.totals import totals
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+async def four_calls(user_id):
+    await calories.get_today(user_id)
+    await water.get_today(user_id)
+    await activity.get_today(user_id)
+    await weight.get_today(user_id)
+
+
+async def four_calls_cold(user_id):
+    totals.invalidate(user_id)
+    await four_calls(user_id)
+
+
+async def measure(name, fn, users, rounds):
+    latencies = []
+    for _ in range(rounds):
+        for user_id in range(users):
+            started = time.perf_counter()
+            await fn(user_id)
+            latencies.append((time.perf_counter() - started) * 1e6)
+    print(f"{name:36} p50 {statistics.median(latencies):8.0f} us  p99 {percentile(latencies, 0.99):8.0f} us")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        await storage.start(os.path.join(tmp, 'bench.db'))
+        await init_db()
+        for user_id in range(args.users):
+            await create_user(user_id, f'user{user_id}', 'Bench', 'User')
+            await calories.add_calories(user_id, random.randint(100, 800))
+            await water.add_water(user_id, 250)
+            await activity.add_steps(user_id, random.randint(1000, 9000))
+            await weight.add_weight(user_id, 70.5)
+
+        await measure('четыре функции, кэш итогов пуст', four_calls_cold, args.users, args.rounds)
+        await measure('четыре функции, кэш итогов прогрет', four_calls, args.users, args.rounds)
+        await measure('один запрос (dashboard.get_today)', dashboard.get_today, args.users, args.rounds)
+        await storage.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
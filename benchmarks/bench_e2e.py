@@ -0,0 +1,160 @@
+"""Сквозной прогон бота против поддельного Bot API: polling, webhook и рассылка напоминаний
+
+Запускает benchmarks/fake_telegram.py на локальном порту и настоящий бот из
+bot.py, направленный на него через TELEGRAM_API_URL. Поддельный сервер
+проигрывает сценарий пользователей (/start, трекеры, кнопка ввода с числом,
+FAQ) с частотой --rate; каждый апдейт должен получить один ответ. Затем всем
+пользователям одновременно наступает мотивационное напоминание.
+
+По каждому режиму: время до последнего ответа, ответов в секунду, задержка
+от апдейта до ответа (p50/p99), ответы 429 от сервера и повторы очереди
+отправки, время рассылки напоминаний. Сервер отвечает 429 сверх
+--rate-limit сообщений в секунду, как Telegram; очередь отправки отправляет
+не больше --send-rate.
+
+Запуск: python -m benchmarks.bench_e2e --users 50 --actions 4 --latency 0.02
+"""
+import argparse
+import asyncio
+import os
+import random
+import secrets
+import socket
+import tempfile
+import time
+
+from aiohttp import web
+
+from benchmarks.fake_telegram import FakeTelegram, serve
+
+TAPS = ('🍽 Калории', '💧 Вода', '🏃‍♂️ Активность', '📈 Сегодня')
+INPUTS = (('➖ Вычесть калории', '300'), ('➖ Выпил воды', '250'), ('➕ Добавить шаги', '1500'))
+
+
+def make_script(users, actions):
+    """Сценарий [(user_id, вид, текст)]: действия пользователей перемешаны, порядок каждого сохранён"""
+    scripts = []
+    for user_id in range(1, users + 1):
+        script = [(user_id, 'message', '/start')]
+        for _ in range(actions):
+            roll = random.random()
+            if roll < 0.5:
+                script.append((user_id, 'message', random.choice(TAPS)))
+            elif roll < 0.85:
+                button, value = random.choice(INPUTS)
+                script += [(user_id, 'message', button), (user_id, 'message', value)]
+            else:
+                script += [(user_id, 'message', '❓ Частые вопросы'), (user_id, 'callback', 'faq_1')]
+        scripts.append(script)
+    stream = []
+    while scripts:
+        script = random.choice(scripts)
+        stream.append(script.pop(0))
+        if not script:
+            scripts.remove(script)
+    return stream
+
+
+async def wait_messages(fake, count, timeout):
+    """Ожидание count отправленных сообщений; возвращает время ожидания или None по таймауту"""
+    started = time.perf_counter()
+    while fake.messages < count:
+        if time.perf_counter() - started > timeout:
+            return None
+        await asyncio.sleep(0.01)
+    return time.perf_counter() - started
+
+
+async def run_mode(mode, bot_module, fake, script, users, args):
+    from utils.send_queue import send_queue
+    from utils.storage import storage
+    from utils.webhook import create_app
+
+    fake.reply_latencies.clear()
+    floods_before, retries_before = fake.floods, send_queue.retries
+    sent_before = fake.messages
+    tmp = tempfile.TemporaryDirectory()
+    await storage.start(os.path.join(tmp.name, 'e2e.db'))
+
+    if mode == 'polling':
+        polling = asyncio.create_task(bot_module.dp.start_polling(
+            bot_module.bot, handle_signals=False, polling_timeout=1
+        ))
+        runner = None
+    else:
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        url = f'http://127.0.0.1:{sock.getsockname()[1]}'
+        app = create_app(bot_module.dp, bot_module.bot, '/webhook', secrets.token_urlsafe(16), url=url)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.SockSite(runner, sock).start()
+        polling = None
+
+    started = time.perf_counter()
+    await fake.play(script, args.rate)
+    await wait_messages(fake, sent_before + len(script), args.timeout)
+    total = time.perf_counter() - started
+    replies = fake.messages - sent_before
+    latencies = sorted(fake.reply_latencies)
+
+    # Всем пользователям одновременно наступает мотивационное напоминание
+    now = time.time()
+    for user_id in range(1, users + 1):
+        bot_module.reminders.schedule(user_id, 'motivation', 14400, next_at=now)
+    fanout_before = fake.messages
+    fanout = await wait_messages(fake, fanout_before + users, args.timeout)
+
+    if polling:
+        await bot_module.dp.stop_polling()
+        await polling
+    else:
+        await runner.cleanup()
+    tmp.cleanup()
+
+    def at(q):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000 if latencies else 0.0
+    print(f"{mode:8} {replies:5}/{len(script):<5} {total:7.2f} s {replies / total:7.1f}/s "
+          f"{at(0.5):8.0f} ms {at(0.99):8.0f} ms {fake.floods - floods_before:5} "
+          f"{send_queue.retries - retries_before:7} "
+          + (f"{users} за {fanout:.2f} с" if fanout is not None else f"таймаут ({fake.messages - fanout_before}/{users})"))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=('polling', 'webhook', 'both'), default='both')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--actions', type=int, default=4, help='действий на пользователя после /start')
+    parser.add_argument('--rate', type=float, default=100, help='апдейтов в секунду от пользователей')
+    parser.add_argument('--latency', type=float, default=0.02, help='задержка ответа поддельного Bot API, секунды')
+    parser.add_argument('--rate-limit', type=float, default=30, help='сообщений в секунду до ответа 429')
+    parser.add_argument('--send-rate', type=float, default=None, help='SEND_GLOBAL_RATE бота (по умолчанию из config)')
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    fake = FakeTelegram(args.latency, args.rate_limit)
+    runner, url = await serve(fake)
+    # bot.py читает адрес Bot API и токен при импорте
+    os.environ['TELEGRAM_API_URL'] = url
+    os.environ['BOT_TOKEN'] = '123456:E2E'
+    import logging
+    import bot as bot_module
+    from utils.send_queue import send_queue
+    logging.getLogger().setLevel(logging.WARNING)
+    if args.send_rate:
+        send_queue.global_rate = args.send_rate
+
+    modes = ('polling', 'webhook') if args.mode == 'both' else (args.mode,)
+    print(f"Поддельный Bot API: {url}, лимит {args.rate_limit}/с, задержка {args.latency * 1000:.0f} мс")
+    print(f"{'режим':8} {'ответов':>11} {'время':>9} {'скорость':>9} {'p50':>11} {'p99':>11} {'429':>5} "
+          f"{'повторы':>7} напоминания")
+    for mode in modes:
+        # Новые пользователи в каждом режиме: база каждого режима своя
+        await run_mode(mode, bot_module, fake, make_script(args.users, args.actions), args.users, args)
+    await runner.cleanup()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
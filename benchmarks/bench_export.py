@@ -0,0 +1,111 @@
+"""Выгрузка всей истории пользователя: fetchall против курсора пачками
+
+"fetchall": все строки каждой таблицы читаются в список, CSV собирается
+в памяти и записывается в архив целиком.
+"курсор": export.export_user - пачки по EXPORT_CHUNK_SIZE строк сразу
+сжимаются в архив на диске.
+
+Для истории разной длины (--years) печатаются строки, время и пик памяти
+Python (tracemalloc): у fetchall он растёт с длиной истории, у курсора - нет.
+
+Запуск: python -m benchmarks.bench_export --years 1 3 10 --entries 8
+"""
+import argparse
+import asyncio
+import csv
+import io
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from datetime import datetime, timedelta
+
+from utils import export
+from utils.database import init_db, create_user
+from utils.storage import storage
+
+TABLES = {
+    'calories': 'SELECT date, calories FROM calories WHERE user_id = ? ORDER BY date',
+    'water': 'SELECT date, amount, created_at FROM water WHERE user_id = ? ORDER BY date',
+    'activity': 'SELECT date, steps, workout FROM activity WHERE user_id = ? ORDER BY date',
+    'weight': 'SELECT date, weight FROM weight WHERE user_id = ? ORDER BY date',
+    'notes': 'SELECT date, type, content FROM notes WHERE user_id = ? ORDER BY date',
+}
+
+
+async def fill(user_id, days, entries):
+    await create_user(user_id, f'user{user_id}', 'Bench', 'User')
+    today = datetime.now()
+    calories, water, activity, weight, notes = [], [], [], [], []
+    for offset in range(days):
+        day = today - timedelta(days=offset)
+        date = day.strftime('%Y-%m-%d')
+        calories += [(user_id, date, random.randint(100, 700)) for _ in range(entries)]
+        water += [(user_id, date, 250, day.timestamp() + hour * 3600) for hour in range(entries)]
+        activity.append((user_id, date, random.randint(1000, 12000), offset % 3 == 0))
+        weight.append((user_id, date, round(random.uniform(70, 80), 1)))
+        notes.append((user_id, date, 'thought', f'Запись за {date}: сегодня всё по плану'))
+    await storage.executemany('INSERT INTO calories (user_id, date, calories) VALUES (?, ?, ?)', calories)
+    await storage.executemany('INSERT INTO water (user_id, date, amount, created_at) VALUES (?, ?, ?, ?)', water)
+    await storage.executemany('INSERT INTO activity (user_id, date, steps, workout) VALUES (?, ?, ?, ?)', activity)
+    await storage.executemany('INSERT INTO weight (user_id, date, weight) VALUES (?, ?, ?)', weight)
+    await storage.executemany('INSERT INTO notes (user_id, date, type, content) VALUES (?, ?, ?, ?)', notes)
+
+
+async def export_fetchall(user_id, directory):
+    """Прежний подход: все строки в памяти, затем архив"""
+    path = os.path.join(directory, f'fetchall_{user_id}.zip')
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for table, sql in TABLES.items():
+            async with storage.read() as db:
+                async with db.execute(sql, (user_id,)) as cursor:
+                    rows = await cursor.fetchall()
+                    columns = [column[0] for column in cursor.description]
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            writer.writerows(rows)
+            archive.writestr(f'{table}.csv', buffer.getvalue())
+    os.remove(path)
+
+
+async def export_cursor(user_id, directory):
+    result = await export.export_user(user_id, 'csv', directory)
+    os.remove(result['path'])
+    return result
+
+
+async def measure(fn, *args):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = await fn(*args)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1024 / 1024
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--years', type=int, nargs='+', default=[1, 3, 10])
+    parser.add_argument('--entries', type=int, default=8, help='записей калорий и воды в день')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        await storage.start(os.path.join(tmp, 'bench.db'))
+        await init_db()
+        print(f"{'история':10} {'строк':>8} {'архив':>9} {'fetchall':>20} {'курсор':>20}")
+        for user_id, years in enumerate(args.years, start=1):
+            await fill(user_id, years * 365, args.entries)
+            _, before, before_peak = await measure(export_fetchall, user_id, tmp)
+            result, after, after_peak = await measure(export_cursor, user_id, tmp)
+            rows = sum(result['rows'].values())
+            print(f"{years:4} г.    {rows:8} {result['bytes'] / 1024:6.0f} КБ "
+                  f"{before:7.2f} с {before_peak:7.1f} МБ {after:7.2f} с {after_peak:7.1f} МБ")
+        await storage.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
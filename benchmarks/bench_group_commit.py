@@ -0,0 +1,71 @@
+"""Пропускная способность записи при 1k одновременных пользователей
+
+Сравнивает журнал отката с фиксацией каждой записи, WAL с фиксацией каждой
+записи и WAL с групповой фиксацией.
+
+Запуск: python -m benchmarks.bench_group_commit --users 1000 --taps 5
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from utils.storage import Storage
+
+PROFILES = {
+    'delete+full, commit per write': dict(journal_mode='DELETE', synchronous='FULL', group_window=0, group_max=1),
+    'wal+normal, commit per write': dict(journal_mode='WAL', synchronous='NORMAL', group_window=0, group_max=1),
+    'wal+normal, group commit': dict(journal_mode='WAL', synchronous='NORMAL'),
+}
+
+
+async def create_schema(db):
+    await db.execute('CREATE TABLE water (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, date DATE, amount INTEGER)')
+    await db.execute('CREATE TABLE statistics (user_id INTEGER, date DATE, water_consumed INTEGER DEFAULT 0, PRIMARY KEY (user_id, date))')
+
+
+def add_water(user_id, today, amount):
+    """Запись как в трекере: сырая строка плюс дневной итог"""
+    async def run(db):
+        await db.execute('INSERT INTO water (user_id, date, amount) VALUES (?, ?, ?)', (user_id, today, amount))
+        await db.execute('''
+            INSERT INTO statistics (user_id, date, water_consumed) VALUES (?, ?, ?)
+            ON CONFLICT (user_id, date) DO UPDATE SET water_consumed = water_consumed + excluded.water_consumed
+        ''', (user_id, today, amount))
+    return run
+
+
+async def bench(name, profile, users, taps):
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = Storage(path=os.path.join(tmp, 'bench.db'), **profile)
+        await storage.start()
+        await storage.write(create_schema)
+        today = time.strftime('%Y-%m-%d')
+
+        async def user(user_id):
+            for _ in range(taps):
+                await storage.write(add_water(user_id, today, 250))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user(user_id) for user_id in range(users)))
+        elapsed = time.perf_counter() - started
+        commits, writes = storage.commits, storage.writes
+        await storage.close()
+
+    print(f"{name:32} {writes / elapsed:10.1f} writes/sec {commits / elapsed:10.1f} commits/sec "
+          f"{writes / commits:8.1f} writes/commit")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--taps', type=int, default=5)
+    args = parser.parse_args()
+
+    for name, profile in PROFILES.items():
+        await bench(name, profile, args.users, args.taps)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
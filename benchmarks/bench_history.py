@@ -0,0 +1,108 @@
+"""История за неделю, месяц и год: группировка исходных записей против готовых итогов
+
+"исходные записи": прежний запрос calories.get_history (LEFT JOIN из users и
+GROUP BY по датам) плюс такие же проходы по воде, активности и весу.
+"итоги": history.get_series по statistics (дни) и statistics_periods (недели, месяцы).
+
+Запуск: python -m benchmarks.bench_history --users 200 --entries 6
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from utils import history, rollups
+from utils.database import init_db, create_user
+from utils.storage import storage
+
+
+async def raw_history(user_id, days):
+    """Прежний способ: отдельный проход по исходным записям каждого трекера"""
+    await storage.fetchall('''
+        SELECT date, daily_calories_limit, COALESCE(SUM(calories), 0)
+        FROM users
+        LEFT JOIN calories ON users.user_id = calories.user_id
+            AND calories.date >= date('now', ? || ' days')
+        WHERE users.user_id = ?
+        GROUP BY date, daily_calories_limit
+        ORDER BY date DESC
+    ''', (f'-{days}', user_id))
+    await storage.fetchall('''
+        SELECT date, daily_water_limit, COALESCE(SUM(amount), 0)
+        FROM users
+        LEFT JOIN water ON users.user_id = water.user_id
+            AND water.date >= date('now', ? || ' days')
+        WHERE users.user_id = ?
+        GROUP BY date, daily_water_limit
+        ORDER BY date DESC
+    ''', (f'-{days}', user_id))
+    await storage.fetchall('''
+        SELECT date, steps, workout FROM activity
+        WHERE user_id = ? AND date >= date('now', ? || ' days')
+        ORDER BY date DESC
+    ''', (user_id, f'-{days}'))
+    await storage.fetchall('''
+        SELECT date, weight FROM weight
+        WHERE user_id = ? AND date >= date('now', ? || ' days')
+        ORDER BY date DESC
+    ''', (user_id, f'-{days}'))
+
+
+async def fill(users, entries, days):
+    today = datetime.now()
+    calories, water, activity, weight = [], [], [], []
+    for user_id in range(users):
+        await create_user(user_id, f'user{user_id}', 'Bench', 'User')
+        for offset in range(days):
+            date = (today - timedelta(days=offset)).strftime('%Y-%m-%d')
+            calories += [(user_id, date, random.randint(100, 700)) for _ in range(entries)]
+            water += [(user_id, date, 250) for _ in range(entries)]
+            activity.append((user_id, date, random.randint(1000, 12000), offset % 3 == 0))
+            weight.append((user_id, date, round(random.uniform(70, 80), 1)))
+    await storage.executemany('INSERT INTO calories (user_id, date, calories) VALUES (?, ?, ?)', calories)
+    await storage.executemany('INSERT INTO water (user_id, date, amount) VALUES (?, ?, ?)', water)
+    await storage.executemany('INSERT INTO activity (user_id, date, steps, workout) VALUES (?, ?, ?, ?)', activity)
+    await storage.executemany('INSERT INTO weight (user_id, date, weight) VALUES (?, ?, ?)', weight)
+    await rollups.rebuild()
+
+
+async def measure(fn, users, repeats=200):
+    latencies = []
+    for _ in range(repeats):
+        user_id = random.randrange(users)
+        started = time.perf_counter()
+        await fn(user_id)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return statistics.median(latencies)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--entries', type=int, default=6, help='записей калорий и воды на пользователя в день')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        await storage.start(os.path.join(tmp, 'bench.db'))
+        await init_db()
+        await fill(args.users, args.entries, 366)
+
+        print(f"{'период':28} {'исходные записи':>16} {'итоги':>10}")
+        for name, days, granularity in (
+            ('неделя по дням', 7, 'day'),
+            ('месяц по дням', 30, 'day'),
+            ('год по неделям', 365, 'week'),
+            ('год по месяцам', 365, 'month'),
+        ):
+            before = await measure(lambda user_id: raw_history(user_id, days), args.users)
+            after = await measure(lambda user_id: history.get_series(user_id, days, granularity), args.users)
+            print(f"{name:28} {before:13.2f} ms {after:7.2f} ms")
+        await storage.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
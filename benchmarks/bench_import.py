@@ -0,0 +1,123 @@
+"""Импорт истории: построчная запись против пачек executemany
+
+Создаёт архив как у /export (calories.csv, water.csv, activity.csv, weight.csv)
+на --rows строк с долей --invalid ошибочных строк и импортирует его
+importer.import_file. Для сравнения --baseline строк калорий записываются
+по одной, как add_calories: отдельное задание писателя на строку со своей
+фиксацией и обновлением статистики; скорость пересчитывается на все строки.
+В конце проверяется, что дневная статистика совпадает с суммами файла.
+
+Запуск: python -m benchmarks.bench_import --rows 100000 --batch 5000
+"""
+import argparse
+import asyncio
+import csv
+import io
+import os
+import random
+import tempfile
+import time
+import zipfile
+from datetime import datetime, timedelta
+
+import config
+from utils import importer, rollups
+from utils.database import init_db, create_user
+from utils.storage import storage
+
+
+def make_archive(path, rows, invalid):
+    """Архив с четырьмя трекерами; возвращает суммы калорий и шагов по валидным строкам"""
+    days = max(1, rows // 20)
+    today = datetime.now()
+    dates = [(today - timedelta(days=offset)).strftime('%Y-%m-%d') for offset in range(days)]
+    share = {'calories': 0.45, 'water': 0.45, 'activity': 0.05, 'weight': 0.05}
+    sums = {'calories': 0, 'steps': 0}
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for table, part in share.items():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            count = int(rows * part)
+            if table == 'calories':
+                writer.writerow(('date', 'calories'))
+                for index in range(count):
+                    value = random.randint(50, 900)
+                    if random.random() < invalid:
+                        writer.writerow((dates[index % days], 'много'))
+                        continue
+                    sums['calories'] += value
+                    writer.writerow((dates[index % days], value))
+            elif table == 'water':
+                writer.writerow(('date', 'amount'))
+                writer.writerows((dates[index % days], 250) for index in range(count))
+            elif table == 'activity':
+                writer.writerow(('date', 'steps', 'workout'))
+                for index in range(count):
+                    steps = random.randint(1000, 15000)
+                    sums['steps'] += steps
+                    writer.writerow((dates[index % days], steps, index % 3 == 0 and 1 or 0))
+            else:
+                writer.writerow(('date', 'weight'))
+                writer.writerows((dates[index % days], round(random.uniform(70, 80), 1)) for index in range(count))
+            archive.writestr(f'{table}.csv', buffer.getvalue())
+    return sums
+
+
+async def row_by_row(user_id, rows):
+    """Прежний путь: одна строка - одно задание писателя и одна фиксация"""
+    date = datetime.now().strftime('%Y-%m-%d')
+    started = time.perf_counter()
+    for _ in range(rows):
+        async def insert(db):
+            await db.execute('INSERT INTO calories (user_id, date, calories) VALUES (?, ?, ?)', (user_id, date, 300))
+            await rollups.increment(db, user_id, date, calories_consumed=300)
+        await storage.write(insert)
+    return time.perf_counter() - started
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--batch', type=int, default=config.IMPORT_BATCH_SIZE, help='строк в одной транзакции')
+    parser.add_argument('--invalid', type=float, default=0.001, help='доля ошибочных строк')
+    parser.add_argument('--baseline', type=int, default=2000, help='строк для построчной записи')
+    args = parser.parse_args()
+    importer.IMPORT_BATCH_SIZE = args.batch
+
+    with tempfile.TemporaryDirectory() as tmp:
+        await storage.start(os.path.join(tmp, 'bench.db'))
+        await init_db()
+        await create_user(1, 'user1', 'Bench', 'User')
+        await create_user(2, 'user2', 'Bench', 'User')
+
+        path = os.path.join(tmp, 'export.zip')
+        sums = make_archive(path, args.rows, args.invalid)
+
+        baseline = await row_by_row(2, args.baseline)
+        print(f"построчно:  {args.baseline} строк за {baseline:.2f} с, {args.baseline / baseline:8.0f} строк/с "
+              f"(на {args.rows} строк ~{baseline / args.baseline * args.rows:.0f} с)")
+
+        reports = []
+
+        async def progress(rows):
+            reports.append(rows)
+
+        started = time.perf_counter()
+        result = await importer.import_file(1, path, 'export.zip', progress)
+        elapsed = time.perf_counter() - started
+        imported = sum(result['rows'].values())
+        print(f"пачками:    {imported} строк за {elapsed:.2f} с, {imported / elapsed:8.0f} строк/с "
+              f"(пачка {args.batch}, отчётов о ходе: {len(reports)}, пропущено: {result['skipped']}, "
+              f"дней статистики: {result['days']})")
+
+        calories, steps = await storage.fetchone('''
+            SELECT SUM(calories_consumed), SUM(steps_taken) FROM statistics WHERE user_id = ?
+        ''', (1,))
+        matches = calories == sums['calories'] and steps == sums['steps']
+        print(f"итоги статистики {'совпадают' if matches else 'НЕ совпадают'} с файлом: "
+              f"калорий {calories} / {sums['calories']}, шагов {steps} / {sums['steps']}")
+        await storage.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
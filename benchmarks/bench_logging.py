@@ -0,0 +1,104 @@
+"""Стоимость журнала на апдейт в цикле событий: синхронная запись против очереди с выборкой
+
+Апдейты с текстом без кнопки проходят через настоящий Dispatcher.feed_update
+(без обращений к базе и отправки), поэтому на каждый приходятся только записи
+журнала: событие menu.message и строка aiogram.event об обработке.
+
+- "без журнала": уровень WARNING, нижняя граница;
+- "синхронный": FileHandler и StreamHandler в цикле событий, как прежний
+  setup_logging в bot.py;
+- "очередь": logger.setup_logging - запись в файл и поток фоновым потоком;
+- "очередь + выборка": то же с LOG_SAMPLING для событий каждого апдейта.
+
+--slow-write имитирует медленный диск или вывод (задержка каждой записи, мс):
+синхронный журнал останавливает цикл событий, очередь - только свой поток,
+а при её переполнении записи отбрасываются.
+
+Запуск: python -m benchmarks.bench_logging --updates 5000 --slow-write 0.2
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+from benchmarks.fakes import load_bot, message_update
+from logger import setup_logging, shutdown_logging
+
+OLD_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class SlowStream:
+    """Поток вывода с задержкой каждой записи"""
+
+    def __init__(self, stream, delay: float):
+        self.stream = stream
+        self.delay = delay
+
+    def write(self, text):
+        if self.delay:
+            time.sleep(self.delay)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def sync_logging(log_dir, stream):
+    """Прежняя настройка: обработчики пишут прямо из цикла событий"""
+    shutdown_logging()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    for handler in (logging.FileHandler(os.path.join(log_dir, 'bot_sync.log')), logging.StreamHandler(stream)):
+        handler.setFormatter(logging.Formatter(OLD_FORMAT))
+        root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+
+async def feed(bot_module, repeats):
+    updates = [message_update(1, 'привет', bot=bot_module.bot) for _ in range(repeats)]
+    started = time.perf_counter()
+    for update in updates:
+        await bot_module.dp.feed_update(bot_module.bot, update)
+    return (time.perf_counter() - started) / repeats * 1e6
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--updates', type=int, default=5000)
+    parser.add_argument('--slow-write', type=float, default=0.0, help='задержка каждой записи в вывод, мс')
+    parser.add_argument('--sampling', default='menu.message=0.01,aiogram.event=0.01')
+    args = parser.parse_args()
+
+    bot_module, _ = load_bot()
+    await feed(bot_module, 100)
+    devnull = open(os.devnull, 'w')
+    stream = SlowStream(devnull, args.slow_write / 1000)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        modes = (
+            ('без журнала', lambda: logging.getLogger().setLevel(logging.WARNING)),
+            ('синхронный', lambda: sync_logging(tmp, stream)),
+            ('очередь', lambda: setup_logging(log_dir=tmp, stream=stream, sampling='')),
+            ('очередь + выборка', lambda: setup_logging(log_dir=tmp, stream=stream, sampling=args.sampling)),
+        )
+        print(f"апдейтов: {args.updates}, задержка записи: {args.slow_write} мс, выборка: {args.sampling}")
+        print(f"{'журнал':20} {'на апдейт':>12} {'отброшено':>10}")
+        for name, configure in modes:
+            queue_handler = configure()
+            per_update = await feed(bot_module, args.updates)
+            dropped = getattr(queue_handler, 'dropped', 0)
+            # Дописывание очереди в замер не входит
+            shutdown_logging()
+            print(f"{name:20} {per_update:9.1f} µs {dropped:10}")
+
+    setup_logging(log_dir=None)
+    logging.getLogger().setLevel(logging.WARNING)
+    devnull.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
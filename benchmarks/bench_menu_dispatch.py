@@ -0,0 +1,75 @@
+"""Стоимость выбора обработчика сообщения: цепочка сравнений против таблицы меню
+
+"цепочка": последовательное сравнение текста со всеми кнопками, затем с
+состояниями, как в прежнем if/elif в handle_menu. "таблица": MenuRouter.resolve -
+поиск в словарях кнопок и состояний. Последняя строка - полный путь апдейта
+через Dispatcher.feed_update для текста, который не является кнопкой
+(без обращений к базе и отправки).
+
+Запуск: python -m benchmarks.bench_menu_dispatch --repeats 200000
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.fakes import load_bot, message_update
+from handlers import menu
+
+
+def chain(buttons, states):
+    """Выбор обработчика перебором, как в цепочке if/elif"""
+    def resolve(text, state):
+        for button, handler in buttons:
+            if text == button:
+                return handler
+        for name, handler in states:
+            if state == name:
+                return handler
+        return None
+    return resolve
+
+
+def per_call_ns(resolve, text, state, repeats):
+    started = time.perf_counter()
+    for _ in range(repeats):
+        resolve(text, state)
+    return (time.perf_counter() - started) / repeats * 1e9
+
+
+async def feed(bot_module, text, repeats):
+    updates = [message_update(1, text, bot=bot_module.bot) for _ in range(repeats)]
+    started = time.perf_counter()
+    for update in updates:
+        await bot_module.dp.feed_update(bot_module.bot, update)
+    return (time.perf_counter() - started) / repeats * 1e6
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeats', type=int, default=200000)
+    parser.add_argument('--updates', type=int, default=5000)
+    args = parser.parse_args()
+
+    buttons = list(menu.buttons.items())
+    states = list(menu.states.items())
+    before = chain(buttons, states)
+    cases = (
+        ('первая кнопка', buttons[0][0], None),
+        ('последняя кнопка', buttons[-1][0], None),
+        ('ввод в последнем состоянии', '42', states[-1][0]),
+        ('текст без кнопки и состояния', 'привет', None),
+    )
+    print(f"кнопок: {len(buttons)}, состояний: {len(states)}, callback: {len(menu.callbacks)}")
+    print(f"{'сообщение':32} {'цепочка':>12} {'таблица':>12}")
+    for name, text, state in cases:
+        old = per_call_ns(before, text, state, args.repeats)
+        new = per_call_ns(menu.resolve, text, state, args.repeats)
+        print(f"{name:32} {old:9.0f} ns {new:9.0f} ns")
+
+    bot_module, _ = load_bot()
+    await feed(bot_module, 'привет', 100)
+    print(f"{'feed_update, текст без кнопки':32} {await feed(bot_module, 'привет', args.updates):9.1f} µs на апдейт")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+"""Задержка /start: инициализация базы на каждый /start против однократного запуска
+
+Прогоняет апдейты /start через настоящий dp из bot.py с ботом без сети.
+"до": перед каждым /start выполняется работа старых init-функций
+(DDL всех таблиц и проверки COUNT(*) для наполнения контентом, четыре транзакции).
+"после": только обработчик /start (upsert пользователя).
+
+Запуск: python -m benchmarks.bench_onboarding --users 500
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.fakes import load_bot, message_update
+from utils import migrations
+from utils.storage import storage
+
+
+async def legacy_init():
+    """Работа, которую раньше делали init_db, init_motivation_db, init_coach_db и init_faq_db"""
+    async def create_tables(db):
+        for table in ('users', 'calories', 'water', 'activity', 'weight', 'notes', 'goals', 'statistics'):
+            await db.execute(migrations.TABLES[table].format(name=table))
+    await storage.write(create_tables)
+
+    for table in ('motivation', 'coach_answers', 'faq'):
+        async def seed_check(db, table=table):
+            await db.execute(migrations.TABLES[table].format(name=table))
+            async with db.execute(f'SELECT COUNT(*) FROM {table}') as cursor:
+                await cursor.fetchone()
+        await storage.write(seed_check)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+async def measure(bot_module, users, first_user, per_start_init):
+    latencies = []
+    for user_id in range(first_user, first_user + users):
+        update = message_update(user_id, '/start', bot=bot_module.bot)
+        started = time.perf_counter()
+        if per_start_init:
+            await legacy_init()
+        await bot_module.dp.feed_update(bot_module.bot, update)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def report(name, latencies):
+    print(f"{name:32} p50 {statistics.median(latencies):7.2f} ms  "
+          f"p95 {percentile(latencies, 0.95):7.2f} ms  mean {statistics.mean(latencies):7.2f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=500)
+    args = parser.parse_args()
+
+    bot_module, _ = load_bot()
+    with tempfile.TemporaryDirectory() as tmp:
+        await storage.start(os.path.join(tmp, 'bench.db'))
+        await bot_module.dp.emit_startup(bot=bot_module.bot)
+
+        before = await measure(bot_module, args.users, 1, per_start_init=True)
+        after = await measure(bot_module, args.users, args.users + 1, per_start_init=False)
+
+        await bot_module.dp.emit_shutdown(bot=bot_module.bot)
+
+    report('init on every /start', before)
+    report('init once at startup', after)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+"""Ответы пользователям во время пачки напоминаний: без очереди и с очередью отправки
+
+Сессия без сети имитирует глобальный лимит Telegram (30 сообщений в секунду,
+сверх него - RetryAfter). Одновременно уходит пачка напоминаний всем
+пользователям (как в 8:00), а несколько пользователей продолжают писать боту.
+Печатает задержку ответов (p50/p99), число ошибок лимита и потерянных сообщений.
+
+Запуск: python -m benchmarks.bench_send_queue --reminders 600 --interactive 60
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from aiogram import Bot
+
+from benchmarks.fakes import FakeSession
+from utils.send_queue import SendQueue, REMINDER, priority
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+async def scenario(use_queue, reminders, interactive, latency):
+    session = FakeSession(latency, rate_limit=30)
+    queue = SendQueue()
+    session.middleware(queue)
+    bot = Bot('123456:BENCHMARK', session=session)
+    if use_queue:
+        await queue.start()
+
+    lost = 0
+
+    async def remind(chat_id):
+        nonlocal lost
+        with priority(REMINDER):
+            try:
+                await bot.send_message(chat_id, 'reminder')
+            except Exception:
+                lost += 1
+
+    async def reply(chat_id, delay):
+        nonlocal lost
+        await asyncio.sleep(delay)
+        started = time.perf_counter()
+        try:
+            await bot.send_message(chat_id, 'reply')
+        except Exception:
+            lost += 1
+            return None
+        return time.perf_counter() - started
+
+    # Пачка напоминаний стартует сразу, ответы равномерно распределены по первым секундам
+    tasks = [asyncio.create_task(remind(chat_id)) for chat_id in range(1, reminders + 1)]
+    replies = await asyncio.gather(*(
+        reply(1000000 + i, i * 0.05) for i in range(interactive)
+    ))
+    await asyncio.gather(*tasks)
+    await queue.stop()
+
+    latencies = [value * 1000 for value in replies if value is not None]
+    name = 'с очередью' if use_queue else 'без очереди'
+    if latencies:
+        print(f"{name:12} ответы p50 {statistics.median(latencies):8.1f} ms  p99 {percentile(latencies, 0.99):8.1f} ms  "
+              f"ошибок лимита {session.flood_errors:5}  потеряно сообщений {lost:5}")
+    else:
+        print(f"{name:12} все ответы потеряны, ошибок лимита {session.flood_errors}")
+    if use_queue:
+        for name, metrics in queue.stats().items():
+            if isinstance(metrics, dict) and metrics['sent']:
+                print(f"{'':12} {name:12} отправлено {metrics['sent']:5}  макс. в очереди {metrics['max_waiting']:5}  "
+                      f"ожидание p50 {metrics['wait_p50'] * 1000:8.1f} ms  p99 {metrics['wait_p99'] * 1000:8.1f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--reminders', type=int, default=600)
+    parser.add_argument('--interactive', type=int, default=60)
+    parser.add_argument('--latency', type=float, default=0.02, help='задержка ответа Bot API, секунды')
+    args = parser.parse_args()
+
+    await scenario(False, args.reminders, args.interactive, args.latency)
+    await scenario(True, args.reminders, args.interactive, args.latency)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+"""Хранилище состояний диалогов: 100k активных пользователей и ограничение памяти
+
+Сначала заполняет хранилище активными пользователями, затем выполняет смесь
+get/set/clear по случайным пользователям из потока, который в несколько раз
+больше max_size. Печатает ops/sec и память (tracemalloc) после каждой фазы:
+при превышении max_size память не растёт.
+
+Запуск: python -m benchmarks.bench_state --users 100000 --stream 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from utils.database import init_db
+from utils.state import StateStore
+from utils.storage import storage
+
+STATES = ['subtract_calories', 'set_limit', 'subtract_water', 'set_water_limit',
+          'add_steps', 'add_weight', 'add_plan', 'add_thought']
+
+
+def memory_mb():
+    return tracemalloc.get_traced_memory()[0] / 1024 / 1024
+
+
+async def run_phase(name, store, users, ops, concurrency):
+    async def worker(count):
+        for _ in range(count):
+            user_id = random.randrange(users)
+            roll = random.random()
+            if roll < 0.6:
+                store.get(user_id, user_id)
+            elif roll < 0.9:
+                await store.set(user_id, user_id, random.choice(STATES))
+            else:
+                await store.clear(user_id, user_id)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(ops // concurrency) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    print(f"{name:28} {ops / elapsed:12.0f} ops/sec  entries {len(store):8}  "
+          f"evicted {store.evictions:8}  memory {memory_mb():7.1f} MiB")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=100000, help='активных пользователей (= max_size)')
+    parser.add_argument('--stream', type=int, default=1000000, help='всего разных пользователей в потоке')
+    parser.add_argument('--ops', type=int, default=500000)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--persist', action='store_true', help='дублировать состояние в SQLite')
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    if args.persist:
+        await storage.start(os.path.join(tmp.name, 'bench.db'))
+        await init_db()
+
+    tracemalloc.start()
+    store = StateStore(max_size=args.users, persist=args.persist)
+    started = time.perf_counter()
+    for user_id in range(args.users):
+        await store.set(user_id, user_id, random.choice(STATES))
+    elapsed = time.perf_counter() - started
+    print(f"{'fill ' + str(args.users) + ' users':28} {args.users / elapsed:12.0f} ops/sec  "
+          f"entries {len(store):8}  memory {memory_mb():7.1f} MiB")
+
+    await run_phase('active users', store, args.users, args.ops, args.concurrency)
+    for _ in range(2):
+        await run_phase(f'stream of {args.stream} users', store, args.stream, args.ops, args.concurrency)
+    print(f"peak memory {tracemalloc.get_traced_memory()[1] / 1024 / 1024:.1f} MiB")
+    tracemalloc.stop()
+
+    if args.persist:
+        await storage.close()
+    tmp.cleanup()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
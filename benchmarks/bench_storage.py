@@ -0,0 +1,101 @@
+"""Сравнение ops/sec: новое соединение на каждый вызов против общего менеджера
+
+Запуск: python -m benchmarks.bench_storage --ops 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+import aiosqlite
+
+from utils import calories
+from utils.database import init_db, create_user
+from utils.storage import storage
+
+
+async def baseline_get_today(path, user_id, today):
+    """Чтение в старом стиле: отдельное соединение на вызов"""
+    async with aiosqlite.connect(path) as db:
+        async with db.execute('SELECT daily_calories_limit FROM users WHERE user_id = ?', (user_id,)) as cursor:
+            await cursor.fetchone()
+        async with db.execute('SELECT SUM(calories) FROM calories WHERE user_id = ? AND date = ?', (user_id, today)) as cursor:
+            await cursor.fetchone()
+
+
+async def baseline_add(path, user_id, today, amount):
+    """Запись в старом стиле: два соединения (запись и статистика)"""
+    async with aiosqlite.connect(path) as db:
+        await db.execute('INSERT INTO calories (user_id, date, calories) VALUES (?, ?, ?)', (user_id, today, amount))
+        await db.commit()
+    async with aiosqlite.connect(path) as db:
+        async with db.execute('SELECT id FROM statistics WHERE user_id = ? AND date = ?', (user_id, today)) as cursor:
+            exists = await cursor.fetchone()
+        if exists:
+            await db.execute('UPDATE statistics SET calories_consumed = ? WHERE user_id = ? AND date = ?', (amount, user_id, today))
+        else:
+            # OR IGNORE: при параллельных вызовах оба могут не найти строку, а (user_id, date) теперь уникальны
+            await db.execute('INSERT OR IGNORE INTO statistics (user_id, date, calories_consumed) VALUES (?, ?, ?)', (user_id, today, amount))
+        await db.commit()
+
+
+async def run(ops, concurrency, make_op):
+    """Выполняет ops операций с заданным параллелизмом, возвращает ops/sec"""
+    queue = asyncio.Queue()
+    for i in range(ops):
+        queue.put_nowait(i)
+
+    async def worker():
+        while not queue.empty():
+            i = queue.get_nowait()
+            await make_op(i)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return ops / (time.perf_counter() - started)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--ops', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--write-ratio', type=float, default=0.3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        await storage.start(path)
+        await init_db()
+        for user_id in range(args.users):
+            await create_user(user_id, f'user{user_id}', 'Bench', 'User')
+        today = time.strftime('%Y-%m-%d')
+        plan = [random.random() < args.write_ratio for _ in range(args.ops)]
+
+        async def before(i):
+            user_id = i % args.users
+            if plan[i]:
+                await baseline_add(path, user_id, today, 100)
+            else:
+                await baseline_get_today(path, user_id, today)
+
+        async def after(i):
+            user_id = i % args.users
+            if plan[i]:
+                await calories.add_calories(user_id, 100)
+            else:
+                await calories.get_today(user_id)
+
+        before_ops = await run(args.ops, args.concurrency, before)
+        after_ops = await run(args.ops, args.concurrency, after)
+        await storage.close()
+
+    print(f"соединение на вызов: {before_ops:10.1f} ops/sec")
+    print(f"общий менеджер:      {after_ops:10.1f} ops/sec")
+    print(f"ускорение:           {after_ops / before_ops:10.2f}x")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+"""Стоимость тика напоминаний о воде в зависимости от числа пользователей
+
+На каждый тик приходится одинаковое число пользователей, у которых наступило
+напоминание (--due). "по запросу на пользователя": отдельный SELECT SUM на
+каждого, как раньше. "один запрос": Reminders.select_thirsty - вся пачка
+одним запросом по индексу (user_id, created_at). Время тика не должно расти
+с общим числом пользователей.
+
+Запуск: python -m benchmarks.bench_water_tick --users 1000 10000 100000 --due 1000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from utils.database import init_db
+from utils.reminders import Reminders, WATER_CHECK_WINDOW, WATER_CHECK_MIN
+from utils.storage import storage
+
+
+async def fill(users, entries):
+    """entries записей воды на пользователя, равномерно за последние 12 часов"""
+    now = time.time()
+    today = time.strftime('%Y-%m-%d')
+    rows = []
+    for user_id in range(users):
+        for _ in range(entries):
+            rows.append((user_id, today, random.choice((100, 150, 250)), now - random.uniform(0, 12 * 3600)))
+        if len(rows) >= 50000:
+            await storage.executemany('INSERT INTO water (user_id, date, amount, created_at) VALUES (?, ?, ?, ?)', rows)
+            rows = []
+    if rows:
+        await storage.executemany('INSERT INTO water (user_id, date, amount, created_at) VALUES (?, ?, ?, ?)', rows)
+
+
+async def per_user(user_ids):
+    since = time.time() - WATER_CHECK_WINDOW
+    recipients = []
+    for user_id in user_ids:
+        row = await storage.fetchone('''
+            SELECT SUM(amount) FROM water WHERE user_id = ? AND created_at > ?
+        ''', (user_id, since))
+        if (row[0] or 0) < WATER_CHECK_MIN:
+            recipients.append(user_id)
+    return recipients
+
+
+async def measure(select, users, due, ticks):
+    timings = []
+    for _ in range(ticks):
+        user_ids = random.sample(range(users), due)
+        started = time.perf_counter()
+        await select(user_ids)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--due', type=int, default=1000, help='пользователей с наступившим напоминанием за тик')
+    parser.add_argument('--entries', type=int, default=8, help='записей воды на пользователя')
+    parser.add_argument('--ticks', type=int, default=10)
+    args = parser.parse_args()
+
+    reminders = Reminders(bot=None, persist=False)
+    print(f"{'пользователей':>14} {'по запросу на пользователя':>28} {'один запрос':>14}")
+    for users in args.users:
+        with tempfile.TemporaryDirectory() as tmp:
+            await storage.start(os.path.join(tmp, 'bench.db'))
+            await init_db()
+            await fill(users, args.entries)
+            due = min(args.due, users)
+            before = await measure(per_user, users, due, args.ticks)
+            after = await measure(reminders.select_thirsty, users, due, args.ticks)
+            await storage.close()
+        print(f"{users:14} {before:25.1f} ms {after:11.1f} ms")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""Приём апдейтов по webhook: подтверждение сразу против ожидания обработчика
+
+Поднимает приложение utils/webhook.py на локальном порту с настоящим dp из
+bot.py и ботом без сети (каждый вызов Bot API отвечает через --latency секунд).
+Клиент играет роль Telegram: отправляет апдейты с секретным заголовком и
+замеряет время до ответа. "подтверждение сразу" - обработка в фоне,
+"ожидание обработчика" - ответ после обработки апдейта. Проверяет также
+/health, отказ без секрета и обработку принятых апдейтов при остановке.
+
+Ответы проходят через очередь отправки, поэтому "обработаны" ограничено
+SEND_GLOBAL_RATE сообщений в секунду в обоих режимах.
+
+Запуск: python -m benchmarks.bench_webhook --updates 300 --latency 0.05
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from benchmarks.fakes import load_bot, message_update
+from utils.storage import storage
+from utils.webhook import create_app, HEALTH_PATH
+
+PATH = '/webhook'
+SECRET = 'bench-secret'
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+async def run(bot_module, session, updates, concurrency, background):
+    app = create_app(bot_module.dp, bot_module.bot, PATH, SECRET, url='https://bench.example',
+                     background=background, drain_timeout=60)
+    client = TestClient(TestServer(app))
+    await client.start_server()
+
+    health = await client.get(HEALTH_PATH)
+    assert health.status == 200, health.status
+    forged = await client.post(PATH, json=message_update(1, '/start').model_dump(mode='json', exclude_none=True))
+    assert forged.status == 401, forged.status
+
+    sent_before = session.calls['SendMessage']
+    queue = asyncio.Queue()
+    for i in range(updates):
+        # Разные пользователи, чтобы не упираться в лимит сообщений на чат
+        user_id = 1000 + i
+        queue.put_nowait(message_update(user_id, '/start' if i % 2 == 0 else '🍽 Калории'))
+    latencies = []
+
+    async def worker():
+        while not queue.empty():
+            update = queue.get_nowait()
+            started = time.perf_counter()
+            response = await client.post(
+                PATH, json=update.model_dump(mode='json', exclude_none=True),
+                headers={'X-Telegram-Bot-Api-Secret-Token': SECRET}
+            )
+            assert response.status == 200, response.status
+            await response.read()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    acked = time.perf_counter() - started
+    # Остановка дожидается фоновой обработки всех подтверждённых апдейтов
+    await client.close()
+    processed = time.perf_counter() - started
+    replies = session.calls['SendMessage'] - sent_before
+    return latencies, acked, processed, replies
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--updates', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=20, help='одновременных запросов от "Telegram"')
+    parser.add_argument('--latency', type=float, default=0.05, help='задержка ответа Bot API, секунды')
+    args = parser.parse_args()
+
+    # Сессию бота закрывает остановка приложения; заглушке закрытие не мешает
+    bot_module, session = load_bot(args.latency)
+    print(f"{'режим':24} {'ack p50':>10} {'ack p99':>10} {'все ack':>10} {'обработаны':>11} {'ответов':>8}")
+    for name, background in (('ожидание обработчика', False), ('подтверждение сразу', True)):
+        with tempfile.TemporaryDirectory() as tmp:
+            await storage.start(os.path.join(tmp, 'bench.db'))
+            latencies, acked, processed, replies = await run(
+                bot_module, session, args.updates, args.concurrency, background
+            )
+        print(f"{name:24} {statistics.median(latencies):7.1f} ms {percentile(latencies, 0.99):7.1f} ms "
+              f"{acked:8.2f} s {processed:9.2f} s {replies:8}")
+    print(f"setWebhook: {session.calls['SetWebhook']}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
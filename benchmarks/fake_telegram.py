@@ -0,0 +1,324 @@
+"""Локальная замена Telegram Bot API для сквозных прогонов без сети
+
+Приложение aiohttp отвечает на POST /bot<token>/<method> так же, как
+api.telegram.org: getMe, getUpdates (длинный опрос с offset), sendMessage,
+answerCallbackQuery, setWebhook, deleteWebhook и getWebhookInfo. Бот из
+bot.py подключается к нему через TELEGRAM_API_URL.
+
+- latency: задержка каждого ответа, секунды;
+- rate_limit: сообщений в секунду на бота, сверх лимита - 429 с retry_after,
+  как при Flood control; flood_probability - доля случайных 429;
+- трафик пользователей: push_message / push_callback ставят апдейт в очередь,
+  play() проигрывает сценарий с заданной частотой. Без webhook апдейты отдаёт
+  getUpdates, после setWebhook сервер сам отправляет их на адрес webhook с
+  заголовком X-Telegram-Bot-Api-Secret-Token.
+
+Сервер считает вызовы методов, 429 и время от апдейта до первого ответа в тот же чат.
+
+Отдельный запуск: python -m benchmarks.fake_telegram --port 8081 --latency 0.05
+затем TELEGRAM_API_URL=http://127.0.0.1:8081 python bot.py
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import Counter, deque
+
+import aiohttp
+from aiohttp import web
+
+BOT_USER = {'id': 123456, 'is_bot': True, 'first_name': 'Fake', 'username': 'fake_bot'}
+
+
+def _user(user_id: int) -> dict:
+    return {'id': user_id, 'is_bot': False, 'first_name': f'User{user_id}', 'username': f'user{user_id}'}
+
+
+class FakeTelegram:
+    """Состояние поддельного Bot API: очередь апдейтов, webhook, лимиты и счётчики"""
+
+    def __init__(self, latency: float = 0.0, rate_limit: float = None, retry_after: int = 1,
+                 flood_probability: float = 0.0, webhook_connections: int = 40):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.flood_probability = flood_probability
+        self.webhook_connections = webhook_connections
+        self.calls = Counter()
+        self.floods = 0
+        self.sent = {}  # chat_id -> число сообщений
+        self.reply_latencies = []  # секунды от апдейта до первого ответа в чат
+        self.webhook = None  # (url, secret_token)
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._updates = deque()  # апдейты для getUpdates
+        self._awaiting_reply = {}  # chat_id -> время апдейтов без ответа
+        self._recent = deque()
+        self._arrived = None
+        self._webhook_tasks = []
+        self._client = None
+
+    # --- трафик пользователей
+
+    def push_message(self, user_id: int, text: str):
+        """Сообщение пользователя в очередь апдейтов"""
+        update_id = next(self._update_ids)
+        self._push({'update_id': update_id, 'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': _user(user_id),
+            'text': text,
+        }}, user_id)
+
+    def push_callback(self, user_id: int, data: str):
+        """Нажатие inline-кнопки в очередь апдейтов"""
+        update_id = next(self._update_ids)
+        self._push({'update_id': update_id, 'callback_query': {
+            'id': str(update_id),
+            'from': _user(user_id),
+            'chat_instance': str(user_id),
+            'message': {
+                'message_id': update_id,
+                'date': int(time.time()),
+                'chat': {'id': user_id, 'type': 'private'},
+                'from': BOT_USER,
+                'text': '...',
+            },
+            'data': data,
+        }}, user_id)
+
+    def _push(self, update: dict, chat_id: int):
+        self._awaiting_reply.setdefault(chat_id, deque()).append(time.perf_counter())
+        self._updates.append(update)
+        if self._arrived is not None:
+            self._arrived.set()
+
+    async def play(self, script, rate: float):
+        """Проигрывание сценария [(user_id, 'message'|'callback', текст)] с частотой rate апдейтов в секунду"""
+        started = time.perf_counter()
+        for i, (user_id, kind, payload) in enumerate(script):
+            delay = started + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if kind == 'callback':
+                self.push_callback(user_id, payload)
+            else:
+                self.push_message(user_id, payload)
+
+    @property
+    def pending(self) -> int:
+        """Апдейтов, ещё не отданных боту"""
+        return len(self._updates)
+
+    @property
+    def messages(self) -> int:
+        return sum(self.sent.values())
+
+    # --- Bot API
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post('/bot{token}/{method}', self._handle)
+        app.on_startup.append(self._on_startup)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+    async def _on_startup(self, app):
+        self._arrived = asyncio.Event()
+        self._client = aiohttp.ClientSession()
+
+    async def _on_cleanup(self, app):
+        self._stop_webhook()
+        await self._client.close()
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        self.calls[method] += 1
+        params = dict(await request.post())
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        handler = getattr(self, f'api_{method.lower()}', None)
+        if handler is None:
+            return self._error(404, 'Not Found: method not found')
+        return await handler(params)
+
+    @staticmethod
+    def _ok(result) -> web.Response:
+        return web.json_response({'ok': True, 'result': result})
+
+    @staticmethod
+    def _error(status: int, description: str, **parameters) -> web.Response:
+        body = {'ok': False, 'error_code': status, 'description': description}
+        if parameters:
+            body['parameters'] = parameters
+        return web.json_response(body, status=status)
+
+    def _flooded(self) -> bool:
+        if self.flood_probability and random.random() < self.flood_probability:
+            return True
+        if not self.rate_limit:
+            return False
+        now = time.monotonic()
+        while self._recent and self._recent[0] <= now - 1:
+            self._recent.popleft()
+        if len(self._recent) >= self.rate_limit:
+            return True
+        self._recent.append(now)
+        return False
+
+    async def api_getme(self, params):
+        return self._ok(BOT_USER)
+
+    async def api_getupdates(self, params):
+        if self.webhook:
+            return self._error(409, "Conflict: can't use getUpdates method while webhook is active")
+        offset = int(params.get('offset', 0))
+        limit = int(params.get('limit', 100))
+        timeout = float(params.get('timeout', 0))
+        # Апдейты до offset подтверждены ботом
+        while self._updates and self._updates[0]['update_id'] < offset:
+            self._updates.popleft()
+        if not self._updates and timeout:
+            self._arrived.clear()
+            try:
+                await asyncio.wait_for(self._arrived.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self._ok(list(itertools.islice(self._updates, limit)))
+
+    async def api_sendmessage(self, params):
+        if self._flooded():
+            self.floods += 1
+            return self._error(429, f'Too Many Requests: retry after {self.retry_after}', retry_after=self.retry_after)
+        chat_id = int(params['chat_id'])
+        self.sent[chat_id] = self.sent.get(chat_id, 0) + 1
+        waiting = self._awaiting_reply.get(chat_id)
+        if waiting:
+            self.reply_latencies.append(time.perf_counter() - waiting.popleft())
+        return self._ok({
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': BOT_USER,
+            'text': params.get('text', ''),
+        })
+
+    async def api_answercallbackquery(self, params):
+        return self._ok(True)
+
+    async def api_setwebhook(self, params):
+        self._stop_webhook()
+        self.webhook = (params['url'], params.get('secret_token'))
+        queues = [asyncio.Queue() for _ in range(self.webhook_connections)]
+        self._webhook_tasks = [asyncio.create_task(self._route(queues))]
+        self._webhook_tasks += [asyncio.create_task(self._deliver(queue)) for queue in queues]
+        return self._ok(True)
+
+    async def api_deletewebhook(self, params):
+        self._stop_webhook()
+        if params.get('drop_pending_updates') == 'true':
+            self._updates.clear()
+        return self._ok(True)
+
+    async def api_getwebhookinfo(self, params):
+        return self._ok({
+            'url': self.webhook[0] if self.webhook else '',
+            'has_custom_certificate': False,
+            'pending_update_count': len(self._updates),
+        })
+
+    def _stop_webhook(self):
+        self.webhook = None
+        for task in self._webhook_tasks:
+            task.cancel()
+        self._webhook_tasks = []
+
+    async def _route(self, queues):
+        """Распределение апдейтов по соединениям webhook: апдейты одного чата идут через одно, по порядку"""
+        while True:
+            if not self._updates:
+                self._arrived.clear()
+                await self._arrived.wait()
+                continue
+            update = self._updates.popleft()
+            event = update.get('message') or update['callback_query']
+            chat_id = event['chat']['id'] if 'chat' in event else event['from']['id']
+            queues[chat_id % len(queues)].put_nowait(update)
+
+    async def _deliver(self, queue: asyncio.Queue):
+        """Одно соединение webhook: отправка апдейтов по очереди, повтор до ответа 200, как у Telegram"""
+        url, secret_token = self.webhook
+        headers = {'Content-Type': 'application/json'}
+        if secret_token:
+            headers['X-Telegram-Bot-Api-Secret-Token'] = secret_token
+        while True:
+            update = await queue.get()
+            while True:
+                try:
+                    async with self._client.post(url, data=json.dumps(update), headers=headers) as response:
+                        await response.read()
+                        if response.status == 200:
+                            break
+                except aiohttp.ClientError:
+                    pass
+                await asyncio.sleep(0.1)
+
+    def stats(self) -> dict:
+        latencies = sorted(self.reply_latencies)
+
+        def at(q):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * q))] if latencies else 0.0
+        return {
+            'calls': dict(self.calls),
+            'messages': self.messages,
+            'floods': self.floods,
+            'pending': self.pending,
+            'reply_p50': at(0.5),
+            'reply_p99': at(0.99),
+        }
+
+
+async def serve(fake: FakeTelegram, host: str = '127.0.0.1', port: int = 0):
+    """Запуск сервера; возвращает (runner, базовый URL для TELEGRAM_API_URL)"""
+    runner = web.AppRunner(fake.create_app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f'http://{host}:{port}'
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=float, default=30, help='сообщений в секунду до ответа 429')
+    parser.add_argument('--flood-probability', type=float, default=0.0)
+    parser.add_argument('--users', type=int, default=0, help='пользователей, нажимающих /start и меню')
+    parser.add_argument('--rate', type=float, default=50, help='апдейтов в секунду в сценарии')
+    args = parser.parse_args()
+
+    fake = FakeTelegram(args.latency, args.rate_limit, flood_probability=args.flood_probability)
+    runner, url = await serve(fake, args.host, args.port)
+    print(f"Поддельный Bot API на {url}")
+    if args.users:
+        script = [(user_id, 'message', text) for text in ('/start', '🍽 Калории', '📈 Сегодня')
+                  for user_id in range(1, args.users + 1)]
+        asyncio.create_task(fake.play(script, args.rate))
+    try:
+        while True:
+            await asyncio.sleep(10)
+            print(fake.stats())
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
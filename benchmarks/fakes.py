@@ -0,0 +1,115 @@
+"""Заглушки Bot API для бенчмарков: бот без сети и генераторы апдейтов"""
+import asyncio
+import itertools
+import os
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+from aiogram.client.session.base import BaseSession
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import Chat, Message, Update, User
+
+# bot.py требует токен при импорте; формат должен проходить проверку aiogram
+os.environ.setdefault('BOT_TOKEN', '123456:BENCHMARK')
+
+BOT_USER = User(id=123456, is_bot=True, first_name='Bench', username='bench_bot')
+
+
+class FakeSession(BaseSession):
+    """Сессия Bot API без сети: отвечает заглушками и считает вызовы методов
+
+    rate_limit имитирует глобальный лимит Telegram: при превышении заданного
+    числа запросов в секунду отвечает TelegramRetryAfter.
+    """
+
+    def __init__(self, latency: float = 0.0, rate_limit: int = None):
+        super().__init__()
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.calls = Counter()
+        self.flood_errors = 0
+        self._recent = deque()
+        self._message_ids = itertools.count(1)
+
+    async def make_request(self, bot, method, timeout=None):
+        if self.rate_limit:
+            now = time.monotonic()
+            while self._recent and self._recent[0] <= now - 1:
+                self._recent.popleft()
+            if len(self._recent) >= self.rate_limit:
+                self.flood_errors += 1
+                raise TelegramRetryAfter(method, 'Flood control exceeded', 1)
+            self._recent.append(now)
+        self.calls[type(method).__name__] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        returning = method.__returning__
+        if returning is Message:
+            return Message(
+                message_id=next(self._message_ids),
+                date=datetime.now(),
+                chat=Chat(id=method.chat_id, type='private'),
+                text=getattr(method, 'text', None),
+            )
+        if returning is User:
+            return BOT_USER
+        return True
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        raise NotImplementedError
+        yield b''
+
+    async def close(self):
+        pass
+
+
+def load_bot(latency: float = 0.0):
+    """Импорт bot.py с подменённой сессией; возвращает (модуль, сессия)"""
+    import logging
+    import bot as bot_module
+
+    session = FakeSession(latency)
+    # Middleware исходящих запросов (очередь отправки) переносятся на подменённую сессию
+    session.middleware = bot_module.bot.session.middleware
+    bot_module.bot.session = session
+    # Логи каждого апдейта искажают замеры
+    logging.getLogger().setLevel(logging.WARNING)
+    return bot_module, session
+
+
+_update_ids = itertools.count(1)
+
+
+def _user(user_id: int):
+    return {'id': user_id, 'is_bot': False, 'first_name': f'User{user_id}', 'username': f'user{user_id}'}
+
+
+def message_update(user_id: int, text: str, bot=None) -> Update:
+    """Апдейт с текстовым сообщением пользователя (привязанный к bot, если он передан)"""
+    update_id = next(_update_ids)
+    return Update.model_validate({'update_id': update_id, 'message': {
+        'message_id': update_id,
+        'date': datetime.now(),
+        'chat': {'id': user_id, 'type': 'private'},
+        'from': _user(user_id),
+        'text': text,
+    }}, context={'bot': bot})
+
+
+def callback_update(user_id: int, data: str, bot=None) -> Update:
+    """Апдейт с нажатием inline-кнопки (привязанный к bot, если он передан)"""
+    update_id = next(_update_ids)
+    return Update.model_validate({'update_id': update_id, 'callback_query': {
+        'id': str(update_id),
+        'from': _user(user_id),
+        'chat_instance': str(user_id),
+        'message': {
+            'message_id': update_id,
+            'date': datetime.now(),
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': BOT_USER.model_dump(),
+            'text': '...',
+        },
+        'data': data,
+    }}, context={'bot': bot})
@@ -0,0 +1,280 @@
+"""Нагрузочный прогон диспетчера синтетическими пользователями
+
+Собирает настоящий dp из bot.py с ботом без сети и подаёт через
+dp.feed_update потоки апдейтов --users пользователей. Каждый пользователь
+действует последовательно (ждёт ответа на предыдущее действие), пользователи -
+одновременно. Смесь действий: открытие трекеров и сводки, кнопка ввода с
+числом, просмотр истории (кнопки и /history), FAQ с нажатием inline-кнопки.
+
+Отчёт: пропускная способность, p50/p95/p99 задержки всего прогона и каждого
+обработчика, SQL-запросов на апдейт. Запросы по обработчикам считаются в
+отдельном последовательном проходе одного пользователя, где каждый запрос
+однозначно относится к апдейту; в общем прогоне считается только среднее.
+Результат сохраняется в JSON (--output) и может сравниваться с прошлым
+прогоном (--compare): при росте запросов на апдейт или падении пропускной
+способности больше --tolerance скрипт завершается с кодом 1.
+
+Очередь отправки отключена, чтобы замерять обработку, а не лимиты Telegram.
+
+Запуск: python -m benchmarks.loadtest --users 200 --actions 30 --output loadtest.json
+        python -m benchmarks.loadtest --compare loadtest.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from benchmarks.fakes import load_bot, message_update, callback_update
+from handlers import menu
+from utils.content import content
+from utils.send_queue import send_queue
+from utils.state import states
+from utils.storage import storage
+
+# Действия пользователя и их доля в потоке; число - ввод после кнопки
+TAPS = ('🍽 Калории', '💧 Вода', '🏃‍♂️ Активность', '⚖️ Вес', '📈 Сегодня', '⬅️ В меню')
+INPUTS = (
+    ('➖ Вычесть калории', lambda: str(random.randint(50, 800))),
+    ('➖ Выпил воды', lambda: str(random.choice((150, 250, 330, 500)))),
+    ('➕ Добавить шаги', lambda: str(random.randint(500, 8000))),
+    ('➕ Ввести вес', lambda: str(round(random.uniform(55, 110), 1))),
+)
+HISTORY = ('📊 История', '📊 История воды', '📊 История активности', '📊 История веса', '/history', '/history year')
+MIX = (('tap', 0.45), ('input', 0.3), ('history', 0.15), ('faq', 0.1))
+
+# Команды управления транзакциями не считаются запросами
+TRANSACTION_COMMANDS = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE', 'PRAGMA')
+
+
+class QueryCounter:
+    """Счётчик SQL-команд со всех соединений (колбэк вызывается из их потоков)"""
+
+    def __init__(self):
+        self.queries = 0
+        self.statements = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, sql: str):
+        with self._lock:
+            self.statements += 1
+            if not sql.lstrip().upper().startswith(TRANSACTION_COMMANDS):
+                self.queries += 1
+
+
+def make_script(actions, faq_ids):
+    """Действия одного пользователя: ('message', текст) или ('callback', data)"""
+    kinds, weights = zip(*MIX)
+    script = []
+    for _ in range(actions):
+        kind = random.choices(kinds, weights)[0]
+        if kind == 'tap':
+            script.append(('message', random.choice(TAPS)))
+        elif kind == 'input':
+            button, value = random.choice(INPUTS)
+            script += [('message', button), ('message', value())]
+        elif kind == 'history':
+            script.append(('message', random.choice(HISTORY)))
+        elif faq_ids:
+            script += [('message', '❓ Частые вопросы'), ('callback', f'faq_{random.choice(faq_ids)}')]
+    return script
+
+
+def every_action(faq_ids, rounds=3):
+    """Все действия смеси по порядку, rounds раз: для подсчёта запросов каждого обработчика"""
+    script = []
+    for _ in range(rounds):
+        script += [('message', text) for text in TAPS + HISTORY]
+        for button, value in INPUTS:
+            script += [('message', button), ('message', value())]
+        for faq_id in faq_ids[:3]:
+            script += [('message', '❓ Частые вопросы'), ('callback', f'faq_{faq_id}')]
+    return script
+
+
+def label(kind, user_id, payload):
+    """Имя обработчика, который получит апдейт (до его обработки)"""
+    if kind == 'callback':
+        handler, _ = menu.resolve_callback(payload)
+    elif payload.startswith('/'):
+        return 'command:' + payload.split()[0]
+    else:
+        handler = menu.resolve(payload, states.get(user_id, user_id))
+    if handler is None:
+        return 'unhandled'
+    return menu.action_name(handler)
+
+
+async def feed(bot_module, user_id, kind, payload):
+    make = callback_update if kind == 'callback' else message_update
+    await bot_module.dp.feed_update(bot_module.bot, make(user_id, payload, bot=bot_module.bot))
+
+
+async def measure_queries(bot_module, counter, user_id, script):
+    """SQL-запросов на апдейт по обработчикам: один пользователь, строго последовательно"""
+    per_handler = {}
+    for kind, payload in script:
+        name = label(kind, user_id, payload)
+        before = counter.queries
+        await feed(bot_module, user_id, kind, payload)
+        per_handler.setdefault(name, []).append(counter.queries - before)
+    return {name: sum(values) / len(values) for name, values in per_handler.items()}
+
+
+async def run_load(bot_module, scripts):
+    """Все пользователи одновременно; возвращает [(обработчик, задержка в секундах)] и длительность"""
+    samples = []
+
+    async def user(user_id, script):
+        for kind, payload in script:
+            name = label(kind, user_id, payload)
+            started = time.perf_counter()
+            await feed(bot_module, user_id, kind, payload)
+            samples.append((name, time.perf_counter() - started))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(user_id, script) for user_id, script in scripts.items()))
+    return samples, time.perf_counter() - started
+
+
+def percentiles(values):
+    values = sorted(values)
+
+    def at(q):
+        return round(values[min(len(values) - 1, int(len(values) * q))] * 1000, 3)
+    return {'p50': at(0.5), 'p95': at(0.95), 'p99': at(0.99)}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(result, baseline, tolerance):
+    """Сравнение с прошлым прогоном; возвращает список регрессий"""
+    print(f"\nсравнение с {baseline['meta'].get('commit')} ({baseline['meta'].get('date')}):")
+    print(f"{'обработчик':36} {'p50, ms':>17} {'p99, ms':>17} {'запросов':>13}")
+    for name, stats in sorted(result['handlers'].items()):
+        old = baseline['handlers'].get(name)
+        if old is None:
+            print(f"{name:36} {'новый':>17}")
+            continue
+        print(f"{name:36} {old['latency_ms']['p50']:7.2f} → {stats['latency_ms']['p50']:7.2f} "
+              f"{old['latency_ms']['p99']:7.2f} → {stats['latency_ms']['p99']:7.2f} "
+              f"{old['queries'] or 0:5.1f} → {stats['queries'] or 0:5.1f}")
+
+    regressions = []
+    old_queries, new_queries = baseline['queries_per_update'], result['queries_per_update']
+    if new_queries > old_queries * (1 + tolerance):
+        regressions.append(f"запросов на апдейт: {old_queries} → {new_queries}")
+    old_rate, new_rate = baseline['throughput'], result['throughput']
+    if new_rate < old_rate * (1 - tolerance):
+        regressions.append(f"апдейтов в секунду: {old_rate} → {new_rate}")
+    return regressions
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--actions', type=int, default=30, help='действий на пользователя')
+    parser.add_argument('--latency', type=float, default=0.0, help='задержка ответа Bot API, секунды')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='куда сохранить результат в JSON')
+    parser.add_argument('--compare', help='JSON прошлого прогона для сравнения')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='допустимое ухудшение при сравнении (доля)')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    bot_module, session = load_bot(args.latency)
+    counter = QueryCounter()
+    with tempfile.TemporaryDirectory() as tmp:
+        await storage.start(os.path.join(tmp, 'loadtest.db'))
+        await bot_module.dp.emit_startup(bot=bot_module.bot)
+        await send_queue.stop()
+        await storage.set_trace_callback(counter)
+
+        faq_ids = [faq_id for faq_id, _, _ in content.faq_list]
+        user_ids = range(1, args.users + 1)
+        for user_id in user_ids:
+            await feed(bot_module, user_id, 'message', '/start')
+        # Отдельный пользователь для подсчёта запросов, чтобы не смешивать с нагрузкой
+        calibration_user = args.users + 1
+        await feed(bot_module, calibration_user, 'message', '/start')
+        handler_queries = await measure_queries(bot_module, counter, calibration_user, every_action(faq_ids))
+
+        scripts = {user_id: make_script(args.actions, faq_ids) for user_id in user_ids}
+        queries_before, statements_before = counter.queries, counter.statements
+        samples, elapsed = await run_load(bot_module, scripts)
+        queries = counter.queries - queries_before
+        statements = counter.statements - statements_before
+
+        await storage.set_trace_callback(None)
+        await bot_module.dp.emit_shutdown(bot=bot_module.bot)
+
+    by_handler = {}
+    for name, latency in samples:
+        by_handler.setdefault(name, []).append(latency)
+    result = {
+        'meta': {
+            'commit': git_commit(),
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'users': args.users,
+            'actions': args.actions,
+            'latency': args.latency,
+            'seed': args.seed,
+        },
+        'updates': len(samples),
+        'seconds': round(elapsed, 3),
+        'throughput': round(len(samples) / elapsed, 1),
+        'latency_ms': percentiles([latency for _, latency in samples]),
+        'queries_per_update': round(queries / len(samples), 2),
+        'statements_per_update': round(statements / len(samples), 2),
+        'api_calls': dict(session.calls),
+        'handlers': {
+            name: {
+                'count': len(values),
+                'latency_ms': percentiles(values),
+                'queries': round(handler_queries[name], 2) if name in handler_queries else None,
+            }
+            for name, values in sorted(by_handler.items())
+        },
+    }
+
+    print(f"апдейтов: {result['updates']} за {result['seconds']} с, {result['throughput']} в секунду")
+    print(f"задержка: p50 {result['latency_ms']['p50']} ms, p95 {result['latency_ms']['p95']} ms, "
+          f"p99 {result['latency_ms']['p99']} ms")
+    print(f"SQL на апдейт: {result['queries_per_update']} запросов, {result['statements_per_update']} команд всего\n")
+    print(f"{'обработчик':36} {'апдейтов':>9} {'p50, ms':>9} {'p95, ms':>9} {'p99, ms':>9} {'запросов':>9}")
+    for name, stats in result['handlers'].items():
+        queries = '' if stats['queries'] is None else f"{stats['queries']:9.1f}"
+        print(f"{name:36} {stats['count']:9} {stats['latency_ms']['p50']:9.2f} {stats['latency_ms']['p95']:9.2f} "
+              f"{stats['latency_ms']['p99']:9.2f} {queries:>9}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\nрезультат сохранён в {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"регрессия: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -7,15 +7,96 @@ load_dotenv()
 # Токен бота
 BOT_TOKEN = os.getenv('BOT_TOKEN')
 
+# Адрес Bot API; пусто - api.telegram.org (например, локальный сервер или benchmarks/fake_telegram.py)
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', '')
+
+# Способ получения апдейтов: polling (по умолчанию) или webhook
+BOT_MODE = os.getenv('BOT_MODE', 'polling')
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')  # публичный адрес сервиса, например https://bot.onrender.com
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')  # пусто - случайный при каждом запуске
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('PORT', 8080))  # Render передаёт порт в PORT
+WEBHOOK_DRAIN_TIMEOUT = float(os.getenv('WEBHOOK_DRAIN_TIMEOUT', 10))  # секунды на обработку принятых апдейтов при остановке
+
 # Настройки базы данных
 DB_PATH = 'data/bot.db'
+DB_READ_POOL_SIZE = int(os.getenv('DB_READ_POOL_SIZE', 4))  # соединений только для чтения
+
+# Профиль хранилища SQLite
+DB_JOURNAL_MODE = os.getenv('DB_JOURNAL_MODE', 'WAL')
+DB_SYNCHRONOUS = os.getenv('DB_SYNCHRONOUS', 'NORMAL')
+DB_AUTO_VACUUM = os.getenv('DB_AUTO_VACUUM', 'INCREMENTAL')  # для новой базы; старую переводит manage.py vacuum
+DB_MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', 64 * 1024 * 1024))  # байт
+DB_CACHE_SIZE = int(os.getenv('DB_CACHE_SIZE', -16000))  # отрицательное значение — размер в КиБ
+DB_BUSY_TIMEOUT = int(os.getenv('DB_BUSY_TIMEOUT', 5000))  # мс
+
+# Групповая фиксация записей
+DB_GROUP_COMMIT_WINDOW = float(os.getenv('DB_GROUP_COMMIT_WINDOW', 0.002))  # секунды
+DB_GROUP_COMMIT_MAX = int(os.getenv('DB_GROUP_COMMIT_MAX', 256))  # заданий в одной транзакции
+
+# Строк в одной транзакции при конвертации таблиц миграциями
+DB_MIGRATION_BATCH = int(os.getenv('DB_MIGRATION_BATCH', 5000))
 
 # Настройки логирования
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
-LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_DIR = os.getenv('LOG_DIR', 'logs')  # пусто - без файла, только stdout
+LOG_BACKUP_DAYS = int(os.getenv('LOG_BACKUP_DAYS', 14))  # файлов журнала за прошлые дни
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))  # записей в очереди писателя, сверх - отбрасываются
+# Доля записываемых событий ниже WARNING по имени события или логгера: "menu.message=0.1,aiogram.event=0.01"
+LOG_SAMPLING = os.getenv('LOG_SAMPLING', '')
+
+# Состояние диалогов пользователей (ожидаемый ввод)
+STATE_TTL = int(os.getenv('STATE_TTL', 3600))  # секунды
+STATE_MAX_SIZE = int(os.getenv('STATE_MAX_SIZE', 200000))  # записей в памяти
+STATE_PERSIST = os.getenv('STATE_PERSIST', '1') == '1'  # сохранять в базу для переживания перезапуска
+
+# Метрики: путь выгрузки в формате Prometheus (пусто - отключена), отдельный порт для режима
+# polling (0 - без сервера) и период сводки в журнал. Публичный сервер webhook отдаёт выгрузку
+# только с METRICS_TOKEN - запрос должен передать заголовок "Authorization: Bearer <токен>"
+METRICS_PATH = os.getenv('METRICS_PATH', '/metrics')
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')  # пусто - на сервере webhook выгрузки нет, на METRICS_PORT - без проверки
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+METRICS_HOST = os.getenv('METRICS_HOST', '0.0.0.0')
+METRICS_LOG_INTERVAL = float(os.getenv('METRICS_LOG_INTERVAL', 300))  # секунды, 0 - без сводки
+
+# Апдейтов, обрабатываемых одновременно (апдейты одного пользователя - всегда по одному)
+UPDATE_CONCURRENCY = int(os.getenv('UPDATE_CONCURRENCY', 100))
+UPDATE_DRAIN_TIMEOUT = float(os.getenv('UPDATE_DRAIN_TIMEOUT', 10))  # секунды на апдейты в обработке при остановке
+
+# Ограничения исходящих сообщений (лимиты Bot API)
+SEND_GLOBAL_RATE = float(os.getenv('SEND_GLOBAL_RATE', 30))  # сообщений в секунду на бота
+SEND_CHAT_RATE = float(os.getenv('SEND_CHAT_RATE', 1))  # сообщений в секунду в один чат
+SEND_CHAT_BURST = float(os.getenv('SEND_CHAT_BURST', 3))  # допустимая пачка сообщений в один чат
+SEND_GROUP_RATE = float(os.getenv('SEND_GROUP_RATE', 20 / 60))  # сообщений в секунду в группу
+SEND_MAX_RETRIES = int(os.getenv('SEND_MAX_RETRIES', 3))  # повторов после RetryAfter
 
 # Настройки для напоминаний
 REMINDER_CHECK_INTERVAL = 60  # секунды
+REMINDER_WATER_INTERVAL = int(os.getenv('REMINDER_WATER_INTERVAL', 7200))  # секунды, по умолчанию для нового пользователя
+REMINDER_MOTIVATION_INTERVAL = int(os.getenv('REMINDER_MOTIVATION_INTERVAL', 14400))  # секунды
+REMINDER_CONCURRENCY = int(os.getenv('REMINDER_CONCURRENCY', 50))  # одновременных отправок напоминаний
+REMINDER_BATCH = int(os.getenv('REMINDER_BATCH', 5000))  # пользователей в одном запросе отбора получателей
+
+# Итоги трекеров за сегодня в памяти (записей user_id + трекер)
+TOTALS_CACHE_SIZE = int(os.getenv('TOTALS_CACHE_SIZE', 100000))
+
+# Выгрузка истории пользователя (/export)
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 1000))  # строк в одной пачке курсора
+EXPORT_CONCURRENCY = int(os.getenv('EXPORT_CONCURRENCY', 2))  # одновременных выгрузок (каждая держит читателя)
+
+# Импорт истории из файла (/import)
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', 5000))  # строк в одной транзакции
+IMPORT_MAX_ERRORS = int(os.getenv('IMPORT_MAX_ERRORS', 20))  # ошибочных строк в отчёте
+
+# Сжатие исходных записей воды и калорий в одну запись за день
+COMPACTION_KEEP_DAYS = int(os.getenv('COMPACTION_KEEP_DAYS', 30))  # дней, за которые записи не сжимаются
+COMPACTION_INTERVAL = int(os.getenv('COMPACTION_INTERVAL', 86400))  # секунды, 0 - без фоновой задачи
+COMPACTION_BATCH = int(os.getenv('COMPACTION_BATCH', 2000))  # исходных строк в одной транзакции
+COMPACTION_VACUUM_PAGES = int(os.getenv('COMPACTION_VACUUM_PAGES', 200))  # страниц в одной транзакции incremental_vacuum
+
+# Как часто проверять версии справочного контента (мотивация, FAQ, ответы тренера)
+CONTENT_REFRESH_INTERVAL = int(os.getenv('CONTENT_REFRESH_INTERVAL', 60))  # секунды
 
 # Категории для мотивационных сообщений
 MOTIVATION_CATEGORIES = ['fitness', 'nutrition', 'general']
@@ -0,0 +1,11 @@
+"""Обработчики апдейтов по разделам бота
+
+Каждый модуль раздела регистрирует свои кнопки, ожидаемый ввод и inline-кнопки
+в таблицах menu (handlers/router.py); команды разделов - в собственных Router.
+"""
+from . import main, dashboard, calories, water, activity, weight, notes, faq, history, export, importer
+from .keyboards import main_menu
+from .router import menu
+
+# Порядок подключения к диспетчеру: команды разделов, затем таблица меню
+routers = (history.router, export.router, importer.router, menu)
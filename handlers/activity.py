@@ -0,0 +1,74 @@
+from aiogram import types
+from aiogram.types import ReplyKeyboardRemove
+
+from utils import activity
+from utils.state import states
+from .keyboards import activity_menu, confirm_keyboard
+from .router import menu
+
+
+@menu.button("🏃‍♂️ Активность")
+async def show_activity(message: types.Message):
+    today = await activity.get_today(message.from_user.id)
+    workout = "✅" if today['workout'] else "❌"
+    await message.answer(
+        f"🏃‍♂️ Трекер активности\n\nШаги: {today['steps']}\nТренировка: {workout}\n\nЧто сделать?",
+        reply_markup=activity_menu
+    )
+
+
+@menu.button("➕ Добавить шаги")
+async def ask_steps(message: types.Message):
+    await message.answer("Сколько шагов добавить? Введите число:", reply_markup=ReplyKeyboardRemove())
+    await states.set(message.chat.id, message.from_user.id, "add_steps")
+
+
+@menu.button("🏋️‍♂️ Отметить тренировку")
+async def mark_workout(message: types.Message):
+    await activity.add_workout(message.from_user.id)
+    await message.answer("Тренировка отмечена! 💪", reply_markup=activity_menu)
+
+
+@menu.button("🔄 Сбросить активность")
+async def confirm_reset(message: types.Message):
+    await message.answer(
+        "Вы точно уверены, что хотите сбросить активность за сегодня?",
+        reply_markup=confirm_keyboard("reset_activity", "cancel_reset_activity")
+    )
+
+
+@menu.button("📊 История активности")
+async def show_history(message: types.Message):
+    hist = await activity.get_history(message.from_user.id, 7)
+    msg = "История активности за 7 дней:\n"
+    for d, steps, workout in reversed(hist):
+        w = "✅" if workout else "❌"
+        msg += f"{d}: {steps} шагов, тренировка: {w}\n"
+    await message.answer(msg)
+
+
+@menu.state("add_steps")
+async def add_steps(message: types.Message):
+    user_id = message.from_user.id
+    try:
+        steps = int(message.text)
+        await activity.add_steps(user_id, steps)
+        today = await activity.get_today(user_id)
+        await message.answer(
+            f"✅ Добавлено {steps} шагов\n\nВсего: {today['steps']} шагов",
+            reply_markup=activity_menu
+        )
+        await states.clear(message.chat.id, user_id)
+    except ValueError:
+        await message.answer("Пожалуйста, введите число:")
+
+
+@menu.callback("reset_activity")
+async def reset_activity(call: types.CallbackQuery):
+    await activity.reset_activity(call.from_user.id)
+    await call.message.answer("✅ Активность сброшена", reply_markup=activity_menu)
+
+
+@menu.callback("cancel_reset_activity")
+async def cancel_reset(call: types.CallbackQuery):
+    await call.message.answer("Действие отменено", reply_markup=activity_menu)
@@ -0,0 +1,86 @@
+from aiogram import types
+from aiogram.types import ReplyKeyboardRemove
+
+from utils import calories
+from utils.state import states
+from .keyboards import calories_menu, confirm_keyboard
+from .router import menu
+
+
+@menu.button("🍽 Калории")
+async def show_calories(message: types.Message):
+    today = await calories.get_today(message.from_user.id)
+    await message.answer(
+        f"🍽 Трекер калорий\n\nЛимит: {today['limit']} ккал\nОсталось: {today['left']} ккал\n\nЧто сделать?",
+        reply_markup=calories_menu
+    )
+
+
+@menu.button("➖ Вычесть калории")
+async def ask_calories(message: types.Message):
+    await message.answer("Сколько калорий вычесть? Введите число:", reply_markup=ReplyKeyboardRemove())
+    await states.set(message.chat.id, message.from_user.id, "subtract_calories")
+
+
+@menu.button("🔄 Сбросить остаток")
+async def confirm_reset(message: types.Message):
+    await message.answer(
+        "Вы точно уверены, что хотите обнулить остаток калорий на сегодня?",
+        reply_markup=confirm_keyboard("reset_calories", "cancel_reset")
+    )
+
+
+@menu.button("✏️ Изменить лимит")
+async def ask_limit(message: types.Message):
+    await message.answer("Введите новый лимит калорий на день:", reply_markup=ReplyKeyboardRemove())
+    await states.set(message.chat.id, message.from_user.id, "set_limit")
+
+
+@menu.button("📊 История")
+async def show_history(message: types.Message):
+    hist = await calories.get_history(message.from_user.id, 7)
+    msg = "История за 7 дней:\n"
+    for d, lim, used in reversed(hist):
+        msg += f"{d}: {used}/{lim} ккал\n"
+    await message.answer(msg)
+
+
+@menu.state("subtract_calories")
+async def subtract_calories(message: types.Message):
+    user_id = message.from_user.id
+    try:
+        amount = int(message.text)
+        await calories.add_calories(user_id, amount)
+        today = await calories.get_today(user_id)
+        await message.answer(
+            f"✅ Вычтено {amount} ккал\n\nОсталось: {today['left']} ккал",
+            reply_markup=calories_menu
+        )
+        await states.clear(message.chat.id, user_id)
+    except ValueError:
+        await message.answer("Пожалуйста, введите число:")
+
+
+@menu.state("set_limit")
+async def set_limit(message: types.Message):
+    try:
+        limit = int(message.text)
+        await calories.set_limit(message.from_user.id, limit)
+        await message.answer(
+            f"✅ Лимит калорий установлен: {limit} ккал",
+            reply_markup=calories_menu
+        )
+        await states.clear(message.chat.id, message.from_user.id)
+    except ValueError:
+        await message.answer("Пожалуйста, введите число:")
+
+
+@menu.callback("reset_calories")
+async def reset_calories(call: types.CallbackQuery):
+    await calories.reset_calories(call.from_user.id)
+    await call.message.answer("✅ Остаток калорий сброшен", reply_markup=calories_menu)
+
+
+@menu.callback("cancel_reset")
+async def cancel_reset(call: types.CallbackQuery):
+    await call.message.answer("Действие отменено", reply_markup=calories_menu)
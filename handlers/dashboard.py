@@ -0,0 +1,20 @@
+from aiogram import types
+
+from utils import dashboard
+from .keyboards import main_menu
+from .router import menu
+
+
+@menu.button("📈 Сегодня")
+async def show_today(message: types.Message):
+    today = await dashboard.get_today(message.from_user.id)
+    workout = "✅" if today['workout'] else "❌"
+    await message.answer(
+        f"📈 Сегодня\n\n"
+        f"🍽 Калории: {today['calories']['consumed']} из {today['calories']['limit']} ккал (осталось {today['calories']['left']})\n"
+        f"💧 Вода: {today['water']['consumed']} из {today['water']['limit']} мл (осталось {today['water']['left']})\n"
+        f"🏃‍♂️ Шаги: {today['steps']}\n"
+        f"🏋️ Тренировка: {workout}\n"
+        f"⚖️ Вес: {today['weight'] if today['weight'] else 'не введён'} кг",
+        reply_markup=main_menu
+    )
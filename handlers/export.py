@@ -0,0 +1,52 @@
+import logging
+import os
+from datetime import datetime
+
+from aiogram import Router, types
+from aiogram.filters import Command, CommandObject
+from aiogram.types import FSInputFile
+
+from utils import export
+
+logger = logging.getLogger(__name__)
+
+# Команды проверяются раньше таблицы меню, поэтому у раздела свой Router
+router = Router(name='export')
+
+# Форматы /export: аргумент команды -> формат файлов в архиве
+EXPORT_FORMATS = {'csv': 'csv', 'json': 'jsonl', 'jsonl': 'jsonl'}
+
+# Предел размера файла, который бот может отправить через Bot API
+MAX_DOCUMENT_BYTES = 50 * 1024 * 1024
+
+
+@router.message(Command("export"))
+async def cmd_export(message: types.Message, command: CommandObject):
+    """Выгрузка всей истории трекеров и записей: /export [csv|json]"""
+    fmt = EXPORT_FORMATS.get((command.args or 'csv').strip().lower())
+    if fmt is None:
+        await message.answer("Использование: /export [csv|json]")
+        return
+
+    await message.answer("⏳ Готовлю выгрузку...")
+    try:
+        result = await export.export_user(message.from_user.id, fmt)
+    except Exception as e:
+        logger.error("Ошибка выгрузки истории: %s", e)
+        await message.answer("Не удалось подготовить выгрузку. Пожалуйста, попробуйте позже.")
+        return
+    try:
+        if result['bytes'] > MAX_DOCUMENT_BYTES:
+            await message.answer("Выгрузка получилась больше 50 МБ, Telegram не позволяет её отправить.")
+            return
+        counts = ', '.join(f"{table}: {count}" for table, count in result['rows'].items())
+        filename = f"export_{datetime.now().strftime('%Y-%m-%d')}.zip"
+        await message.answer_document(
+            FSInputFile(result['path'], filename=filename),
+            caption=f"📦 Вся история ({fmt}). Записей - {counts}"
+        )
+    except Exception as e:
+        logger.error("Ошибка отправки выгрузки: %s", e)
+        await message.answer("Не удалось отправить выгрузку. Пожалуйста, попробуйте позже.")
+    finally:
+        os.remove(result['path'])
@@ -0,0 +1,32 @@
+from aiogram import types
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+
+from utils.faq import get_faq_list, get_faq_answer
+from .keyboards import faq_menu
+from .router import menu
+
+
+@menu.button("❓ Вопрос тренеру")
+async def show_faq(message: types.Message):
+    await message.answer(
+        "Ты можешь выбрать частый вопрос!",
+        reply_markup=faq_menu
+    )
+
+
+@menu.button("❓ Частые вопросы")
+async def show_questions(message: types.Message):
+    faq_list = await get_faq_list()
+    kb = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=q, callback_data=f"faq_{id}")] for id, q, _ in faq_list
+    ])
+    await message.answer("Выбери вопрос:", reply_markup=kb)
+
+
+@menu.callback_prefix("faq")
+async def show_answer(call: types.CallbackQuery, faq_id: str):
+    question, answer = await get_faq_answer(int(faq_id))
+    await call.message.answer(
+        f"❓ {question}\n\n{answer}",
+        reply_markup=faq_menu
+    )
@@ -0,0 +1,53 @@
+from aiogram import Router, types
+from aiogram.filters import Command, CommandObject
+
+from utils import history
+
+# Команды проверяются раньше таблицы меню, поэтому у раздела свой Router
+router = Router(name='history')
+
+# Периоды для /history: дней и детализация по умолчанию
+HISTORY_PERIODS = {
+    'week': (7, 'day'),
+    'month': (30, 'day'),
+    'quarter': (91, 'week'),
+    'year': (365, 'month'),
+}
+
+
+@router.message(Command("history"))
+async def cmd_history(message: types.Message, command: CommandObject):
+    """История трекеров: /history [week|month|quarter|year|<дней>] [day|week|month]"""
+    args = (command.args or 'week').split()
+    if args[0] in HISTORY_PERIODS:
+        days, granularity = HISTORY_PERIODS[args[0]]
+    elif args[0].isdigit() and 0 < int(args[0]) <= 3660:
+        days = int(args[0])
+        granularity = 'day' if days <= 31 else 'week' if days <= 183 else 'month'
+    else:
+        await message.answer("Использование: /history [week|month|quarter|year|<дней>] [day|week|month]")
+        return
+    if len(args) > 1:
+        if args[1] not in history.GRANULARITIES:
+            await message.answer("Детализация: day, week или month")
+            return
+        granularity = args[1]
+
+    series = await history.get_series(message.from_user.id, days, granularity)
+    if not series:
+        await message.answer(f"За {days} дн. записей нет.")
+        return
+    titles = {'day': 'по дням', 'week': 'по неделям', 'month': 'по месяцам'}
+    msg = f"📊 История за {days} дн. ({titles[granularity]}):\n\n"
+    for bucket in reversed(series):
+        line = f"{bucket['start']}: 🍽 {bucket['calories']} ккал, 💧 {bucket['water']} мл, 🏃‍♂️ {bucket['steps']} шагов"
+        if bucket['workouts']:
+            line += f", 🏋️ {bucket['workouts']}"
+        if bucket['weight'] is not None:
+            line += f", ⚖️ {bucket['weight']} кг"
+        msg += line + "\n"
+    # Длинная история (например, год по дням) делится на сообщения в пределах лимита Telegram
+    while msg:
+        cut = msg.rfind("\n", 0, 4000) + 1 if len(msg) > 4000 else len(msg)
+        await message.answer(msg[:cut])
+        msg = msg[cut:]
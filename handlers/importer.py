@@ -0,0 +1,87 @@
+import logging
+import os
+import tempfile
+import time
+
+from aiogram import Router, types
+from aiogram.filters import Command
+
+from utils import importer
+from utils.state import states
+from .router import menu
+
+logger = logging.getLogger(__name__)
+
+# Команды проверяются раньше таблицы меню, поэтому у раздела свой Router
+router = Router(name='import')
+
+# Предел размера файла, который бот может скачать через Bot API
+MAX_DOWNLOAD_BYTES = 20 * 1024 * 1024
+
+# Как часто обновлять сообщение о ходе импорта, секунды
+PROGRESS_INTERVAL = 2
+
+IMPORT_HELP = (
+    "Пришли файл с историей:\n"
+    "• архив .zip из /export;\n"
+    "• или CSV / JSON Lines / JSON (массив объектов) с именем трекера: calories.csv (date, calories), water.csv (date, amount), "
+    "activity.csv (date, steps, workout), weight.csv (date, weight), notes.csv (date, type, content).\n\n"
+    "Даты в формате ГГГГ-ММ-ДД. Калории и вода добавляются к имеющимся записям, шаги прибавляются "
+    "к дню, вес за день заменяется."
+)
+
+
+@router.message(Command("import"))
+async def cmd_import(message: types.Message):
+    """Импорт истории из файла: /import в подписи к файлу или файл следующим сообщением"""
+    if message.document is None:
+        await message.answer(IMPORT_HELP)
+        await states.set(message.chat.id, message.from_user.id, "import_file")
+        return
+    await run_import(message)
+
+
+@menu.state("import_file")
+async def receive_file(message: types.Message):
+    if message.document is None:
+        await message.answer("Пришли файл .csv, .jsonl, .json или архив .zip из /export:")
+        return
+    await states.clear(message.chat.id, message.from_user.id)
+    await run_import(message)
+
+
+async def run_import(message: types.Message):
+    document = message.document
+    if document.file_size and document.file_size > MAX_DOWNLOAD_BYTES:
+        await message.answer("Файл больше 20 МБ, Telegram не позволяет боту его скачать. Раздели его на части.")
+        return
+
+    status = await message.answer("⏳ Загружаю файл...")
+    fd, path = tempfile.mkstemp(prefix='import_', suffix=os.path.splitext(document.file_name or '')[1])
+    os.close(fd)
+    last_update = time.monotonic()
+
+    async def progress(rows: int):
+        nonlocal last_update
+        if time.monotonic() - last_update >= PROGRESS_INTERVAL:
+            last_update = time.monotonic()
+            await status.edit_text(f"⏳ Импортировано строк: {rows}")
+
+    try:
+        await message.bot.download(document, destination=path)
+        result = await importer.import_file(message.from_user.id, path, document.file_name or '', progress)
+    except ValueError as e:
+        await status.edit_text(f"❌ {e}")
+        return
+    except Exception:
+        logger.exception("Ошибка импорта истории")
+        await status.edit_text("❌ Не удалось импортировать файл. Пожалуйста, попробуйте позже.")
+        return
+    finally:
+        os.remove(path)
+
+    counts = ', '.join(f"{table}: {count}" for table, count in result['rows'].items()) or 'нет'
+    msg = f"✅ Импорт завершён. Записей - {counts}\nДней в статистике: {result['days']}"
+    if result['skipped']:
+        msg += f"\n\nПропущено строк с ошибками: {result['skipped']}\n" + "\n".join(result['errors'])
+    await message.answer(msg[:4000])
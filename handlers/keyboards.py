@@ -0,0 +1,79 @@
+from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
+
+# Главное меню
+main_menu = ReplyKeyboardMarkup(
+    keyboard=[
+        [KeyboardButton(text="🍽 Калории"), KeyboardButton(text="💧 Вода")],
+        [KeyboardButton(text="🏃‍♂️ Активность"), KeyboardButton(text="⚖️ Вес")],
+        [KeyboardButton(text="📅 Планы и мысли"), KeyboardButton(text="🤖 Совет дня")],
+        [KeyboardButton(text="📈 Сегодня"), KeyboardButton(text="❓ Вопрос тренеру")],
+    ],
+    resize_keyboard=True
+)
+
+# Кнопки для трекера калорий
+calories_menu = ReplyKeyboardMarkup(
+    keyboard=[
+        [KeyboardButton(text="➖ Вычесть калории"), KeyboardButton(text="🔄 Сбросить остаток")],
+        [KeyboardButton(text="✏️ Изменить лимит"), KeyboardButton(text="📊 История")],
+        [KeyboardButton(text="⬅️ В меню")],
+    ],
+    resize_keyboard=True
+)
+
+# Кнопки для трекера воды
+water_menu = ReplyKeyboardMarkup(
+    keyboard=[
+        [KeyboardButton(text="➖ Выпил воды"), KeyboardButton(text="🔄 Сбросить воду")],
+        [KeyboardButton(text="✏️ Изменить лимит воды"), KeyboardButton(text="📊 История воды")],
+        [KeyboardButton(text="⬅️ В меню")],
+    ],
+    resize_keyboard=True
+)
+
+# Кнопки для трекера активности
+activity_menu = ReplyKeyboardMarkup(
+    keyboard=[
+        [KeyboardButton(text="➕ Добавить шаги"), KeyboardButton(text="🏋️‍♂️ Отметить тренировку")],
+        [KeyboardButton(text="🔄 Сбросить активность"), KeyboardButton(text="📊 История активности")],
+        [KeyboardButton(text="⬅️ В меню")],
+    ],
+    resize_keyboard=True
+)
+
+# Кнопки для трекера веса
+weight_menu = ReplyKeyboardMarkup(
+    keyboard=[
+        [KeyboardButton(text="➕ Ввести вес"), KeyboardButton(text="🔄 Сбросить вес")],
+        [KeyboardButton(text="📊 История веса")],
+        [KeyboardButton(text="⬅️ В меню")],
+    ],
+    resize_keyboard=True
+)
+
+# Кнопки для раздела планов и мыслей
+notes_menu = ReplyKeyboardMarkup(
+    keyboard=[
+        [KeyboardButton(text="📝 Записать план"), KeyboardButton(text="💭 Записать мысль")],
+        [KeyboardButton(text="📋 Сегодняшние записи"), KeyboardButton(text="📚 История записей")],
+        [KeyboardButton(text="⬅️ В меню")],
+    ],
+    resize_keyboard=True
+)
+
+# Кнопки для раздела FAQ
+faq_menu = ReplyKeyboardMarkup(
+    keyboard=[
+        [KeyboardButton(text="❓ Частые вопросы")],
+        [KeyboardButton(text="⬅️ В меню")],
+    ],
+    resize_keyboard=True
+)
+
+
+def confirm_keyboard(confirm_data: str, cancel_data: str) -> InlineKeyboardMarkup:
+    """Подтверждение сброса: "Да" и "Нет" с заданной callback_data"""
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="✅ Да, сбросить", callback_data=confirm_data)],
+        [InlineKeyboardButton(text="❌ Нет", callback_data=cancel_data)],
+    ])
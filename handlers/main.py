@@ -0,0 +1,18 @@
+import random
+
+from aiogram import types
+
+from utils.motivation import get_random_nutrition_tip, get_random_fitness_tip
+from .keyboards import main_menu
+from .router import menu
+
+
+@menu.button("⬅️ В меню")
+async def back_to_menu(message: types.Message):
+    await message.answer("Выбери раздел:", reply_markup=main_menu)
+
+
+@menu.button("🤖 Совет дня")
+async def daily_tip(message: types.Message):
+    tip = await get_random_nutrition_tip() if random.choice([True, False]) else await get_random_fitness_tip()
+    await message.answer(f"Совет дня: {tip}")
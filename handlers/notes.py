@@ -0,0 +1,77 @@
+from aiogram import types
+from aiogram.types import ReplyKeyboardRemove
+
+from utils import notes
+from utils.state import states
+from .keyboards import notes_menu
+from .router import menu
+
+
+@menu.button("📅 Планы и мысли")
+async def show_notes(message: types.Message):
+    await message.answer(
+        "Здесь ты можешь записывать свои планы и мысли. Это поможет отслеживать прогресс и анализировать свой путь!",
+        reply_markup=notes_menu
+    )
+
+
+@menu.button("📝 Записать план")
+async def ask_plan(message: types.Message):
+    await message.answer("Напиши свой план:", reply_markup=ReplyKeyboardRemove())
+    await states.set(message.chat.id, message.from_user.id, "add_plan")
+
+
+@menu.button("💭 Записать мысль")
+async def ask_thought(message: types.Message):
+    await message.answer("Запиши свою мысль:", reply_markup=ReplyKeyboardRemove())
+    await states.set(message.chat.id, message.from_user.id, "add_thought")
+
+
+@menu.button("📋 Сегодняшние записи")
+async def show_today(message: types.Message):
+    today_notes = await notes.get_today_notes(message.from_user.id)
+    if today_notes:
+        msg = "Записи за сегодня:\n\n"
+        for type_, content in today_notes:
+            emoji = "📝" if type_ == "plan" else "💭"
+            msg += f"{emoji} {content}\n"
+    else:
+        msg = "На сегодня пока нет записей."
+    await message.answer(msg, reply_markup=notes_menu)
+
+
+@menu.button("📚 История записей")
+async def show_history(message: types.Message):
+    hist = await notes.get_history(message.from_user.id, 7)
+    if hist:
+        msg = "История записей за неделю:\n\n"
+        current_date = None
+        for date, type_, content in hist:
+            if date != current_date:
+                current_date = date
+                msg += f"\n📅 {date}:\n"
+            emoji = "📝" if type_ == "plan" else "💭"
+            msg += f"{emoji} {content}\n"
+    else:
+        msg = "История пуста."
+    await message.answer(msg)
+
+
+@menu.state("add_plan")
+async def add_plan(message: types.Message):
+    await notes.add_note(message.from_user.id, "plan", message.text)
+    await message.answer(
+        "✅ План сохранен",
+        reply_markup=notes_menu
+    )
+    await states.clear(message.chat.id, message.from_user.id)
+
+
+@menu.state("add_thought")
+async def add_thought(message: types.Message):
+    await notes.add_note(message.from_user.id, "thought", message.text)
+    await message.answer(
+        "✅ Мысль сохранена",
+        reply_markup=notes_menu
+    )
+    await states.clear(message.chat.id, message.from_user.id)
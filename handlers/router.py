@@ -0,0 +1,126 @@
+import logging
+import time
+
+from aiogram import Router, types
+
+from logger import log_event
+from utils.metrics import MENU_ACTION_SECONDS
+from utils.state import states
+
+logger = logging.getLogger(__name__)
+
+
+class MenuRouter(Router):
+    """Router кнопок меню, ответов на запросы ввода и inline-кнопок по таблицам
+
+    Модули разделов регистрируют обработчики декораторами button, state,
+    callback и callback_prefix. Router подключает по одному обработчику
+    сообщений и нажатий, которые находят нужную функцию поиском в словаре,
+    поэтому стоимость разбора апдейта не зависит от числа кнопок. Кнопка
+    меню важнее ожидаемого ввода: нажатие кнопки во время ввода числа
+    открывает раздел, как и раньше. Время каждого найденного обработчика
+    попадает в метрику bot_menu_action_seconds с меткой "раздел.функция".
+    """
+
+    def __init__(self, name: str = None):
+        super().__init__(name=name)
+        self.buttons = {}  # текст кнопки -> обработчик(message)
+        self.states = {}  # состояние диалога -> обработчик(message)
+        self.callbacks = {}  # callback_data -> обработчик(call)
+        self.callback_prefixes = {}  # префикс до "_" включительно -> обработчик(call, остаток)
+        self.message.register(self._on_message)
+        self.callback_query.register(self._on_callback)
+
+    @staticmethod
+    def _add(table: dict, key: str, handler, kind: str):
+        if key in table:
+            raise ValueError(f"{kind} {key!r} уже обрабатывается {table[key].__module__}.{table[key].__name__}")
+        table[key] = handler
+
+    def button(self, *texts: str):
+        """Обработчик нажатия кнопок меню с заданным текстом"""
+        def register(handler):
+            for text in texts:
+                self._add(self.buttons, text, handler, 'Кнопка')
+            return handler
+        return register
+
+    def state(self, *names: str):
+        """Обработчик ввода пользователя в заданном состоянии диалога"""
+        def register(handler):
+            for name in names:
+                self._add(self.states, name, handler, 'Состояние')
+            return handler
+        return register
+
+    def callback(self, *data: str):
+        """Обработчик inline-кнопок с точно совпадающей callback_data"""
+        def register(handler):
+            for value in data:
+                self._add(self.callbacks, value, handler, 'Callback')
+            return handler
+        return register
+
+    def callback_prefix(self, prefix: str):
+        """Обработчик inline-кнопок вида "<prefix>_<значение>"; значение передаётся вторым аргументом"""
+        def register(handler):
+            self._add(self.callback_prefixes, prefix + '_', handler, 'Префикс callback')
+            return handler
+        return register
+
+    def resolve(self, text, state):
+        """Обработчик сообщения: по тексту кнопки, затем по состоянию диалога; None - не обрабатывается"""
+        handler = self.buttons.get(text)
+        if handler is None and state is not None:
+            handler = self.states.get(state)
+        return handler
+
+    def resolve_callback(self, data: str):
+        """Обработчик нажатия и остаток callback_data для префиксных кнопок"""
+        handler = self.callbacks.get(data)
+        if handler is not None:
+            return handler, None
+        prefix, separator, rest = data.partition('_')
+        handler = self.callback_prefixes.get(prefix + separator)
+        return (handler, rest) if handler is not None else (None, None)
+
+    @staticmethod
+    def action_name(handler) -> str:
+        """Метка обработчика в метриках: модуль раздела и имя функции"""
+        return f"{handler.__module__.rpartition('.')[2]}.{handler.__name__}"
+
+    async def _on_message(self, message: types.Message):
+        try:
+            log_event(logger, 'menu.message', user=message.from_user.id, text=message.text)
+            handler = self.resolve(message.text, states.get(message.chat.id, message.from_user.id))
+            if handler is not None:
+                started = time.perf_counter()
+                try:
+                    await handler(message)
+                finally:
+                    MENU_ACTION_SECONDS.observe(time.perf_counter() - started, self.action_name(handler))
+        except Exception as e:
+            logger.error("Ошибка в handle_menu: %s", e)
+            await message.answer("Произошла ошибка. Пожалуйста, попробуйте позже.")
+
+    async def _on_callback(self, call: types.CallbackQuery):
+        try:
+            log_event(logger, 'menu.callback', user=call.from_user.id, data=call.data)
+            handler, rest = self.resolve_callback(call.data or '')
+            if handler is None:
+                return
+            started = time.perf_counter()
+            try:
+                if rest is None:
+                    await handler(call)
+                else:
+                    await handler(call, rest)
+            finally:
+                MENU_ACTION_SECONDS.observe(time.perf_counter() - started, self.action_name(handler))
+        except Exception as e:
+            logger.error("Ошибка в handle_callback: %s", e)
+            await call.message.answer("Произошла ошибка. Пожалуйста, попробуйте позже.")
+
+
+# Единый экземпляр на процесс
+menu = MenuRouter(name='menu')
@@ -0,0 +1,86 @@
+from aiogram import types
+from aiogram.types import ReplyKeyboardRemove
+
+from utils import water
+from utils.state import states
+from .keyboards import water_menu, confirm_keyboard
+from .router import menu
+
+
+@menu.button("💧 Вода")
+async def show_water(message: types.Message):
+    today = await water.get_today(message.from_user.id)
+    await message.answer(
+        f"💧 Трекер воды\n\nЛимит: {today['limit']} мл\nОсталось: {today['left']} мл\n\nЧто сделать?",
+        reply_markup=water_menu
+    )
+
+
+@menu.button("➖ Выпил воды")
+async def ask_water(message: types.Message):
+    await message.answer("Сколько мл воды выпито? Введите число:", reply_markup=ReplyKeyboardRemove())
+    await states.set(message.chat.id, message.from_user.id, "subtract_water")
+
+
+@menu.button("🔄 Сбросить воду")
+async def confirm_reset(message: types.Message):
+    await message.answer(
+        "Вы точно уверены, что хотите обнулить остаток воды на сегодня?",
+        reply_markup=confirm_keyboard("reset_water", "cancel_reset_water")
+    )
+
+
+@menu.button("✏️ Изменить лимит воды")
+async def ask_limit(message: types.Message):
+    await message.answer("Введите новый лимит воды на день (в мл):", reply_markup=ReplyKeyboardRemove())
+    await states.set(message.chat.id, message.from_user.id, "set_water_limit")
+
+
+@menu.button("📊 История воды")
+async def show_history(message: types.Message):
+    hist = await water.get_history(message.from_user.id, 7)
+    msg = "История воды за 7 дней:\n"
+    for d, lim, used in reversed(hist):
+        msg += f"{d}: {used}/{lim} мл\n"
+    await message.answer(msg)
+
+
+@menu.state("subtract_water")
+async def subtract_water(message: types.Message):
+    user_id = message.from_user.id
+    try:
+        amount = int(message.text)
+        await water.add_water(user_id, amount)
+        today = await water.get_today(user_id)
+        await message.answer(
+            f"✅ Добавлено {amount} мл воды\n\nОсталось: {today['left']} мл",
+            reply_markup=water_menu
+        )
+        await states.clear(message.chat.id, user_id)
+    except ValueError:
+        await message.answer("Пожалуйста, введите число:")
+
+
+@menu.state("set_water_limit")
+async def set_limit(message: types.Message):
+    try:
+        limit = int(message.text)
+        await water.set_limit(message.from_user.id, limit)
+        await message.answer(
+            f"✅ Лимит воды установлен: {limit} мл",
+            reply_markup=water_menu
+        )
+        await states.clear(message.chat.id, message.from_user.id)
+    except ValueError:
+        await message.answer("Пожалуйста, введите число:")
+
+
+@menu.callback("reset_water")
+async def reset_water(call: types.CallbackQuery):
+    await water.reset_water(call.from_user.id)
+    await call.message.answer("✅ Остаток воды сброшен", reply_markup=water_menu)
+
+
+@menu.callback("cancel_reset_water")
+async def cancel_reset(call: types.CallbackQuery):
+    await call.message.answer("Действие отменено", reply_markup=water_menu)
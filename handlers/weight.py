@@ -0,0 +1,62 @@
+from aiogram import types
+from aiogram.types import ReplyKeyboardRemove
+
+from utils import weight
+from utils.state import states
+from .keyboards import weight_menu, confirm_keyboard
+from .router import menu
+
+
+@menu.button("⚖️ Вес")
+async def show_weight(message: types.Message):
+    today = await weight.get_today(message.from_user.id)
+    msg = f"⚖️ Трекер веса\n\nТекущий вес: {today if today else 'не введён'} кг\n\nЧто сделать?"
+    await message.answer(msg, reply_markup=weight_menu)
+
+
+@menu.button("➕ Ввести вес")
+async def ask_weight(message: types.Message):
+    await message.answer("Введи свой вес (кг):", reply_markup=ReplyKeyboardRemove())
+    await states.set(message.chat.id, message.from_user.id, "add_weight")
+
+
+@menu.button("🔄 Сбросить вес")
+async def confirm_reset(message: types.Message):
+    await message.answer(
+        "Ты точно хочешь удалить вес за сегодня?",
+        reply_markup=confirm_keyboard("reset_weight", "cancel_reset_weight")
+    )
+
+
+@menu.button("📊 История веса")
+async def show_history(message: types.Message):
+    hist = await weight.get_history(message.from_user.id, 14)
+    msg = "История веса за 2 недели:\n"
+    for d, v in reversed(hist):
+        msg += f"{d}: {v} кг\n"
+    await message.answer(msg)
+
+
+@menu.state("add_weight")
+async def add_weight(message: types.Message):
+    try:
+        weight_value = float(message.text)
+        await weight.add_weight(message.from_user.id, weight_value)
+        await message.answer(
+            f"✅ Вес {weight_value} кг сохранен",
+            reply_markup=weight_menu
+        )
+        await states.clear(message.chat.id, message.from_user.id)
+    except ValueError:
+        await message.answer("Пожалуйста, введите число:")
+
+
+@menu.callback("reset_weight")
+async def reset_weight(call: types.CallbackQuery):
+    await weight.reset_weight(call.from_user.id)
+    await call.message.answer("✅ Вес сброшен", reply_markup=weight_menu)
+
+
+@menu.callback("cancel_reset_weight")
+async def cancel_reset(call: types.CallbackQuery):
+    await call.message.answer("Действие отменено", reply_markup=weight_menu)
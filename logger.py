@@ -1,26 +1,180 @@
+import atexit
+import json
 import logging
 import os
-from pathlib import Path
-from config import LOG_LEVEL, LOG_FORMAT
-
-# Создаем директорию для логов, если она не существует
-log_dir = Path(__file__).parent / 'logs'
-os.makedirs(log_dir, exist_ok=True)
-
-# Настраиваем логгер
-logger = logging.getLogger('selfrealization_bot')
-logger.setLevel(LOG_LEVEL)
-
-# Создаем обработчик для записи в файл
-file_handler = logging.FileHandler(log_dir / 'bot.log')
-file_handler.setLevel(LOG_LEVEL)
-file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
-
-# Создаем обработчик для вывода в консоль
-console_handler = logging.StreamHandler()
-console_handler.setLevel(LOG_LEVEL)
-console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
-
-# Добавляем обработчики к логгеру
-logger.addHandler(file_handler)
-logger.addHandler(console_handler) 
\ No newline at end of file
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+
+from config import LOG_LEVEL, LOG_DIR, LOG_BACKUP_DAYS, LOG_QUEUE_SIZE, LOG_SAMPLING
+
+# Доля записываемых событий по имени события или логгера, например {'menu.message': 0.1}
+_sampling = {}
+_listener = None
+
+
+def parse_sampling(value: str) -> dict:
+    """Разбор LOG_SAMPLING вида "menu.message=0.1,aiogram.event=0.01\""""
+    rates = {}
+    for item in value.split(','):
+        name, separator, rate = item.strip().partition('=')
+        if separator:
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+def _quote(value) -> str:
+    text = str(value)
+    if text and not any(char in text for char in ' "=\\\n\t'):
+        return text
+    return json.dumps(text, ensure_ascii=False)
+
+
+class KeyValues:
+    """Сообщение события: строка key=value собирается только при записи в журнал"""
+
+    __slots__ = ('event', 'fields')
+
+    def __init__(self, event: str, fields: dict):
+        self.event = event
+        self.fields = fields
+
+    def __str__(self):
+        return ' '.join([f'event={self.event}'] + [f'{key}={_quote(value)}' for key, value in self.fields.items()])
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Запись журнала одной строкой key=value: время, уровень, логгер, событие с полями или msg"""
+
+    default_time_format = '%Y-%m-%dT%H:%M:%S'
+    default_msec_format = '%s.%03d'
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = f'ts={self.formatTime(record)} level={record.levelname} logger={record.name} '
+        if isinstance(record.msg, KeyValues) and not record.args:
+            line += str(record.msg)
+        else:
+            line += f'msg={_quote(record.getMessage())}'
+        if record.exc_info:
+            line += f' exc={_quote(self.formatException(record.exc_info))}'
+        return line
+
+
+class SamplingFilter(logging.Filter):
+    """Выборка записей ниже WARNING по имени логгера (например, aiogram.event на каждый апдейт)
+
+    Подключается к обработчику очереди, поэтому действует и на логгеры
+    библиотек; доля берётся для логгера или ближайшего родителя из rates.
+    Отброшенная запись не форматируется и не попадает в очередь писателя.
+    """
+
+    def __init__(self, rates: dict):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        name = record.name
+        while name:
+            rate = self.rates.get(name)
+            if rate is not None:
+                return random.random() < rate
+            name = name.rpartition('.')[0]
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Передача записей фоновому писателю без форматирования в цикле событий
+
+    Сообщение и аргументы форматируются в потоке писателя, поэтому в запись
+    передаются неизменяемые значения. При переполнении очереди запись
+    отбрасывается и учитывается в dropped, цикл событий не ждёт диска.
+    """
+
+    def __init__(self, queue_):
+        super().__init__(queue_)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(level=LOG_LEVEL, log_dir: str = LOG_DIR, stream=sys.stdout,
+                  sampling: str = LOG_SAMPLING, queue_size: int = LOG_QUEUE_SIZE) -> NonBlockingQueueHandler:
+    """Единая настройка журнала процесса
+
+    Корневой логгер получает только обработчик очереди; файл log_dir/bot.log
+    (новый каждую полночь, хранится LOG_BACKUP_DAYS дней) и stream пишет
+    фоновый поток. log_dir=None или stream=None отключают файл или вывод.
+    Повторный вызов заменяет прежнюю настройку.
+    """
+    global _listener
+    shutdown_logging()
+
+    formatter = KeyValueFormatter()
+    handlers = []
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+        handlers.append(TimedRotatingFileHandler(
+            os.path.join(log_dir, 'bot.log'), when='midnight', backupCount=LOG_BACKUP_DAYS, encoding='utf-8'
+        ))
+    if stream is not None:
+        handlers.append(logging.StreamHandler(stream))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    _sampling.clear()
+    _sampling.update(parse_sampling(sampling) if isinstance(sampling, str) else sampling)
+    # Поток, процесс и задача asyncio записи не выводятся: не тратим на них время при создании записи
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    logging.logAsyncioTasks = False  # Python 3.12+
+
+    queue_handler = NonBlockingQueueHandler(queue.Queue(queue_size))
+    queue_handler.addFilter(SamplingFilter(_sampling))
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return queue_handler
+
+
+def shutdown_logging():
+    """Запись оставшихся в очереди записей и закрытие файлов (вызывается и при выходе)"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+def log_event(logger: logging.Logger, event: str, level: int = logging.INFO, **fields):
+    """Структурное событие: отбрасывается по уровню и выборке до создания записи
+
+    Поля форматируются как key=value в потоке писателя; передавайте числа и строки.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    rate = _sampling.get(event)
+    if rate is not None and level < logging.WARNING and random.random() >= rate:
+        return
+    logger.log(level, KeyValues(event, fields))
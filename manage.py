@@ -0,0 +1,84 @@
+"""Служебные команды для базы бота
+
+    python manage.py migrate                    применить миграции схемы
+    python manage.py rebuild-stats [--user ID]  пересчитать дневную статистику из записей трекеров
+    python manage.py compact [--keep-days N]    сжать старые записи воды и калорий до одной за день
+    python manage.py vacuum                     пересобрать файл базы с auto_vacuum=INCREMENTAL
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from logger import setup_logging
+from config import DB_AUTO_VACUUM, COMPACTION_KEEP_DAYS
+from utils import rollups
+from utils.compaction import Compactor
+from utils.database import init_db
+from utils.storage import storage
+
+
+async def cmd_migrate(args):
+    version = await init_db()
+    print(f"Версия схемы: {version}")
+
+
+async def cmd_rebuild_stats(args):
+    started = time.perf_counter()
+    days = await rollups.rebuild(args.user)
+    print(f"Пересчитано дней статистики: {days} за {time.perf_counter() - started:.2f} с")
+
+
+async def cmd_compact(args):
+    report = await Compactor(keep_days=args.keep_days).run()
+    for table, rows in report['rows'].items():
+        print(f"{table}: удалено строк {rows}")
+    print(f"Сжато дней: {report['days']} (записи до {report['cutoff']})")
+    print(f"Освобождено: {report['pages']} страниц, {max(report['bytes'], 0) / 1024 / 1024:.1f} МБ; "
+          f"размер базы {report['size_before'] / 1024 / 1024:.1f} -> {report['size_after'] / 1024 / 1024:.1f} МБ "
+          f"за {report['seconds']:.2f} с")
+
+
+async def cmd_vacuum(args):
+    before = os.path.getsize(storage.path)
+    started = time.perf_counter()
+    await storage.vacuum(DB_AUTO_VACUUM)
+    print(f"Размер базы {before / 1024 / 1024:.1f} -> {os.path.getsize(storage.path) / 1024 / 1024:.1f} МБ "
+          f"за {time.perf_counter() - started:.2f} с, auto_vacuum = {DB_AUTO_VACUUM}")
+
+
+COMMANDS = {
+    'migrate': cmd_migrate,
+    'rebuild-stats': cmd_rebuild_stats,
+    'compact': cmd_compact,
+    'vacuum': cmd_vacuum,
+}
+
+
+async def run(args):
+    await storage.start()
+    try:
+        # Команды работают со схемой последней версии
+        await init_db()
+        await COMMANDS[args.command](args)
+    finally:
+        await storage.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('migrate', help='применить миграции схемы')
+    rebuild = subparsers.add_parser('rebuild-stats', help='пересчитать дневную статистику из записей трекеров')
+    rebuild.add_argument('--user', type=int, help='только для одного пользователя')
+    compact = subparsers.add_parser('compact', help='сжать старые записи воды и калорий до одной за день')
+    compact.add_argument('--keep-days', type=int, default=COMPACTION_KEEP_DAYS, help='дней без сжатия')
+    subparsers.add_parser('vacuum', help='пересобрать файл базы (без работающего бота)')
+    args = parser.parse_args()
+
+    setup_logging(log_dir=None)
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Модули бота (utils, handlers, config) импортируются из корня репозитория
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.database import init_db  # noqa: E402
+from utils.storage import storage  # noqa: E402
+
+
+def pytest_addoption(parser):
+    parser.addoption('--startup-budget', type=float, default=6.0,
+                     help='допустимая медиана времени до первого ответа после запуска, секунды')
+    parser.addoption('--startup-runs', type=int, default=3, help='запусков бота в тесте времени запуска')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'slow: долгий тест (пропуск: -m "not slow")')
+
+
+class FakeClock:
+    """Искусственные часы: время меняется только присваиванием now"""
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def run_with_storage(tmp_path):
+    """Запуск сценария с базой, созданной миграциями, в собственном цикле событий"""
+    def run(scenario, name: str = 'bot.db'):
+        async def main():
+            await storage.start(str(tmp_path / name))
+            try:
+                await init_db()
+                return await scenario()
+            finally:
+                await storage.close()
+        return asyncio.run(main())
+    return run
@@ -0,0 +1,137 @@
+"""Сжатие старых записей воды и калорий: итоги, статистика и история не меняются
+
+Проверяется, что после прохода compaction.Compactor суммы по дням, statistics,
+statistics_periods и история по дням, неделям и месяцам те же, что до него,
+что записи за сегодня и последние keep_days дней не тронуты, что запись,
+добавленная между отбором дней и сжатием, не теряется, и что повторный
+проход ничего не меняет.
+"""
+import random
+from datetime import date, datetime, timedelta
+
+from utils import history, rollups
+from utils.compaction import Compactor
+from utils.storage import storage
+
+USERS = 3
+DAYS = 60
+KEEP_DAYS = 7
+ENTRIES = 4
+
+DAY_TOTALS = '''
+    SELECT 'water', user_id, date, SUM(amount), MAX(created_at) FROM water GROUP BY user_id, date
+    UNION ALL
+    SELECT 'calories', user_id, date, SUM(calories), NULL FROM calories GROUP BY user_id, date
+    ORDER BY 1, 2, 3
+'''
+
+
+async def fill():
+    """Несколько записей воды и калорий в день за DAYS дней, включая сегодня, и статистика по ним"""
+    random.seed(11)
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    water_rows, calorie_rows = [], []
+    for user_id in range(1, USERS + 1):
+        for offset in range(DAYS):
+            day = today - timedelta(days=offset)
+            for entry in range(random.randint(1, ENTRIES)):
+                water_rows.append((user_id, day.strftime('%Y-%m-%d'), random.randint(50, 500),
+                                   day.timestamp() + entry * 3600))
+                calorie_rows.append((user_id, day.strftime('%Y-%m-%d'), random.randint(50, 900)))
+    await storage.executemany('INSERT INTO water (user_id, date, amount, created_at) VALUES (?, ?, ?, ?)',
+                              water_rows)
+    await storage.executemany('INSERT INTO calories (user_id, date, calories) VALUES (?, ?, ?)', calorie_rows)
+    await rollups.rebuild()
+
+
+async def snapshot(cutoff: str):
+    """Всё, что читает бот по записям воды и калорий, и сами записи с cutoff"""
+    series = {
+        (user_id, granularity): await history.get_series(user_id, DAYS + 31, granularity)
+        for user_id in range(1, USERS + 1) for granularity in history.GRANULARITIES
+    }
+    return {
+        'days': await storage.fetchall(DAY_TOTALS),
+        'statistics': await storage.fetchall('SELECT * FROM statistics ORDER BY user_id, date'),
+        'periods': await storage.fetchall('SELECT * FROM statistics_periods ORDER BY user_id, period, start'),
+        'history': series,
+        'recent_water': await storage.fetchall('SELECT * FROM water WHERE date >= ? ORDER BY id', (cutoff,)),
+        'recent_calories': await storage.fetchall('SELECT * FROM calories WHERE date >= ? ORDER BY id', (cutoff,)),
+    }
+
+
+def make_compactor():
+    # Маленькая пачка: проход идёт многими транзакциями и несколькими страницами дней
+    return Compactor(keep_days=KEEP_DAYS, interval=0, batch=10)
+
+
+def test_compaction_keeps_totals_and_recent_rows(run_with_storage):
+    async def scenario():
+        await fill()
+        compactor = make_compactor()
+        cutoff = (date.today() - timedelta(days=KEEP_DAYS)).isoformat()
+        before = await snapshot(cutoff)
+        report = await compactor.run()
+        after = await snapshot(cutoff)
+        old_days = await storage.fetchall('''
+            SELECT MAX(n) FROM (
+                SELECT COUNT(*) AS n FROM water WHERE date < ? GROUP BY user_id, date
+                UNION ALL
+                SELECT COUNT(*) FROM calories WHERE date < ? GROUP BY user_id, date
+            )
+        ''', (cutoff, cutoff))
+        return before, after, report, old_days[0][0]
+
+    before, after, report, max_rows_per_old_day = run_with_storage(scenario)
+    assert report['rows']['water'] > 0 and report['rows']['calories'] > 0
+    for key in before:
+        assert after[key] == before[key], key
+    assert before['recent_water'] and before['recent_calories']
+    # Старше окна остаётся одна запись на день
+    assert max_rows_per_old_day == 1
+
+
+def test_row_added_between_selection_and_collapse_survives(run_with_storage):
+    async def scenario():
+        await fill()
+        compactor = make_compactor()
+        old_day = (date.today() - timedelta(days=DAYS - 1)).isoformat()
+        collapse = compactor._collapse
+        added = []
+
+        async def collapse_after_insert(table, groups):
+            # Запись пользователя за уже отобранный день приходит до транзакции сжатия
+            if table == 'water' and not added and (1, old_day) in [group[:2] for group in groups]:
+                await storage.execute('INSERT INTO water (user_id, date, amount, created_at) VALUES (?, ?, ?, ?)',
+                                      (1, old_day, 777, 0))
+                added.append(777)
+            return await collapse(table, groups)
+
+        compactor._collapse = collapse_after_insert
+        before = await storage.fetchone('SELECT SUM(amount) FROM water WHERE user_id = 1 AND date = ?', (old_day,))
+        await compactor.run()
+        rows = await storage.fetchall('SELECT amount FROM water WHERE user_id = 1 AND date = ?', (old_day,))
+        return added, before[0], rows
+
+    added, before, rows = run_with_storage(scenario)
+    assert added == [777]
+    assert rows == [(before + 777,)]
+
+
+def test_second_run_is_noop(run_with_storage):
+    async def scenario():
+        await fill()
+        compactor = make_compactor()
+        await compactor.run()
+        water = await storage.fetchall('SELECT * FROM water ORDER BY id')
+        calories = await storage.fetchall('SELECT * FROM calories ORDER BY id')
+        report = await compactor.run()
+        return (water, calories, report,
+                await storage.fetchall('SELECT * FROM water ORDER BY id'),
+                await storage.fetchall('SELECT * FROM calories ORDER BY id'))
+
+    water, calories, report, water_after, calories_after = run_with_storage(scenario)
+    assert report['rows'] == {'water': 0, 'calories': 0}
+    assert report['days'] == 0
+    assert water_after == water
+    assert calories_after == calories
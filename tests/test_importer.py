@@ -0,0 +1,140 @@
+"""Импорт истории из файлов: форматы, ошибки строк, пачки и пересчёт статистики"""
+import json
+
+import pytest
+
+from utils import importer, rollups
+from utils.storage import storage
+
+
+def write(tmp_path, name: str, content: str) -> str:
+    path = tmp_path / name
+    path.write_text(content, encoding='utf-8')
+    return str(path)
+
+
+async def statistics(column: str):
+    return await storage.fetchall(f'SELECT date, {column} FROM statistics WHERE user_id = 1 ORDER BY date')
+
+
+def test_csv_import_rebuilds_statistics(tmp_path, run_with_storage):
+    path = write(tmp_path, 'calories.csv', 'date,calories\n2024-01-01,500\n2024-01-01,300\n2024-01-02,700\n')
+
+    async def scenario():
+        result = await importer.import_file(1, path, 'calories.csv')
+        rows = await storage.fetchall('SELECT date, calories FROM calories WHERE user_id = 1 ORDER BY id')
+        return result, rows, await statistics('calories_consumed')
+
+    result, rows, stats = run_with_storage(scenario)
+    assert result == {'rows': {'calories': 3}, 'skipped': 0, 'errors': [], 'days': 2}
+    assert rows == [('2024-01-01', 500), ('2024-01-01', 300), ('2024-01-02', 700)]
+    assert stats == [('2024-01-01', 800), ('2024-01-02', 700)]
+
+
+def test_jsonl_import(tmp_path, run_with_storage):
+    lines = [{'date': '2024-01-01', 'amount': 250, 'created_at': 1704103200}, {'date': '2024-01-01', 'amount': 500}]
+    path = write(tmp_path, 'water.jsonl', '\n'.join(json.dumps(line) for line in lines) + '\n\n')
+
+    async def scenario():
+        result = await importer.import_file(1, path, 'water.jsonl')
+        rows = await storage.fetchall('SELECT amount, created_at FROM water WHERE user_id = 1 ORDER BY id')
+        return result, rows, await statistics('water_consumed')
+
+    result, rows, stats = run_with_storage(scenario)
+    assert result['rows'] == {'water': 2}
+    assert rows[0] == (250, 1704103200)
+    assert rows[1][0] == 500
+    assert stats == [('2024-01-01', 750)]
+
+
+@pytest.mark.parametrize('chunk', [importer.JSON_CHUNK, 7])
+def test_json_array_import(tmp_path, run_with_storage, monkeypatch, chunk):
+    # Маленькая часть чтения: элементы и числа разрезаются границами частей
+    monkeypatch.setattr(importer, 'JSON_CHUNK', chunk)
+    items = [{'date': '2024-01-01', 'weight': 80.5}, {'date': '2024-01-02', 'weight': 80.25},
+             {'date': '2024-01-02', 'weight': 79.75}]
+    path = write(tmp_path, 'weight.json', json.dumps(items, indent=2))
+
+    async def scenario():
+        result = await importer.import_file(1, path, 'weight.json')
+        rows = await storage.fetchall('SELECT date, weight FROM weight WHERE user_id = 1 ORDER BY date')
+        return result, rows, await statistics('weight')
+
+    result, rows, stats = run_with_storage(scenario)
+    assert result['rows'] == {'weight': 3}
+    # Вес за день - последний из файла
+    assert rows == [('2024-01-01', 80.5), ('2024-01-02', 79.75)]
+    assert stats == rows
+
+
+def test_row_errors_are_skipped_and_capped(tmp_path, run_with_storage, monkeypatch):
+    monkeypatch.setattr(importer, 'IMPORT_MAX_ERRORS', 3)
+    path = write(tmp_path, 'calories.csv', 'date,calories\n' + ''.join([
+        '2024-01-01,100\n',
+        '01.01.2024,100\n',
+        '2024-01-01,abc\n',
+        '2024-01-01,0\n',
+        '2999-01-01,100\n',
+        ',100\n',
+        '2024-01-02,200\n',
+    ]))
+
+    async def scenario():
+        return await importer.import_file(1, path, 'calories.csv')
+
+    result = run_with_storage(scenario)
+    assert result['rows'] == {'calories': 2}
+    assert result['skipped'] == 5
+    assert result['errors'] == [
+        'calories.csv:3: дата 01.01.2024: ожидается ГГГГ-ММ-ДД',
+        'calories.csv:4: calories=abc: не число',
+        'calories.csv:5: calories=0 вне диапазона 1..20000',
+    ]
+
+
+def test_rows_are_written_in_batches(tmp_path, run_with_storage, monkeypatch):
+    monkeypatch.setattr(importer, 'IMPORT_BATCH_SIZE', 2)
+    batches, progress = [], []
+    write_batch = importer._write_batch
+
+    async def recording_write_batch(user_id, table, rows):
+        batches.append(len(rows))
+        await write_batch(user_id, table, rows)
+
+    monkeypatch.setattr(importer, '_write_batch', recording_write_batch)
+    path = write(tmp_path, 'calories.csv',
+                 'date,calories\n' + ''.join(f'2024-01-0{day},{day * 100}\n' for day in range(1, 6)))
+
+    async def on_progress(rows):
+        progress.append(rows)
+
+    async def scenario():
+        result = await importer.import_file(1, path, 'calories.csv', on_progress)
+        return result, await statistics('calories_consumed')
+
+    result, stats = run_with_storage(scenario)
+    assert batches == [2, 2, 1]
+    assert progress == [2, 4, 5]
+    assert result['rows'] == {'calories': 5}
+    assert stats == [(f'2024-01-0{day}', day * 100) for day in range(1, 6)]
+
+
+def test_rebuild_error_does_not_hide_import_error(tmp_path, run_with_storage, monkeypatch):
+    monkeypatch.setattr(importer, 'IMPORT_BATCH_SIZE', 1)
+
+    async def failing_rebuild(user_id=None):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(rollups, 'rebuild', failing_rebuild)
+    # Первый элемент записан, затем файл обрывается
+    path = write(tmp_path, 'calories.json', '[{"date": "2024-01-01", "calories": 100},')
+
+    async def scenario():
+        with pytest.raises(ValueError, match='не закрыт'):
+            await importer.import_file(1, path, 'calories.json')
+        # Без ошибки импорта ошибка пересчёта уходит наружу
+        complete = write(tmp_path, 'calories.csv', 'date,calories\n2024-01-02,100\n')
+        with pytest.raises(RuntimeError):
+            await importer.import_file(1, complete, 'calories.csv')
+
+    run_with_storage(scenario)
@@ -0,0 +1,86 @@
+"""Журнал: выборка записей фильтром обработчика очереди и ленивое форматирование сообщений"""
+import ast
+import io
+import logging
+from pathlib import Path
+
+import pytest
+
+import logger as log_setup
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def configure():
+    """setup_logging в вывод StringIO; после теста - прежние обработчики корневого логгера (в том числе pytest)"""
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+
+    def configure(sampling: str) -> io.StringIO:
+        stream = io.StringIO()
+        log_setup.setup_logging(level=logging.DEBUG, log_dir=None, stream=stream, sampling=sampling)
+        return stream
+
+    yield configure
+    log_setup.shutdown_logging()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def written(stream: io.StringIO) -> list:
+    log_setup.shutdown_logging()
+    return stream.getvalue().splitlines()
+
+
+def test_sampling_by_logger_and_event(configure):
+    stream = configure('aiogram.event=0,menu.message=0')
+    for _ in range(20):
+        logging.getLogger('aiogram.event').info("Update handled")
+        logging.getLogger('aiogram.event.child').debug("child")
+        log_setup.log_event(logging.getLogger('handlers.menu'), 'menu.message', user=1)
+    logging.getLogger('aiogram.event').warning("Update failed")
+    logging.getLogger('aiogram.dispatcher').info("Start polling")
+    log_setup.log_event(logging.getLogger('handlers.menu'), 'menu.callback', user=2)
+
+    lines = written(stream)
+    # WARNING и выше проходят всегда, логгеры и события без доли - целиком
+    assert len(lines) == 3
+    assert 'msg="Update failed"' in lines[0]
+    assert 'logger=aiogram.dispatcher' in lines[1]
+    assert lines[2].endswith('event=menu.callback user=2')
+    # Логгеры библиотек остаются обычными logging.Logger
+    assert type(logging.getLogger('aiogram.event')) is logging.Logger
+
+
+def test_sampling_rate(configure, monkeypatch):
+    values = iter([0.05, 0.5, 0.09, 0.95])
+    monkeypatch.setattr(log_setup.random, 'random', lambda: next(values))
+    stream = configure('aiogram.event=0.1')
+    for number in range(4):
+        logging.getLogger('aiogram.event').info("update %s", number)
+
+    assert [line.rpartition('msg=')[2] for line in written(stream)] == ['"update 0"', '"update 2"']
+
+
+def logger_calls_with_fstrings(path: Path):
+    tree = ast.parse(path.read_text(encoding='utf-8'))
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                and isinstance(node.func.value, ast.Name) and node.func.value.id in ('logger', 'logging')
+                and node.func.attr in ('debug', 'info', 'warning', 'error', 'exception', 'critical', 'log')
+                and any(isinstance(arg, ast.JoinedStr) for arg in node.args)):
+            yield f'{path.relative_to(ROOT)}:{node.lineno}'
+
+
+def test_log_messages_are_formatted_lazily():
+    # Сообщение форматируется в потоке писателя и только для записанных записей: аргументы - через %s
+    found = [
+        call for path in sorted(ROOT.rglob('*.py'))
+        if path.relative_to(ROOT).parts[0] not in ('benchmarks', 'tests')
+        for call in logger_calls_with_fstrings(path)
+    ]
+    assert not found
@@ -0,0 +1,231 @@
+"""Миграции: база старой схемы обновляется до текущей версии целиком и после прерывания
+
+Старая схема - таблицы из database.py и utils/database.py первой версии бота
+(users.id, activity.minutes, notes.text, motivation.text/category, statistics
+с повторяющимися строками вместо сумм). Пачки миграций уменьшены, чтобы каждая
+таблица обрабатывалась несколькими транзакциями. Прерывание моделируется
+ошибкой внутри транзакции записи с номером N (по умолчанию каждой девятой,
+с меткой slow - каждой); после перезапуска результат должен совпасть с
+обновлением за один запуск.
+"""
+import asyncio
+import random
+import sqlite3
+
+import pytest
+
+from utils import migrations, rollups
+from utils.database import init_db
+from utils.storage import storage
+
+LEGACY_SCHEMA = '''
+    CREATE TABLE users (
+        id INTEGER PRIMARY KEY,
+        username TEXT,
+        first_name TEXT,
+        last_name TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE calories (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        date DATE,
+        calories INTEGER,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    );
+    CREATE TABLE water (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        date DATE,
+        amount INTEGER,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    );
+    CREATE TABLE activity (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        date DATE,
+        steps INTEGER,
+        minutes INTEGER,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    );
+    CREATE TABLE weight (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        date DATE,
+        weight REAL,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    );
+    CREATE TABLE notes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        date DATE,
+        text TEXT,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    );
+    CREATE TABLE motivation (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        text TEXT,
+        category TEXT
+    );
+    CREATE TABLE statistics (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        date DATE,
+        calories_consumed INTEGER DEFAULT 0,
+        water_consumed INTEGER DEFAULT 0,
+        steps_taken INTEGER DEFAULT 0,
+        workouts_completed INTEGER DEFAULT 0,
+        FOREIGN KEY (user_id) REFERENCES users (user_id)
+    );
+'''
+
+USERS = 7
+DAYS = 10
+
+# Таблицы, содержимое которых сравнивается; у расписаний случайное время первого срабатывания
+COMPARED = {
+    'users': 'SELECT * FROM users ORDER BY user_id',
+    'calories': 'SELECT * FROM calories ORDER BY id',
+    'water': 'SELECT * FROM water ORDER BY id',
+    'activity': 'SELECT * FROM activity ORDER BY id',
+    'weight': 'SELECT * FROM weight ORDER BY id',
+    'notes': 'SELECT * FROM notes ORDER BY id',
+    'motivation': 'SELECT * FROM motivation ORDER BY id',
+    'statistics': 'SELECT user_id, date, calories_consumed, water_consumed, steps_taken, workouts_completed, weight '
+                  'FROM statistics ORDER BY user_id, date',
+    'statistics_periods': 'SELECT * FROM statistics_periods ORDER BY user_id, period, start',
+    'reminder_schedule': 'SELECT user_id, kind, interval FROM reminder_schedule ORDER BY user_id, kind',
+}
+
+
+class Interrupted(Exception):
+    pass
+
+
+def create_legacy(path: str):
+    random.seed(5)
+    db = sqlite3.connect(path)
+    db.executescript(LEGACY_SCHEMA)
+    for user_id in range(1, USERS + 1):
+        db.execute('INSERT INTO users (id, username, first_name, last_name, created_at) VALUES (?, ?, ?, ?, ?)',
+                   (user_id, f'user{user_id}', 'Old', 'User', '2023-12-01 10:00:00'))
+        for day in range(1, DAYS + 1):
+            date = f'2024-01-{day:02d}'
+            for _ in range(random.randint(0, 3)):
+                db.execute('INSERT INTO calories (user_id, date, calories) VALUES (?, ?, ?)',
+                           (user_id, date, random.randint(100, 900)))
+                db.execute('INSERT INTO water (user_id, date, amount) VALUES (?, ?, ?)',
+                           (user_id, date, random.randint(100, 500)))
+            if random.random() < 0.5:
+                db.execute('INSERT INTO activity (user_id, date, steps, minutes) VALUES (?, ?, ?, ?)',
+                           (user_id, date, random.randint(0, 9000), random.choice([None, 0, 30])))
+            if random.random() < 0.3:
+                db.execute('INSERT INTO weight (user_id, date, weight) VALUES (?, ?, ?)',
+                           (user_id, date, round(random.uniform(60, 90), 1)))
+            # Старая статистика: несколько строк за день с последним значением
+            for _ in range(2):
+                db.execute('INSERT INTO statistics (user_id, date, calories_consumed) VALUES (?, ?, ?)',
+                           (user_id, date, random.randint(0, 900)))
+        db.execute('INSERT INTO notes (user_id, date, text) VALUES (?, ?, ?)', (user_id, '2024-01-01', 'заметка'))
+    db.execute("INSERT INTO motivation (text, category) VALUES ('Вперёд', 'fitness'), ('Дальше', 'other')")
+    db.commit()
+    db.close()
+
+
+async def dump():
+    return {table: await storage.fetchall(sql) for table, sql in COMPARED.items()}
+
+
+async def upgrade(path: str, interrupt_at: int = None):
+    """Запуск миграций; с interrupt_at транзакция записи с этим номером завершается ошибкой.
+    Возвращает число транзакций записи за запуск"""
+    submit, calls = storage._submit, 0
+
+    async def counting_submit(fn, durable, caller):
+        nonlocal calls
+        calls += 1
+        if calls != interrupt_at:
+            return await submit(fn, durable, caller)
+
+        async def crash(db):
+            await fn(db)
+            raise Interrupted
+
+        return await submit(crash, durable, caller)
+
+    await storage.start(path)
+    storage._submit = counting_submit
+    try:
+        await init_db()
+    finally:
+        del storage._submit
+        await storage.close()
+    return calls
+
+
+@pytest.fixture
+def small_batches(monkeypatch):
+    monkeypatch.setattr(migrations, 'DB_MIGRATION_BATCH', 3)
+    # Без окна group commit: транзакции миграций идут по одной, ждать соседние записи незачем
+    monkeypatch.setattr(storage, 'group_window', 0)
+
+
+def upgraded(path: str):
+    """Версия схемы, содержимое таблиц и статистика, пересчитанная из записей заново"""
+    async def main():
+        await storage.start(path)
+        try:
+            version = await migrations.get_version()
+            tables = await dump()
+            await rollups.rebuild()
+            rebuilt = await dump()
+            return version, tables, rebuilt
+        finally:
+            await storage.close()
+    return asyncio.run(main())
+
+
+def test_legacy_database_is_upgraded(tmp_path, small_batches):
+    path = str(tmp_path / 'legacy.db')
+    create_legacy(path)
+    asyncio.run(upgrade(path))
+    version, tables, rebuilt = upgraded(path)
+
+    assert version == max(number for number, _, _ in migrations.MIGRATIONS)
+    # Статистика и итоги периодов - суммы записей трекеров, а не старые строки
+    assert tables['statistics'] == rebuilt['statistics']
+    assert tables['statistics_periods'] == rebuilt['statistics_periods']
+    assert tables['statistics'] and tables['statistics_periods']
+    assert [row[0] for row in tables['users']] == list(range(1, USERS + 1))
+    assert len(tables['reminder_schedule']) == 2 * USERS
+    # Время старых записей воды - полночь даты записи
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute('''
+            SELECT COUNT(*) FROM water WHERE created_at IS NULL
+                OR created_at != CAST(strftime('%s', date, 'utc') AS REAL)
+        ''').fetchone() == (0,)
+        assert conn.execute("SELECT type, content FROM motivation ORDER BY id").fetchall() == [
+            ('fitness', 'Вперёд'), ('general', 'Дальше')
+        ]
+    finally:
+        conn.close()
+
+
+# Прерывается каждая step-я транзакция записи; все подряд - с меткой slow
+@pytest.mark.parametrize('step', [9, pytest.param(1, marks=pytest.mark.slow)])
+def test_interrupted_upgrade_resumes(tmp_path, small_batches, step):
+    reference = str(tmp_path / 'reference.db')
+    create_legacy(reference)
+    writes = asyncio.run(upgrade(reference))
+    expected = upgraded(reference)[1]
+
+    for interrupt_at in range(1, writes + 1, step):
+        path = str(tmp_path / f'interrupted_{interrupt_at}.db')
+        create_legacy(path)
+        with pytest.raises(Interrupted):
+            asyncio.run(upgrade(path, interrupt_at))
+        asyncio.run(upgrade(path))
+        version, tables, _ = upgraded(path)
+        assert version == max(number for number, _, _ in migrations.MIGRATIONS), interrupt_at
+        assert tables == expected, interrupt_at
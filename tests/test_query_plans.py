@@ -0,0 +1,222 @@
+"""Планы запросов: ни один SQL из utils не должен сканировать таблицу целиком
+
+Собирает SQL, переданный в execute/executemany/fetchone/fetchall в модулях utils:
+литералы как есть, f-строки и format - с реальными значениями колонок, периодов
+и таблиц из TEMPLATES (запрос, который не удаётся так вычислить, - ошибка теста).
+Создаёт схему через обычный путь запуска и выполняет для каждого запроса
+EXPLAIN QUERY PLAN. Запрос не проходит, если просматривает таблицу целиком
+(любой SCAN таблицы, в том числе по всему индексу) или не компилируется.
+
+Запуск: python -m pytest tests/test_query_plans.py [-v]
+"""
+import ast
+import asyncio
+import importlib
+import re
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from utils import migrations
+from utils.database import init_db
+from utils.rollups import PERIOD_COLUMNS, STATISTICS_COLUMNS
+from utils.storage import storage
+
+UTILS_DIR = Path(__file__).resolve().parent.parent / 'utils'
+SQL_METHODS = {'execute', 'executemany', 'fetchone', 'fetchall'}
+# Функции, которые получают SQL первым аргументом и выполняют его сами
+SQL_FUNCTIONS = {'in_batches'}
+DML_PREFIXES = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+DDL_PREFIXES = ('PRAGMA', 'CREATE', 'DROP', 'ALTER')
+
+# Запросы, которым полный просмотр нужен по смыслу: (модуль, функция или функция[вариант]) -> причина
+ALLOWED_SCANS = {
+    ('content', 'load'): 'справочный контент целиком загружается в память',
+    ('content', 'refresh'): 'версии всех таблиц контента (несколько строк)',
+    ('reminders', 'load'): 'все расписания загружаются один раз при запуске',
+    ('migrations', 'create_schedule'): 'однократное заполнение расписаний для всех пользователей',
+    ('migrations', 'seed'): 'проверка, пуста ли таблица контента (LIMIT 1)',
+    ('rollups', 'recompute[all]'): 'пересчёт статистики всех пользователей (manage.py) читает все записи',
+}
+
+# Функции, передающие дальше чужой запрос: он проверяется в месте вызова
+PASSTHROUGH = {
+    ('storage', 'fetchone'), ('storage', 'fetchall'), ('storage', 'run'),
+    ('migrations', 'run_batch'),
+}
+
+
+def _copy_batch_values(table: str):
+    """Переменные copy_batch в convert_table для таблицы со всеми колонками целевой схемы"""
+    target = migrations.target_columns(table)
+    pk = migrations.PRIMARY_KEYS.get(table, 'id')
+    mapping = migrations._column_map(table, target, target)
+    mapping.pop(pk, None)
+    return {
+        'table': table, 'new_table': f'{table}_new', 'pk': pk,
+        'columns': ', '.join([pk] + list(mapping)),
+        'expressions': ', '.join(['rowid'] + list(mapping.values())),
+    }
+
+
+# Значения локальных переменных, из которых функция собирает SQL:
+# (модуль, функция) -> {вариант: переменные}; каждый вариант проверяется отдельно
+TEMPLATES = {
+    ('rollups', '_bump_periods'): {
+        **{column: {'columns': [column]} for column in PERIOD_COLUMNS},
+        'all': {'columns': list(PERIOD_COLUMNS)},
+    },
+    ('rollups', '_day_values'): {
+        'statistics': {'columns': list(STATISTICS_COLUMNS)},
+        'weight': {'columns': ['weight']},
+    },
+    ('rollups', 'increment'): {column: {'columns': [column]} for column in STATISTICS_COLUMNS},
+    ('rollups', 'assign'): {
+        **{column: {'columns': [column]} for column in STATISTICS_COLUMNS},
+        'activity': {'columns': ['steps_taken', 'workouts_completed']},
+    },
+    ('rollups', 'recompute'): {
+        'user': {'where': 'WHERE user_id = ?'},
+        'all': {'where': ''},
+    },
+    ('migrations', 'table_columns'): {table: {'table': table} for table in migrations.TABLES},
+    ('migrations', 'target_columns'): {table: {'table': table} for table in migrations.TABLES},
+    ('migrations', 'convert_table'): {
+        table: {'table': table, 'new_table': f'{table}_new', 'create_sql': migrations.TABLES[table]}
+        for table in migrations.TABLES
+    },
+    ('migrations', 'copy_batch'): {table: _copy_batch_values(table) for table in migrations.TABLES},
+    ('migrations', 'swap'): {table: _copy_batch_values(table) for table in migrations.TABLES},
+    ('migrations', 'create'): {str(number): {'sql': sql} for number, sql in enumerate(migrations.INDEXES)},
+    ('migrations', 'seed'): {table: {'table': table, 'sql': sql} for table, sql, _ in migrations.CONTENT_SEEDS},
+}
+
+
+def _literal_head(node) -> str:
+    """Начало SQL, известное без вычисления: текст до первой подстановки f-строки"""
+    if isinstance(node, ast.JoinedStr) and node.values and isinstance(node.values[0], ast.Constant):
+        return node.values[0].value.lstrip().upper()
+    return ''
+
+
+def _render(path, module, node, name):
+    """Варианты SQL выражения node: [(имя, sql)]; None, если значения переменных неизвестны"""
+    code = compile(ast.Expression(node), str(path), 'eval')
+    namespace = vars(module)
+    variants = TEMPLATES.get((module.__name__.rsplit('.', 1)[1], name))
+    if variants is None:
+        try:
+            return [(name, eval(code, dict(namespace)))]
+        except NameError:
+            return None
+    return [(f'{name}[{label}]', eval(code, {**namespace, **values})) for label, values in variants.items()]
+
+
+def collect_statements():
+    """Все DML-запросы в utils: ([(модуль, функция, строка, sql)], [непроверяемые вызовы])
+
+    Литералы берутся как есть, собранный из частей SQL (f-строки, format)
+    вычисляется с переменными из TEMPLATES. Вызов, SQL которого не удаётся
+    вычислить, попадает во второй список - тест на него не проходит.
+    """
+    statements, unchecked = [], []
+    for path in sorted(UTILS_DIR.glob('*.py')):
+        module = importlib.import_module(f'utils.{path.stem}')
+        tree = ast.parse(path.read_text(encoding='utf-8'))
+        # Вложенные функции обходятся позже внешних - остаётся самая внутренняя
+        calls = {}
+        for func in ast.walk(tree):
+            if not isinstance(func, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                continue
+            for node in ast.walk(func):
+                if not (isinstance(node, ast.Call) and node.args):
+                    continue
+                if isinstance(node.func, ast.Attribute) and node.func.attr in SQL_METHODS \
+                        or isinstance(node.func, ast.Name) and node.func.id in SQL_FUNCTIONS:
+                    calls[(node.lineno, node.col_offset)] = (func.name, node.args[0])
+
+        for (lineno, _), (name, arg) in sorted(calls.items()):
+            if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+                variants = [(name, arg.value)]
+            elif _literal_head(arg).startswith(DDL_PREFIXES) or (path.stem, name) in PASSTHROUGH:
+                continue
+            else:
+                variants = _render(path, module, arg, name)
+                if variants is None:
+                    unchecked.append(f"utils/{path.stem}.py:{lineno} {name}: {ast.unparse(arg)[:80]}")
+                    continue
+            for label, sql in variants:
+                sql = ' '.join(sql.split())
+                if sql.upper().startswith(DML_PREFIXES):
+                    statements.append((path.stem, label, lineno, sql))
+    return sorted(statements, key=lambda s: (s[0], s[2], s[1])), unchecked
+
+
+def full_scans(plan, tables):
+    """Строки плана с просмотром таблицы целиком, в том числе по всему индексу (SCAN ... USING INDEX)"""
+    scans = []
+    for row in plan:
+        detail = row[-1]
+        if detail.startswith('SCAN ') and detail.split()[1] in tables:
+            scans.append(detail)
+    return scans
+
+
+async def create_schema(path):
+    await storage.start(path)
+    await init_db()
+    # Промежуточные таблицы миграций существуют только во время миграции
+    await storage.execute(migrations.STATISTICS_ROLLUP_TABLE)
+    for table, create_sql in migrations.TABLES.items():
+        await storage.execute(create_sql.format(name=f'{table}_new'))
+    await storage.close()
+
+
+def parameters(sql: str):
+    """Пустые значения параметров запроса: именованные (:name) или позиционные (?)"""
+    names = re.findall(r':(\w+)', sql)
+    if names:
+        return dict.fromkeys(names)
+    return [None] * sql.count('?')
+
+
+STATEMENTS, UNCHECKED = collect_statements()
+
+
+@pytest.fixture(scope='module')
+def db(tmp_path_factory):
+    """Схема, созданная миграциями, как при запуске бота"""
+    path = str(tmp_path_factory.mktemp('plans') / 'plans.db')
+    asyncio.run(create_schema(path))
+    conn = sqlite3.connect(path)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture(scope='module')
+def tables(db):
+    return {row[0] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def test_statements_found():
+    assert STATEMENTS
+
+
+def test_every_statement_is_checked():
+    assert not UNCHECKED, "SQL собирается из переменных без значений в TEMPLATES:\n" + "\n".join(UNCHECKED)
+
+
+@pytest.mark.parametrize(
+    'module, name, lineno, sql', STATEMENTS,
+    ids=[f"{module}.py:{lineno}:{name}" for module, name, lineno, _ in STATEMENTS]
+)
+def test_query_uses_index(db, tables, module, name, lineno, sql):
+    try:
+        plan = db.execute(f'EXPLAIN QUERY PLAN {sql}', parameters(sql)).fetchall()
+    except sqlite3.Error as e:
+        pytest.fail(f"utils/{module}.py:{lineno} {name} не компилируется: {e}\n{sql}")
+    scans = full_scans(plan, tables)
+    if (module, name) in ALLOWED_SCANS or (module, name.split('[')[0]) in ALLOWED_SCANS:
+        return
+    assert not scans, f"utils/{module}.py:{lineno} {name}: {'; '.join(scans)}\n{sql}"
@@ -0,0 +1,212 @@
+"""Планировщик напоминаний на искусственных часах
+
+Часы продвигаются сразу к ближайшему срабатыванию, поэтому сутки расписания
+проходят за доли секунды. Сутки с изменениями расписаний прогоняются для 2 000
+пользователей и, с меткой slow, для 100 000 - в масштабе бота. Проверяется, что каждое напоминание срабатывает ровно
+в назначенное время и нужное число раз, что задача планировщика рассылает
+наступившие напоминания и не ждёт медленной отправки, что расписания
+восстанавливаются из reminder_schedule и что заблокировавший бота пользователь
+удаляется из расписаний.
+"""
+import asyncio
+import random
+from collections import Counter
+
+import pytest
+from aiogram.exceptions import TelegramForbiddenError
+from aiogram.methods import SendMessage
+
+from utils.reminders import Reminders, DEFAULT_SCHEDULE
+from utils.storage import storage
+
+
+class Recorder:
+    """Обработчик напоминаний: запоминает (время, пользователь) каждой отправки"""
+
+    def __init__(self, clock, raise_for=()):
+        self.clock = clock
+        self.raise_for = set(raise_for)
+        self.sent = []
+
+    async def __call__(self, user_id):
+        if user_id in self.raise_for:
+            raise TelegramForbiddenError(SendMessage(chat_id=user_id, text=''), 'bot was blocked by the user')
+        self.sent.append((self.clock(), user_id))
+
+
+def make_reminders(clock, persist=False, **handlers):
+    reminders = Reminders(bot=None, clock=clock, persist=persist)
+    reminders.handlers = handlers
+    reminders.selectors = {}
+    return reminders
+
+
+async def until(predicate, timeout: float = 2.0):
+    """Ожидание условия: рассылка идёт в отдельных задачах и пишет в базу в потоке писателя"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        if loop.time() > deadline:
+            raise AssertionError("условие не выполнилось за отведённое время")
+        await asyncio.sleep(0.005)
+
+
+async def advance(reminders, clock, now):
+    """Перевод часов и пробуждение планировщика"""
+    clock.now = now
+    reminders._wakeup.set()
+
+
+@pytest.mark.parametrize('users', [2000, pytest.param(100_000, marks=pytest.mark.slow)])
+def test_schedule_fires_on_time_with_churn(clock, users):
+    random.seed(7)
+    end = 24 * 3600
+    reminders = make_reminders(clock, water=Recorder(clock), motivation=Recorder(clock))
+    for user_id in range(users):
+        for kind, interval in DEFAULT_SCHEDULE.items():
+            reminders.schedule(user_id, kind, interval, random.uniform(0, interval))
+
+    # Часть пользователей посреди прогона меняет интервал воды на час, часть отключает напоминания
+    churn_at = end / 2
+    churned = random.sample(range(users), users // 10)
+    faster, removed = set(churned[::2]), set(churned[1::2])
+    churn_done = False
+
+    fired = Counter()
+    expected_at = {key: next_at for key, (_, next_at) in reminders._schedules.items()}
+    while True:
+        next_at = reminders.next_fire()
+        if not churn_done and (next_at is None or next_at > churn_at):
+            clock.now = churn_at
+            for user_id in faster:
+                reminders.schedule(user_id, 'water', 3600)
+                expected_at[(user_id, 'water')] = churn_at + 3600
+            for user_id in removed:
+                reminders.unschedule(user_id)
+            churn_done = True
+            continue
+        if next_at is None or next_at > end:
+            break
+        clock.now = next_at
+        for user_id, kind, following in reminders.pop_due():
+            key = (user_id, kind)
+            assert expected_at[key] == clock.now
+            assert not (user_id in removed and clock.now > churn_at)
+            expected_at[key] = following
+            fired[key] += 1
+
+    for user_id in range(users):
+        for kind, interval in DEFAULT_SCHEDULE.items():
+            count = fired[(user_id, kind)]
+            if user_id in removed:
+                low, high = 0, int(churn_at // interval) + 1
+            elif user_id in faster and kind == 'water':
+                low = int(churn_at // interval) - 1 + int((end - churn_at) // 3600)
+                high = int(churn_at // interval) + 1 + int((end - churn_at) // 3600)
+            else:
+                low, high = int(end // interval), int(end // interval) + 1
+            assert low <= count <= high, (user_id, kind, count)
+    # Устаревшие записи не раздувают кучу
+    assert len(reminders._heap) <= 2 * len(reminders) + 64
+
+
+def test_missed_fires_do_not_pile_up(clock):
+    reminders = make_reminders(clock)
+    reminders.schedule(1, 'water', 100, 100)
+    # Простой на 10 интервалов: одно срабатывание, следующее - через интервал от текущего момента
+    assert reminders.pop_due(1050) == [(1, 'water', 1150)]
+    assert reminders.pop_due(1100) == []
+
+
+def test_run_dispatches_due_reminders(clock):
+    async def scenario():
+        water = Recorder(clock)
+        reminders = make_reminders(clock, water=water)
+        await reminders.start()
+        reminders.schedule(1, 'water', 100, 10)
+        reminders.schedule(2, 'water', 100, 50)
+        for now, count in ((10, 1), (60, 2), (110, 3)):
+            await advance(reminders, clock, now)
+            await until(lambda: len(water.sent) == count)
+        await reminders.stop()
+        return water.sent, reminders.fired
+
+    sent, fired = asyncio.run(scenario())
+    assert sent == [(10, 1), (60, 2), (110, 1)]
+    assert fired == 3
+
+
+def test_slow_send_does_not_block_later_reminders(clock):
+    async def scenario():
+        release = asyncio.Event()
+        sent = []
+
+        async def slow(user_id):
+            await release.wait()
+            sent.append(('slow', user_id))
+
+        async def fast(user_id):
+            sent.append(('fast', user_id))
+
+        reminders = make_reminders(clock, slow=slow, fast=fast)
+        await reminders.start()
+        reminders.schedule(1, 'slow', 1000, 10)
+        reminders.schedule(2, 'fast', 1000, 20)
+        await advance(reminders, clock, 10)
+        await until(lambda: reminders._dispatches)
+        # Рассылка первого напоминания ещё ждёт, а следующее уже отправлено
+        await advance(reminders, clock, 20)
+        await until(lambda: sent)
+        before_release = list(sent)
+        release.set()
+        await until(lambda: len(sent) == 2)
+        await reminders.stop()
+        return before_release, sent
+
+    before_release, sent = asyncio.run(scenario())
+    assert before_release == [('fast', 2)]
+    assert sent == [('fast', 2), ('slow', 1)]
+
+
+def test_load_restores_schedules_and_persists_next_fire(run_with_storage, clock):
+    clock.now = 1000
+
+    async def scenario():
+        await storage.executemany('''
+            INSERT INTO reminder_schedule (user_id, kind, interval, next_at) VALUES (?, ?, ?, ?)
+        ''', [(1, 'water', 100, 1000), (2, 'water', 100, 1500), (3, 'motivation', 300, 500)])
+        water, motivation = Recorder(clock), Recorder(clock)
+        reminders = make_reminders(clock, persist=True, water=water, motivation=motivation)
+        await reminders.start()
+        assert len(reminders) == 3
+        await advance(reminders, clock, 1000)
+        await until(lambda: water.sent and motivation.sent)
+        await reminders.stop()
+        rows = await storage.fetchall('SELECT user_id, kind, next_at FROM reminder_schedule ORDER BY user_id')
+        return water.sent, motivation.sent, rows
+
+    water_sent, motivation_sent, rows = run_with_storage(scenario)
+    assert water_sent == [(1000, 1)]
+    # Пропущенное при простое напоминание уходит один раз
+    assert motivation_sent == [(1000, 3)]
+    assert rows == [(1, 'water', 1100), (2, 'water', 1500), (3, 'motivation', 1300)]
+
+
+def test_forbidden_user_is_removed(run_with_storage, clock):
+
+    async def scenario():
+        water = Recorder(clock, raise_for={2})
+        reminders = make_reminders(clock, persist=True, water=water)
+        await reminders.start()
+        for user_id in (1, 2):
+            await reminders.set_schedule(user_id, 'water', 100)
+        await advance(reminders, clock, 100)
+        await until(lambda: (2, 'water') not in reminders._schedules and not reminders._dispatches)
+        await reminders.stop()
+        rows = await storage.fetchall('SELECT user_id FROM reminder_schedule ORDER BY user_id')
+        return water.sent, reminders._schedules, rows
+
+    sent, schedules, rows = run_with_storage(scenario)
+    assert sent == [(100, 1)]
+    assert set(schedules) == {(1, 'water')}
+    assert rows == [(1,)]
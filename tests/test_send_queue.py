@@ -0,0 +1,200 @@
+"""Очередь отправки на искусственных часах: вёдра токенов, лимиты чатов и групп, приоритеты и RetryAfter
+
+Ожидания очереди идут через Timeline.sleep: когда все задачи ждут, часы
+переводятся к ближайшему пробуждению, поэтому секунды лимитов проходят мгновенно,
+а время каждой отправки известно точно.
+"""
+import asyncio
+import heapq
+import itertools
+import math
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from config import SEND_MAX_RETRIES
+from utils.send_queue import SendQueue, TokenBucket, REMINDER, priority
+
+
+class Timeline:
+    """Сон на искусственных часах: run переводит часы, когда остальным задачам нечего делать"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self._sleepers = []  # (время пробуждения, порядковый номер, future)
+        self._seq = itertools.count()
+
+    async def sleep(self, delay: float):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._sleepers, (self.clock.now + delay, next(self._seq), future))
+        await future
+
+    async def run(self, coro):
+        task = asyncio.create_task(coro)
+        while True:
+            # Даём задачам дойти до следующего сна
+            for _ in range(50):
+                await asyncio.sleep(0)
+            if task.done():
+                return task.result()
+            if not self._sleepers:
+                raise AssertionError("задачи ждут друг друга, а не часов")
+            wake, _, future = heapq.heappop(self._sleepers)
+            # Как и настоящие часы, после сна время хоть немного, но идёт: иначе остаток
+            # меньше шага float (доли токена в ведре) будил бы задачу в тот же момент бесконечно
+            self.clock.now = max(wake, math.nextafter(self.clock.now, math.inf))
+            future.set_result(None)
+
+
+class Telegram:
+    """make_request для очереди: запоминает (время, chat_id, текст) и отвечает RetryAfter первым flood_calls запросам"""
+
+    def __init__(self, clock, flood_calls: int = 0, retry_after: int = 5):
+        self.clock = clock
+        self.flood_calls = flood_calls
+        self.retry_after = retry_after
+        self.calls = []
+        self.sent = []
+
+    async def __call__(self, bot, method):
+        self.calls.append((self.clock(), method.chat_id))
+        if len(self.calls) <= self.flood_calls:
+            raise TelegramRetryAfter(method, 'Too Many Requests', self.retry_after)
+        self.sent.append((self.clock(), method.chat_id, method.text))
+        return True
+
+
+@pytest.fixture
+def timeline(clock):
+    return Timeline(clock)
+
+
+def make_queue(timeline, **limits):
+    limits = {'global_rate': 1000, 'chat_rate': 1, 'chat_burst': 3, 'group_rate': 20 / 60, **limits}
+    return SendQueue(clock=timeline.clock, sleep=timeline.sleep, **limits)
+
+
+def send(queue, telegram, chat_id, text: str = 'text'):
+    return queue(telegram, None, SendMessage(chat_id=chat_id, text=text))
+
+
+def run(timeline, queue, scenario):
+    async def main():
+        await queue.start()
+        try:
+            return await scenario()
+        finally:
+            await queue.stop()
+
+    return asyncio.run(timeline.run(main()))
+
+
+def times(records):
+    return [record[0] for record in records]
+
+
+def test_token_bucket(clock):
+    bucket = TokenBucket(rate=2, capacity=3, clock=clock)
+    # Запас capacity выдаётся сразу, дальше - по токену в 1/rate секунды
+    assert [bucket.reserve() for _ in range(4)] == [0, 0, 0, 0.5]
+    assert bucket.delay() == 1.0
+    clock.now = 0.5
+    assert bucket.delay() == 0.5
+    clock.now = 10
+    # Запас не копится выше capacity
+    assert bucket.idle and bucket.tokens == 3
+    bucket.pause(4)
+    assert bucket.delay() == 4
+    assert not bucket.idle
+    clock.now = 14
+    assert bucket.delay() == 0
+    bucket.take()
+    assert bucket.tokens == 0
+
+
+def test_global_rate(clock, timeline):
+    queue = make_queue(timeline, global_rate=30)
+    telegram = Telegram(clock)
+
+    async def scenario():
+        await asyncio.gather(*(send(queue, telegram, chat_id) for chat_id in range(1, 91)))
+
+    run(timeline, queue, scenario)
+    # Ровный поток: 30 сообщений в секунду без пачки сверх него
+    assert times(telegram.sent) == pytest.approx([i / 30 for i in range(90)])
+
+
+def test_chat_and_group_limits(clock, timeline):
+    queue = make_queue(timeline)
+    telegram = Telegram(clock)
+
+    async def scenario():
+        await asyncio.gather(*(send(queue, telegram, chat_id) for chat_id in [1] * 6 + [-100] * 5))
+
+    run(timeline, queue, scenario)
+    chat = [time for time, chat_id, _ in telegram.sent if chat_id == 1]
+    group = [time for time, chat_id, _ in telegram.sent if chat_id == -100]
+    # Пачка chat_burst, затем chat_rate в секунду; группе - group_rate (20 в минуту)
+    assert chat == pytest.approx([0, 0, 0, 1, 2, 3], abs=0.01)
+    assert group == pytest.approx([0, 0, 0, 3, 6], abs=0.01)
+
+
+def test_replies_go_before_reminders(clock, timeline):
+    queue = make_queue(timeline, global_rate=10)
+    telegram = Telegram(clock)
+
+    async def remind(chat_id):
+        with priority(REMINDER):
+            await send(queue, telegram, chat_id, 'reminder')
+
+    async def scenario():
+        reminders = [asyncio.create_task(remind(chat_id)) for chat_id in range(1, 21)]
+        # Пока пачка напоминаний ждёт глобальных токенов, пользователи пишут боту
+        await timeline.sleep(0.05)
+        await asyncio.gather(*(send(queue, telegram, chat_id, 'reply') for chat_id in range(101, 104)))
+        await asyncio.gather(*reminders)
+        return queue.stats()
+
+    stats = run(timeline, queue, scenario)
+    texts = [text for _, _, text in telegram.sent]
+    # Первое напоминание ушло до ответов, остальные ждут, пока уйдут ответы
+    assert texts == ['reminder'] + ['reply'] * 3 + ['reminder'] * 19
+    assert times(telegram.sent) == pytest.approx([i / 10 for i in range(23)])
+    assert stats['interactive']['sent'] == 3 and stats['reminder']['sent'] == 20
+    assert stats['reminder']['max_waiting'] == 20
+
+
+def test_retry_after_pauses_and_retries(clock, timeline):
+    queue = make_queue(timeline, global_rate=30)
+    telegram = Telegram(clock, flood_calls=2, retry_after=5)
+
+    async def scenario():
+        first = asyncio.create_task(send(queue, telegram, 1))
+        await timeline.sleep(1)
+        # Другой чат во время паузы тоже ждёт: лимит RetryAfter общий на бота
+        await send(queue, telegram, 2)
+        return await first, queue._chat_bucket(1).delay()
+
+    result, chat_delay = run(timeline, queue, scenario)
+    assert result is True
+    # Запас чата после паузы не восстановлен: следующее сообщение в него - не раньше чем через секунду
+    assert chat_delay == pytest.approx(1 - 1 / 30)
+    # Повтор - через retry_after после каждого отказа; второй чат получает токен после повтора первого
+    assert telegram.calls == [(0, 1), pytest.approx((5, 1)), pytest.approx((10, 1)), pytest.approx((10 + 1 / 30, 2))]
+    assert [chat_id for _, chat_id, _ in telegram.sent] == [1, 2]
+    assert queue.retries == 2
+
+
+def test_gives_up_after_max_retries(clock, timeline):
+    queue = SendQueue(global_rate=30, clock=clock, sleep=timeline.sleep)
+    telegram = Telegram(clock, flood_calls=SEND_MAX_RETRIES + 10, retry_after=5)
+
+    async def scenario():
+        with pytest.raises(TelegramRetryAfter):
+            await send(queue, telegram, 1)
+
+    run(timeline, queue, scenario)
+    # Первая попытка и SEND_MAX_RETRIES повторов, каждый после паузы retry_after
+    assert times(telegram.calls) == pytest.approx([5 * attempt for attempt in range(SEND_MAX_RETRIES + 1)])
+    assert queue.retries == SEND_MAX_RETRIES
@@ -0,0 +1,88 @@
+"""Время от запуска процесса бота до ответа на первый апдейт, с порогом
+
+Запускает python bot.py отдельным процессом в пустом каталоге (новая база,
+миграции с нуля) против поддельного Bot API из benchmarks/fake_telegram.py.
+Апдейт /start ждёт в очереди с момента запуска; замеряется время до первого
+sendMessage при задержке каждого ответа Bot API LATENCY. Прогон повторяется
+--startup-runs раз, тест не проходит, если медиана больше --startup-budget секунд.
+
+Разбивку по импортам и этапам инициализации показывает python bot.py --profile-startup;
+её получение из другого каталога проверяют быстрые тесты в конце файла.
+
+Запуск: python -m pytest tests/test_startup.py --startup-budget 6 --startup-runs 3
+"""
+import asyncio
+import os
+import signal
+import statistics
+import sys
+import tempfile
+import time
+
+import pytest
+
+from benchmarks.fake_telegram import FakeTelegram, serve
+from utils.startup import import_breakdown
+
+BOT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bot.py')
+
+# Задержка ответа Bot API и предел ожидания одного запуска, секунды
+LATENCY = 0.05
+TIMEOUT = 60
+
+
+async def run_once(timeout: float, latency: float):
+    """Один запуск: (секунды до первого ответа или None по таймауту, stderr бота)"""
+    fake = FakeTelegram(latency)
+    runner, url = await serve(fake)
+    fake.push_message(1, '/start')
+    env = dict(os.environ, TELEGRAM_API_URL=url, BOT_TOKEN='123456:STARTUP', BOT_MODE='polling',
+               LOG_LEVEL='WARNING', LOG_DIR='', METRICS_PORT='0')
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, BOT_PATH, cwd=tmp, env=env,
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+        )
+        elapsed = None
+        while time.perf_counter() - started < timeout and process.returncode is None:
+            if fake.messages:
+                elapsed = time.perf_counter() - started
+                break
+            await asyncio.sleep(0.005)
+        if process.returncode is None:
+            process.send_signal(signal.SIGINT)
+        _, stderr = await process.communicate()
+    await runner.cleanup()
+    return elapsed, stderr.decode(errors='replace')
+
+
+@pytest.mark.slow
+def test_time_to_first_reply(pytestconfig):
+    budget = pytestconfig.getoption('--startup-budget')
+    results = []
+    for run in range(pytestconfig.getoption('--startup-runs')):
+        elapsed, stderr = asyncio.run(run_once(TIMEOUT, LATENCY))
+        assert elapsed is not None, f"запуск {run + 1}: нет ответа за {TIMEOUT} с\n{stderr[-2000:]}"
+        results.append(elapsed)
+
+    median = statistics.median(results)
+    assert median <= budget, (
+        f"регрессия: время до первого ответа {median:.3f} с больше порога {budget} с "
+        f"(запуски: {', '.join(f'{seconds:.3f}' for seconds in results)})"
+    )
+
+
+def test_import_breakdown_from_other_directory(tmp_path, monkeypatch):
+    # --profile-startup может запускаться не из каталога бота
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('BOT_TOKEN', '123456:STARTUP')
+    monkeypatch.setenv('LOG_DIR', '')
+    packages, total = import_breakdown('bot')
+    assert total > 0
+    assert 'aiogram' in dict(packages)
+
+
+def test_import_breakdown_reports_failed_import():
+    with pytest.raises(RuntimeError, match='no_such_module'):
+        import_breakdown('no_such_module')
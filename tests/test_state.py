@@ -0,0 +1,41 @@
+"""Состояние диалогов: продление TTL обращением переживает перезапуск"""
+import asyncio
+
+from utils.database import init_db
+from utils.state import StateStore
+from utils.storage import storage
+
+
+def test_refreshed_ttl_survives_restart(tmp_path, clock):
+    async def scenario():
+        await storage.start(str(tmp_path / 'state.db'))
+        try:
+            await init_db()
+            clock.now = 1000
+            store = StateStore(ttl=100, persist=True, clock=clock)
+            await store.set(1, 1, 'subtract_water')
+            await store.set(2, 2, 'subtract_calories')
+
+            # Пользователь 1 активен: обращение после половины TTL записывает новое время истечения
+            clock.now = 1060
+            assert store.get(1, 1) == 'subtract_water'
+            await asyncio.gather(*store._touches)
+            # Повторное обращение вскоре после записи базу не трогает
+            clock.now = 1070
+            assert store.get(1, 1) == 'subtract_water'
+            assert not store._touches
+            rows = await storage.fetchall('SELECT user_id, expires_at FROM user_state ORDER BY user_id')
+
+            # Перезапуск после исходного TTL: диалог активного пользователя восстанавливается
+            clock.now = 1120
+            restarted = StateStore(ttl=100, persist=True, clock=clock)
+            restored = await restarted.load()
+            return rows, restored, restarted.get(1, 1), restarted.get(2, 2)
+        finally:
+            await storage.close()
+
+    rows, restored, active, idle = asyncio.run(scenario())
+    assert rows == [(1, 1160), (2, 1100)]
+    assert restored == 1
+    assert active == 'subtract_water'
+    assert idle is None
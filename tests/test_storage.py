@@ -0,0 +1,34 @@
+"""Писатель storage: ошибка фиксации пачки не останавливает приём записей"""
+import asyncio
+import sqlite3
+
+import pytest
+
+from utils.storage import Storage
+
+
+def test_writer_survives_commit_batch_error(tmp_path):
+    async def scenario():
+        storage = Storage(str(tmp_path / 'storage.db'), group_window=0)
+        await storage.start()
+        await storage.execute('CREATE TABLE items (value INTEGER)')
+
+        commit_batch = storage._commit_batch
+        failures = [sqlite3.OperationalError('cannot rollback - no transaction is active')]
+
+        async def failing_commit_batch(batch):
+            # Как если бы ROLLBACK или восстановление synchronous завершились ошибкой
+            if failures:
+                raise failures.pop()
+            await commit_batch(batch)
+
+        storage._commit_batch = failing_commit_batch
+        with pytest.raises(sqlite3.OperationalError):
+            await asyncio.wait_for(storage.execute('INSERT INTO items VALUES (0)'), 5)
+        # Писатель продолжает работу
+        await asyncio.wait_for(storage.execute('INSERT INTO items VALUES (1)'), 5)
+        rows = await storage.fetchall('SELECT value FROM items')
+        await storage.close()
+        return rows
+
+    assert asyncio.run(scenario()) == [(1,)]
@@ -0,0 +1,73 @@
+"""Кэш итогов за сегодня: заполнение из читателя не затирает более свежую запись"""
+import asyncio
+import random
+from datetime import datetime
+
+from utils import water
+from utils.database import create_user
+from utils.storage import storage
+from utils.totals import totals
+
+
+async def prepare():
+    """Пустой кэш и пользователь с лимитом по умолчанию"""
+    totals.invalidate()
+    await create_user(1, 'user1', 'Test', 'User')
+
+
+async def consumed_in_db(user_id):
+    today = datetime.now().strftime('%Y-%m-%d')
+    row = await storage.fetchone('SELECT SUM(amount) FROM water WHERE user_id = ? AND date = ?', (user_id, today))
+    return row[0] or 0
+
+
+def test_fill_overtaken_by_write_is_dropped(run_with_storage):
+    async def scenario():
+        await prepare()
+        today = datetime.now().strftime('%Y-%m-%d')
+        reading, release = asyncio.Event(), asyncio.Event()
+
+        async def slow_read(db):
+            # Снимок до записи: чтение закончено, а сохранение ещё не выполнено
+            async with db.execute('SELECT SUM(amount) FROM water WHERE user_id = ?', (1,)) as cursor:
+                consumed = (await cursor.fetchone())[0] or 0
+            reading.set()
+            await release.wait()
+            return 2000, consumed
+
+        fill = asyncio.create_task(totals.fill(1, 'water', today, slow_read))
+        await reading.wait()
+        await water.add_water(1, 300)
+        release.set()
+        result = await fill
+        return result, totals.stale_fills, await water.get_today(1)
+
+    result, stale, today = run_with_storage(scenario)
+    # Заполнение вернуло свой снимок, но в кэш не попало: следующий промах видит запись
+    assert result == {'limit': 2000, 'left': 2000}
+    assert stale == 1
+    assert today == {'limit': 2000, 'left': 1700}
+
+
+def test_cache_matches_database_under_concurrent_writes(run_with_storage):
+    random.seed(3)
+
+    async def scenario():
+        await prepare()
+        async def writer():
+            for _ in range(200):
+                await water.add_water(1, random.randint(1, 50))
+
+        async def reader():
+            for _ in range(400):
+                # Промах на каждом чтении: заполнение идёт одновременно с записями
+                totals.invalidate(1, 'water')
+                await water.get_today(1)
+                await asyncio.sleep(0)
+
+        await asyncio.gather(writer(), reader(), reader())
+        cached = await water.get_today(1)
+        return cached, await consumed_in_db(1)
+
+    cached, consumed = run_with_storage(scenario)
+    assert cached == {'limit': 2000, 'left': max(0, 2000 - consumed)}
@@ -0,0 +1,94 @@
+"""Очереди апдейтов: порядок внутри пользователя, предел параллельности и ожидание при остановке"""
+import asyncio
+import random
+from types import SimpleNamespace
+
+from utils.user_queue import UserQueue
+
+CONCURRENCY = 3
+
+
+def update_data(user_id: int) -> dict:
+    return {'event_from_user': SimpleNamespace(id=user_id)}
+
+
+def test_users_in_order_with_bounded_concurrency():
+    random.seed(2)
+
+    async def scenario():
+        queue = UserQueue(concurrency=CONCURRENCY)
+        await queue.start()
+        started, finished = [], []
+        running = peak = 0
+
+        async def handler(event, data):
+            nonlocal running, peak
+            user_id, number = event
+            started.append(event)
+            running += 1
+            peak = max(peak, running)
+            # Разная длительность обработки: без очереди порядок внутри пользователя бы сбился
+            for _ in range(random.randint(0, 5)):
+                await asyncio.sleep(0)
+            running -= 1
+            finished.append(event)
+
+        # Апдейты пяти пользователей вперемешку, каждый - отдельная задача, как в handle_as_tasks
+        events = [(random.randint(1, 5), number) for number in range(200)]
+        tasks = [asyncio.create_task(queue(handler, event, update_data(event[0]))) for event in events]
+        await asyncio.gather(*tasks)
+        return queue, events, started, finished, peak
+
+    queue, events, started, finished, peak = asyncio.run(scenario())
+    for user_id in range(1, 6):
+        expected = [event for event in events if event[0] == user_id]
+        assert [event for event in started if event[0] == user_id] == expected
+        assert [event for event in finished if event[0] == user_id] == expected
+    assert peak == CONCURRENCY
+    assert queue.max_active == CONCURRENCY
+    assert queue.processed == len(events)
+    assert queue.in_flight == 0
+    # Очереди пользователей без апдейтов удалены
+    assert not queue._queues
+
+
+def test_stop_waits_for_queued_updates():
+    async def scenario():
+        queue = UserQueue(concurrency=1)
+        await queue.start()
+        done = []
+
+        async def handler(event, data):
+            await asyncio.sleep(0.01)
+            done.append(event)
+
+        tasks = [asyncio.create_task(queue(handler, number, update_data(number % 2))) for number in range(6)]
+        await asyncio.sleep(0)
+        in_flight = queue.in_flight
+        await queue.stop(timeout=5)
+        stopped_with = list(done)
+        await asyncio.gather(*tasks)
+        return in_flight, stopped_with
+
+    in_flight, stopped_with = asyncio.run(scenario())
+    assert in_flight == 6
+    assert sorted(stopped_with) == list(range(6))
+
+
+def test_stop_gives_up_after_timeout():
+    async def scenario():
+        queue = UserQueue()
+        await queue.start()
+        release = asyncio.Event()
+
+        async def handler(event, data):
+            await release.wait()
+
+        task = asyncio.create_task(queue(handler, None, update_data(1)))
+        await asyncio.sleep(0)
+        not_done = await queue.drain(timeout=0.01)
+        release.set()
+        await task
+        return not_done
+
+    assert asyncio.run(scenario()) == 1
@@ -0,0 +1,37 @@
+"""Сервер webhook: готовность в /health без изменения состояния запущенного приложения"""
+import asyncio
+
+import pytest
+from aiogram import Bot, Dispatcher
+from aiohttp.test_utils import TestClient, TestServer
+
+from utils.user_queue import UserQueue
+from utils.webhook import create_app, HEALTH_PATH
+
+
+@pytest.mark.filterwarnings('error')
+def test_health_reports_ready_and_in_flight():
+    async def scenario():
+        updates = UserQueue()
+        await updates.start()
+        release = asyncio.Event()
+
+        async def handler(event, data):
+            await release.wait()
+
+        app = create_app(Dispatcher(), Bot('123456:TEST'), '/webhook', 'secret', updates=updates)
+        async with TestClient(TestServer(app)) as client:
+            # Апдейт, который ещё обрабатывается, виден в in_flight
+            update = asyncio.create_task(updates(handler, None, {}))
+            await asyncio.sleep(0)
+            response = await client.get(HEALTH_PATH)
+            busy = response.status, await response.json()
+            release.set()
+            await update
+            response = await client.get(HEALTH_PATH)
+            idle = response.status, await response.json()
+        return busy, idle
+
+    busy, idle = asyncio.run(scenario())
+    assert busy == (200, {'status': 'ok', 'in_flight': 1})
+    assert idle == (200, {'status': 'ok', 'in_flight': 0})
@@ -0,0 +1,32 @@
+"""Выгрузка метрик на публичном сервере webhook: только с METRICS_TOKEN и заголовком Authorization"""
+import asyncio
+
+import pytest
+from aiogram import Bot, Dispatcher
+from aiohttp.test_utils import TestClient, TestServer
+
+from utils.metrics import metrics
+from utils.webhook import create_app
+
+
+async def get_metrics(token: str, headers=None) -> int:
+    saved = metrics.token
+    metrics.token = token
+    try:
+        app = create_app(Dispatcher(), Bot('123456:TEST'), '/webhook', 'secret')
+        async with TestClient(TestServer(app)) as client:
+            response = await client.get(metrics.path, headers=headers or {})
+            return response.status
+    finally:
+        metrics.token = saved
+
+
+@pytest.mark.parametrize('token, headers, status', [
+    ('', None, 404),
+    ('', {'Authorization': 'Bearer '}, 404),
+    ('s3cret', None, 401),
+    ('s3cret', {'Authorization': 'Bearer wrong'}, 401),
+    ('s3cret', {'Authorization': 'Bearer s3cret'}, 200),
+])
+def test_metrics_on_webhook_server(token, headers, status):
+    assert asyncio.run(get_metrics(token, headers)) == status
@@ -1,56 +1,43 @@
-import aiosqlite
 from datetime import datetime
-from .database import DB_PATH, update_statistics
-
-async def init_db():
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS activity (
-                date TEXT PRIMARY KEY,
-                steps INTEGER,
-                workout INTEGER
-            )
-        ''')
-        await db.commit()
+from . import history, rollups
+from .storage import storage
 
 async def get_today(user_id: int):
     """Получение информации об активности за сегодня"""
     today = datetime.now().strftime('%Y-%m-%d')
-    async with aiosqlite.connect(DB_PATH) as db:
-        async with db.execute('''
-            SELECT steps, workout 
-            FROM activity 
-            WHERE user_id = ? AND date = ?
-        ''', (user_id, today)) as cursor:
-            row = await cursor.fetchone()
-            if row:
-                return {
-                    'steps': row[0],
-                    'workout': bool(row[1])
-                }
-            else:
-                return {
-                    'steps': 0,
-                    'workout': False
-                }
+    row = await storage.fetchone('''
+        SELECT steps, workout
+        FROM activity
+        WHERE user_id = ? AND date = ?
+    ''', (user_id, today))
+    if row:
+        return {
+            'steps': row[0],
+            'workout': bool(row[1])
+        }
+    else:
+        return {
+            'steps': 0,
+            'workout': False
+        }
 
 async def add_steps(user_id: int, steps: int):
     """Добавление шагов"""
     today = datetime.now().strftime('%Y-%m-%d')
-    async with aiosqlite.connect(DB_PATH) as db:
+    async def update(db):
         # Проверяем существование записи
         async with db.execute('''
-            SELECT steps FROM activity 
+            SELECT steps FROM activity
             WHERE user_id = ? AND date = ?
         ''', (user_id, today)) as cursor:
             row = await cursor.fetchone()
-            
+
             if row:
                 # Обновляем существующую запись
                 new_steps = row[0] + steps
                 await db.execute('''
-                    UPDATE activity 
-                    SET steps = ? 
+                    UPDATE activity
+                    SET steps = ?
                     WHERE user_id = ? AND date = ?
                 ''', (new_steps, user_id, today))
             else:
@@ -59,32 +46,28 @@ async def add_steps(user_id: int, steps: int):
                     INSERT INTO activity (user_id, date, steps)
                     VALUES (?, ?, ?)
                 ''', (user_id, today, steps))
-        
-        await db.commit()
-        
-        # Обновляем статистику
-        await update_statistics(
-            user_id=user_id,
-            date=today,
-            steps_taken=steps
-        )
+
+        # Обновляем статистику в той же транзакции
+        await rollups.increment(db, user_id, today, steps_taken=steps)
+
+    await storage.write(update)
 
 async def add_workout(user_id: int):
     """Добавление тренировки"""
     today = datetime.now().strftime('%Y-%m-%d')
-    async with aiosqlite.connect(DB_PATH) as db:
+    async def update(db):
         # Проверяем существование записи
         async with db.execute('''
-            SELECT workout FROM activity 
+            SELECT workout FROM activity
             WHERE user_id = ? AND date = ?
         ''', (user_id, today)) as cursor:
             row = await cursor.fetchone()
-            
+
             if row:
                 # Обновляем существующую запись
                 await db.execute('''
-                    UPDATE activity 
-                    SET workout = TRUE 
+                    UPDATE activity
+                    SET workout = TRUE
                     WHERE user_id = ? AND date = ?
                 ''', (user_id, today))
             else:
@@ -93,41 +76,29 @@ async def add_workout(user_id: int):
                     INSERT INTO activity (user_id, date, workout)
                     VALUES (?, ?, TRUE)
                 ''', (user_id, today))
-        
-        await db.commit()
-        
-        # Обновляем статистику
-        await update_statistics(
-            user_id=user_id,
-            date=today,
-            workouts_completed=1
-        )
+
+        # Тренировка - признак за день, поэтому значение устанавливается, а не суммируется
+        await rollups.assign(db, user_id, today, workouts_completed=1)
+
+    await storage.write(update)
 
 async def reset_activity(user_id: int):
     """Сброс активности за сегодня"""
     today = datetime.now().strftime('%Y-%m-%d')
-    async with aiosqlite.connect(DB_PATH) as db:
+    async def reset(db):
         await db.execute('''
-            DELETE FROM activity 
+            DELETE FROM activity
             WHERE user_id = ? AND date = ?
         ''', (user_id, today))
-        await db.commit()
-        
-        # Обновляем статистику
-        await update_statistics(
-            user_id=user_id,
-            date=today,
-            steps_taken=0,
-            workouts_completed=0
-        )
+        # Обновляем статистику в той же транзакции
+        await rollups.assign(db, user_id, today, steps_taken=0, workouts_completed=0)
+
+    await storage.write(reset)
 
 async def get_history(user_id: int, days: int = 7):
-    """Получение истории активности"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        async with db.execute('''
-            SELECT date, steps, workout
-            FROM activity
-            WHERE user_id = ? AND date >= date('now', ? || ' days')
-            ORDER BY date DESC
-        ''', (user_id, f'-{days}')) as cursor:
-            return await cursor.fetchall() 
\ No newline at end of file
+    """Получение истории активности: (дата, шаги, тренировка) от новых к старым"""
+    return [
+        (day['start'], day['steps'], day['workouts'])
+        for day in await history.get_series(user_id, days)
+        if day['steps'] or day['workouts']
+    ]
@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import time
+from datetime import date, timedelta
+
+from config import COMPACTION_KEEP_DAYS, COMPACTION_INTERVAL, COMPACTION_BATCH, COMPACTION_VACUUM_PAGES
+from logger import log_event
+from .storage import storage
+
+logger = logging.getLogger(__name__)
+
+# Таблицы с записью на каждый глоток или перекус
+TABLES = ('water', 'calories')
+
+# Первый проход после запуска откладывается, чтобы не мешать ответам на накопившиеся апдейты
+START_DELAY = 60  # секунды
+
+# Ключ до первого пользователя для постраничного обхода
+_FIRST_KEY = (-2 ** 63, '')
+
+
+class Compactor:
+    """Сжатие старых записей воды и калорий: одна запись на пользователя за день
+
+    За прошедшие дни читается только сумма за день, поэтому записи старше
+    keep_days дней заменяются одной записью с суммой (у воды - со временем
+    последнего глотка), итоги и статистика не меняются. Дни обходятся
+    постранично по индексу (user_id, date); каждая пачка до batch исходных
+    строк - одна транзакция писателя, поэтому запись блокируется ненадолго.
+    Затем освободившиеся страницы возвращаются файлу через incremental_vacuum
+    шагами по vacuum_pages страниц (база с auto_vacuum=INCREMENTAL, старую
+    переводит python manage.py vacuum). Фоновая задача повторяет проход раз
+    в interval секунд.
+    """
+
+    def __init__(self, keep_days: int = COMPACTION_KEEP_DAYS, interval: float = COMPACTION_INTERVAL,
+                 batch: int = COMPACTION_BATCH, vacuum_pages: int = COMPACTION_VACUUM_PAGES):
+        self.keep_days = keep_days
+        self.interval = interval
+        self.batch = batch
+        self.vacuum_pages = vacuum_pages
+        self.runs = 0
+        self.rows_removed = 0
+        self.bytes_reclaimed = 0
+        self.last_report = None
+        self._task = None
+
+    async def start(self):
+        """Запуск фоновых проходов (interval=0 - без них)"""
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Остановка фоновых проходов; уже записанные пачки остаются"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run(self) -> dict:
+        """Один проход по всем пользователям: сжатие записей, затем возврат свободных страниц
+
+        Возвращает отчёт: удалённые строки по таблицам, сжатые дни, освобождённые
+        страницы и байты, размер базы до и после.
+        """
+        started = time.perf_counter()
+        cutoff = (date.today() - timedelta(days=self.keep_days)).isoformat()
+        page_size = (await storage.fetchone('PRAGMA page_size'))[0]
+        pages_before = (await storage.fetchone('PRAGMA page_count'))[0]
+
+        report = {'cutoff': cutoff, 'rows': {}, 'days': 0}
+        for table in TABLES:
+            removed = 0
+            after = _FIRST_KEY
+            while True:
+                groups = await self._next_groups(table, cutoff, after)
+                if not groups:
+                    break
+                after = groups[-1][:2]
+                chunk, rows = [], 0
+                for group in groups:
+                    chunk.append(group)
+                    rows += group[2]
+                    if rows >= self.batch:
+                        removed += await self._collapse(table, chunk)
+                        chunk, rows = [], 0
+                if chunk:
+                    removed += await self._collapse(table, chunk)
+                report['days'] += len(groups)
+            report['rows'][table] = removed
+
+        report['pages'] = await self._vacuum()
+        pages_after = (await storage.fetchone('PRAGMA page_count'))[0]
+        report['bytes'] = (pages_before - pages_after) * page_size
+        report['size_before'] = pages_before * page_size
+        report['size_after'] = pages_after * page_size
+        report['seconds'] = round(time.perf_counter() - started, 3)
+
+        self.runs += 1
+        self.rows_removed += sum(report['rows'].values())
+        self.bytes_reclaimed += max(report['bytes'], 0)
+        self.last_report = report
+        log_event(logger, 'compaction.done', cutoff=cutoff, days=report['days'],
+                  **{f'{table}_rows': rows for table, rows in report['rows'].items()},
+                  pages=report['pages'], bytes=report['bytes'], size=report['size_after'],
+                  seconds=report['seconds'])
+        return report
+
+    async def _next_groups(self, table: str, cutoff: str, after):
+        """Следующие дни до cutoff с несколькими записями после ключа after: [(user_id, date, строк)]"""
+        if table == 'water':
+            return await storage.fetchall('''
+                SELECT user_id, date, COUNT(*) FROM water
+                WHERE (user_id, date) > (?, ?) AND date < ?
+                GROUP BY user_id, date HAVING COUNT(*) > 1
+                ORDER BY user_id, date LIMIT ?
+            ''', (*after, cutoff, self.batch))
+        return await storage.fetchall('''
+            SELECT user_id, date, COUNT(*) FROM calories
+            WHERE (user_id, date) > (?, ?) AND date < ?
+            GROUP BY user_id, date HAVING COUNT(*) > 1
+            ORDER BY user_id, date LIMIT ?
+        ''', (*after, cutoff, self.batch))
+
+    async def _collapse(self, table: str, groups) -> int:
+        """Замена записей каждого дня из groups одной записью с суммой; возвращает убранные строки
+
+        Сумма считается и прежние записи удаляются в одной транзакции, поэтому
+        запись, добавленная за тот же день между чтением и сжатием, тоже учитывается.
+        """
+        keys = [(user_id, day) for user_id, day, _ in groups]
+
+        async def collapse(db):
+            # Новые записи с суммой получают id больше прежнего максимума, прежние удаляются по id
+            if table == 'water':
+                async with db.execute('SELECT MAX(id) FROM water') as cursor:
+                    last_id = (await cursor.fetchone())[0]
+                async with db.executemany('''
+                    INSERT INTO water (user_id, date, amount, created_at)
+                    SELECT user_id, date, SUM(amount), MAX(created_at) FROM water
+                    WHERE user_id = ? AND date = ?
+                    GROUP BY user_id, date
+                ''', keys) as cursor:
+                    inserted = cursor.rowcount
+                async with db.executemany('''
+                    DELETE FROM water WHERE user_id = ? AND date = ? AND id <= ?
+                ''', [(*key, last_id) for key in keys]) as cursor:
+                    deleted = cursor.rowcount
+            else:
+                async with db.execute('SELECT MAX(id) FROM calories') as cursor:
+                    last_id = (await cursor.fetchone())[0]
+                async with db.executemany('''
+                    INSERT INTO calories (user_id, date, calories)
+                    SELECT user_id, date, SUM(calories) FROM calories
+                    WHERE user_id = ? AND date = ?
+                    GROUP BY user_id, date
+                ''', keys) as cursor:
+                    inserted = cursor.rowcount
+                async with db.executemany('''
+                    DELETE FROM calories WHERE user_id = ? AND date = ? AND id <= ?
+                ''', [(*key, last_id) for key in keys]) as cursor:
+                    deleted = cursor.rowcount
+            return deleted - inserted
+
+        return await storage.write(collapse)
+
+    async def _vacuum(self) -> int:
+        """Возврат свободных страниц файлу шагами по vacuum_pages; возвращает число страниц"""
+        free = (await storage.fetchone('PRAGMA freelist_count'))[0]
+        if not free:
+            return 0
+        if (await storage.fetchone('PRAGMA auto_vacuum'))[0] != 2:
+            logger.warning("Свободных страниц: %s, но база создана без auto_vacuum=INCREMENTAL - "
+                           "файл не уменьшится, пока не выполнить python manage.py vacuum", free)
+            return 0
+
+        async def step(db):
+            # Модуль sqlite3 выполняет один шаг PRAGMA без колонок результата,
+            # а incremental_vacuum освобождает за шаг одну страницу - поэтому по странице,
+            # закрывая курсор, иначе незавершённый запрос не даст отпустить точку сохранения
+            for _ in range(min(free, self.vacuum_pages)):
+                async with db.execute('PRAGMA incremental_vacuum(1)'):
+                    pass
+
+        freed = 0
+        while free:
+            await storage.write(step)
+            left = (await storage.fetchone('PRAGMA freelist_count'))[0]
+            if left >= free:
+                break
+            freed += free - left
+            free = left
+        return freed
+
+    def collect(self):
+        """Значения для реестра метрик"""
+        return [
+            ('bot_compaction_runs_total', 'counter', 'Проходов сжатия записей', {(): self.runs}),
+            ('bot_compaction_rows_removed_total', 'counter', 'Удалено строк воды и калорий при сжатии',
+             {(): self.rows_removed}),
+            ('bot_compaction_bytes_reclaimed_total', 'counter', 'Байт файла базы, возвращённых после сжатия',
+             {(): self.bytes_reclaimed}),
+        ]
+
+    async def _loop(self):
+        delay = min(START_DELAY, self.interval)
+        while True:
+            await asyncio.sleep(delay)
+            delay = self.interval
+            try:
+                await self.run()
+            except Exception as e:
+                logger.error("Ошибка сжатия записей: %s", e)
+
+
+# Единый экземпляр на процесс
+compactor = Compactor()
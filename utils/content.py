@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import random
+import sys
+
+from config import CONTENT_REFRESH_INTERVAL
+from .storage import storage
+
+logger = logging.getLogger(__name__)
+
+# Таблицы справочного контента; версия каждой увеличивается триггерами при изменении
+CONTENT_TABLES = ('motivation', 'faq', 'coach_answers')
+
+
+class ContentCache:
+    """Справочный контент в памяти: мотивация, FAQ, ответы тренера
+
+    Таблицы загружаются при запуске в кортежи по категориям, поэтому случайная
+    фраза выбирается за O(1), а меню FAQ не обращается к базе. Триггеры
+    увеличивают версию таблицы в content_version при любом изменении; фоновая
+    задача сверяет версии и перезагружает только изменившиеся таблицы.
+    """
+
+    def __init__(self, refresh_interval: float = CONTENT_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self.versions = {}
+        self.reloads = 0
+        self.motivation = {}  # тип -> кортеж фраз
+        self.motivation_all = ()
+        self.faq_list = ()  # (id, вопрос, категория) в порядке категории
+        self.faq = {}  # id -> (вопрос, ответ)
+        self.coach = {}  # вопрос -> кортеж ответов
+        self._task = None
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self.versions)
+
+    async def start(self):
+        """Загрузка контента и запуск фоновой проверки версий"""
+        await self.load()
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        """Остановка фоновой проверки версий"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def ensure_loaded(self):
+        """Загрузка при первом обращении, если кэш не запущен при старте"""
+        if not self.loaded:
+            await self.load()
+
+    async def load(self, tables=CONTENT_TABLES):
+        """Загрузка таблиц и их версий; новые данные подменяют старые целиком"""
+        versions = dict(await storage.fetchall('SELECT name, version FROM content_version'))
+        async with storage.read() as db:
+            if 'motivation' in tables:
+                async with db.execute('SELECT content, type FROM motivation ORDER BY id') as cursor:
+                    rows = await cursor.fetchall()
+                by_type = {}
+                for content, type_ in rows:
+                    by_type.setdefault(type_, []).append(sys.intern(content))
+                self.motivation = {type_: tuple(items) for type_, items in by_type.items()}
+                self.motivation_all = tuple(content for content, _ in rows)
+
+            if 'faq' in tables:
+                async with db.execute('SELECT id, question, answer, category FROM faq ORDER BY category, id') as cursor:
+                    rows = await cursor.fetchall()
+                self.faq_list = tuple((faq_id, question, category) for faq_id, question, _, category in rows)
+                self.faq = {faq_id: (question, answer) for faq_id, question, answer, _ in rows}
+
+            if 'coach_answers' in tables:
+                async with db.execute('SELECT question, answer FROM coach_answers ORDER BY id') as cursor:
+                    rows = await cursor.fetchall()
+                coach = {}
+                for question, answer in rows:
+                    coach.setdefault(question, []).append(answer)
+                self.coach = {question: tuple(answers) for question, answers in coach.items()}
+
+        for table in tables:
+            self.versions[table] = versions.get(table, 0)
+        self.reloads += 1
+
+    def collect(self):
+        """Значения для реестра метрик"""
+        return [
+            ('bot_content_reloads_total', 'counter', 'Загрузок справочного контента', {(): self.reloads}),
+        ]
+
+    async def refresh(self):
+        """Перезагрузка таблиц, версия которых изменилась; возвращает их список"""
+        versions = dict(await storage.fetchall('SELECT name, version FROM content_version'))
+        changed = [table for table in CONTENT_TABLES if versions.get(table, 0) != self.versions.get(table)]
+        if changed:
+            await self.load(changed)
+            logger.info("Контент обновлён: %s", ', '.join(changed))
+        return changed
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error("Error refreshing content cache: %s", e)
+
+    def random_motivation(self, type_: str = None):
+        """Случайная фраза заданного типа (или любого) либо None"""
+        items = self.motivation.get(type_, ()) if type_ else self.motivation_all
+        return random.choice(items) if items else None
+
+    def coach_answer(self, question: str):
+        """Ответ тренера: точное совпадение вопроса, затем вопрос, содержащий текст"""
+        answers = self.coach.get(question)
+        if answers is None:
+            matches = [items for known, items in self.coach.items() if question in known]
+            answers = random.choice(matches) if matches else None
+        return random.choice(answers) if answers else None
+
+
+# Единый экземпляр на процесс
+content = ContentCache()
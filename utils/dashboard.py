@@ -0,0 +1,30 @@
+from datetime import datetime
+from .storage import storage
+
+async def get_today(user_id: int):
+    """Сводка всех трекеров за сегодня одним запросом"""
+    today = datetime.now().strftime('%Y-%m-%d')
+    # Лимиты из users, итоги дня из строки statistics, вес (одна запись в день) - из weight
+    row = await storage.fetchone('''
+        SELECT users.daily_calories_limit, users.daily_water_limit,
+               COALESCE(statistics.calories_consumed, 0),
+               COALESCE(statistics.water_consumed, 0),
+               COALESCE(statistics.steps_taken, 0),
+               COALESCE(statistics.workouts_completed, 0),
+               (SELECT weight FROM weight
+                WHERE weight.user_id = users.user_id AND weight.date = ?
+                LIMIT 1)
+        FROM users
+        LEFT JOIN statistics ON statistics.user_id = users.user_id AND statistics.date = ?
+        WHERE users.user_id = ?
+    ''', (today, today, user_id))
+    if not row:
+        row = (2000, 2000, 0, 0, 0, 0, None)
+    calories_limit, water_limit, calories, water, steps, workouts, weight = row
+    return {
+        'calories': {'limit': calories_limit, 'consumed': calories, 'left': max(0, calories_limit - calories)},
+        'water': {'limit': water_limit, 'consumed': water, 'left': max(0, water_limit - water)},
+        'steps': steps,
+        'workout': bool(workouts),
+        'weight': weight
+    }
@@ -0,0 +1,94 @@
+import asyncio
+import csv
+import io
+import json
+import os
+import tempfile
+import zipfile
+
+from config import EXPORT_CHUNK_SIZE, EXPORT_CONCURRENCY
+from .storage import storage
+
+# Форматы файлов внутри архива
+FORMATS = ('csv', 'jsonl')
+
+# Каждая выгрузка держит соединение читателя до конца, поэтому их число ограничено;
+# семафор создаётся при первой выгрузке, чтобы он был привязан к циклу бота
+_slots = None
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(EXPORT_CONCURRENCY)
+    return _slots
+
+
+async def export_user(user_id: int, fmt: str = 'csv', directory: str = None) -> dict:
+    """Вся история пользователя в zip-файле: по файлу CSV или JSON Lines на таблицу
+
+    Все таблицы читаются на одном соединении читателя в одной транзакции
+    (согласованный снимок), курсором по EXPORT_CHUNK_SIZE строк, и каждая пачка
+    сразу сжимается в архив на диске, поэтому память не зависит от длины истории.
+    Возвращает {'path', 'rows': {таблица: строк}, 'bytes'}; файл удаляет вызывающий.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат выгрузки: {fmt}")
+
+    fd, path = tempfile.mkstemp(prefix=f'export_{user_id}_', suffix='.zip', dir=directory)
+    os.close(fd)
+    rows = {}
+    try:
+        async with _get_slots(), storage.read() as db:
+            await db.execute('BEGIN')
+            try:
+                with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+                    async with db.execute('''
+                        SELECT date, calories FROM calories WHERE user_id = ? ORDER BY date
+                    ''', (user_id,)) as cursor:
+                        rows['calories'] = await _write_table(archive, 'calories', fmt, cursor)
+                    async with db.execute('''
+                        SELECT date, amount, created_at FROM water WHERE user_id = ? ORDER BY date
+                    ''', (user_id,)) as cursor:
+                        rows['water'] = await _write_table(archive, 'water', fmt, cursor)
+                    async with db.execute('''
+                        SELECT date, steps, workout FROM activity WHERE user_id = ? ORDER BY date
+                    ''', (user_id,)) as cursor:
+                        rows['activity'] = await _write_table(archive, 'activity', fmt, cursor)
+                    async with db.execute('''
+                        SELECT date, weight FROM weight WHERE user_id = ? ORDER BY date
+                    ''', (user_id,)) as cursor:
+                        rows['weight'] = await _write_table(archive, 'weight', fmt, cursor)
+                    async with db.execute('''
+                        SELECT date, type, content FROM notes WHERE user_id = ? ORDER BY date
+                    ''', (user_id,)) as cursor:
+                        rows['notes'] = await _write_table(archive, 'notes', fmt, cursor)
+            finally:
+                await db.execute('ROLLBACK')
+    except BaseException:
+        os.remove(path)
+        raise
+    return {'path': path, 'rows': rows, 'bytes': os.path.getsize(path)}
+
+
+async def _write_table(archive: zipfile.ZipFile, table: str, fmt: str, cursor) -> int:
+    """Строки курсора пачками в файл table.fmt архива; возвращает число строк"""
+    columns = [column[0] for column in cursor.description]
+    count = 0
+    with archive.open(f'{table}.{fmt}', 'w') as entry:
+        out = io.TextIOWrapper(entry, encoding='utf-8', newline='')
+        writer = None
+        if fmt == 'csv':
+            writer = csv.writer(out)
+            writer.writerow(columns)
+        while True:
+            chunk = await cursor.fetchmany(EXPORT_CHUNK_SIZE)
+            if not chunk:
+                break
+            if writer:
+                writer.writerows(chunk)
+            else:
+                out.write(''.join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n' for row in chunk))
+            count += len(chunk)
+        out.close()
+    return count
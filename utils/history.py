@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+from .rollups import period_start
+from .storage import storage
+
+# Поддерживаемая детализация истории
+GRANULARITIES = ('day', 'week', 'month')
+
+
+async def get_series(user_id: int, days: int = 7, granularity: str = 'day'):
+    """История трекеров за последние days дней с детализацией по дням, неделям или месяцам
+
+    Читает готовые итоги (statistics по дням, statistics_periods по неделям и
+    месяцам), поэтому год по месяцам стоит столько же, сколько неделя по дням.
+    Возвращает список словарей от новых к старым; weight - средний вес за период.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Неизвестная детализация: {granularity}")
+    since = (datetime.now() - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+    if granularity == 'day':
+        rows = await storage.fetchall('''
+            SELECT date, calories_consumed, water_consumed, steps_taken, workouts_completed,
+                   COALESCE(weight, 0), weight IS NOT NULL
+            FROM statistics
+            WHERE user_id = ? AND date >= ?
+            ORDER BY date DESC
+        ''', (user_id, since))
+    else:
+        # Первый период включается целиком, даже если начался раньше since
+        rows = await storage.fetchall('''
+            SELECT start, calories_consumed, water_consumed, steps_taken, workouts_completed,
+                   weight_total, weight_days
+            FROM statistics_periods
+            WHERE user_id = ? AND period = ? AND start >= ?
+            ORDER BY start DESC
+        ''', (user_id, granularity, period_start(granularity, since)))
+    return [
+        {
+            'start': start,
+            'calories': calories,
+            'water': water,
+            'steps': steps,
+            'workouts': workouts,
+            'weight': round(weight_total / weight_days, 1) if weight_days else None
+        }
+        for start, calories, water, steps, workouts, weight_total, weight_days in rows
+    ]
@@ -0,0 +1,314 @@
+import csv
+import io
+import json
+import logging
+import os
+import zipfile
+from datetime import date, datetime, timedelta
+
+from config import IMPORT_BATCH_SIZE, IMPORT_MAX_ERRORS
+from . import rollups
+from .storage import storage
+from .totals import totals
+
+logger = logging.getLogger(__name__)
+
+# Расширение файла -> формат; архив .zip - выгрузка /export с файлами таблиц внутри
+FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.json': 'json'}
+
+# Символов, читаемых из файла JSON за раз
+JSON_CHUNK = 64 * 1024
+
+# Допустимые значения одной записи
+MAX_CALORIES = 20000
+MAX_WATER = 10000  # мл
+MAX_STEPS = 200000
+MIN_WEIGHT, MAX_WEIGHT = 20, 500  # кг
+MAX_NOTE_LENGTH = 4096
+NOTE_TYPES = ('plan', 'thought')
+
+
+def _date(row) -> str:
+    value = row.get('date')
+    if value is None or value == '':
+        raise ValueError("нет даты")
+    text = str(value).strip()
+    try:
+        # fromisoformat в разы быстрее strptime; длина отсекает другие формы ISO (20240131, 2024-W05)
+        if len(text) != 10:
+            raise ValueError
+        day = date.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f"дата {value}: ожидается ГГГГ-ММ-ДД") from None
+    if day > date.today():
+        raise ValueError(f"дата {day} в будущем")
+    return day.isoformat()
+
+
+def _number(row, column: str, low, high, cast=int):
+    value = row.get(column)
+    if value is None or value == '' or isinstance(value, bool):
+        raise ValueError(f"нет значения {column}")
+    try:
+        number = cast(str(value).strip())
+    except ValueError:
+        raise ValueError(f"{column}={value}: не число") from None
+    if not low <= number <= high:
+        raise ValueError(f"{column}={number} вне диапазона {low}..{high}")
+    return number
+
+
+def _flag(row, column: str) -> int:
+    value = str(row.get(column) or '').strip().lower()
+    if value in ('', '0', 'false', 'no'):
+        return 0
+    if value in ('1', 'true', 'yes'):
+        return 1
+    raise ValueError(f"{column}={value}: ожидается 0 или 1")
+
+
+def _calories(row):
+    return _date(row), _number(row, 'calories', 1, MAX_CALORIES)
+
+
+def _water(row):
+    day = _date(row)
+    amount = _number(row, 'amount', 1, MAX_WATER)
+    start = datetime.fromisoformat(day)
+    if row.get('created_at') in (None, ''):
+        # Время глотка неизвестно - полдень того же дня
+        created_at = start.replace(hour=12).timestamp()
+    else:
+        # Не позже конца дня записи; inf и nan отсекаются сравнением
+        created_at = _number(row, 'created_at', 0, (start + timedelta(days=1)).timestamp(), float)
+    return day, amount, created_at
+
+
+def _activity(row):
+    day = _date(row)
+    steps = 0 if row.get('steps') in (None, '') else _number(row, 'steps', 0, MAX_STEPS)
+    return day, steps, _flag(row, 'workout')
+
+
+def _weight(row):
+    return _date(row), _number(row, 'weight', MIN_WEIGHT, MAX_WEIGHT, float)
+
+
+def _notes(row):
+    day = _date(row)
+    type_ = str(row.get('type') or '').strip()
+    if type_ not in NOTE_TYPES:
+        raise ValueError(f"type={type_}: ожидается plan или thought")
+    content = str(row.get('content') or '').strip()
+    if not content or len(content) > MAX_NOTE_LENGTH:
+        raise ValueError(f"текст записи пустой или длиннее {MAX_NOTE_LENGTH} символов")
+    return day, type_, content
+
+
+# Таблица -> проверка строки файла, возвращает кортеж значений для вставки
+VALIDATORS = {
+    'calories': _calories,
+    'water': _water,
+    'activity': _activity,
+    'weight': _weight,
+    'notes': _notes,
+}
+
+
+def _sources(path: str, filename: str):
+    """(таблица, формат, имя, текстовый поток) для каждого файла таблицы: сам файл или файлы архива"""
+    stem, extension = os.path.splitext(os.path.basename(filename).lower())
+    if extension == '.zip':
+        with zipfile.ZipFile(path) as archive:
+            for name in archive.namelist():
+                table, inner = os.path.splitext(os.path.basename(name).lower())
+                if table in VALIDATORS and inner in FORMATS:
+                    with archive.open(name) as entry:
+                        text = io.TextIOWrapper(entry, encoding='utf-8-sig', newline='')
+                        fmt = FORMATS[inner]
+                        yield table, _json_kind(text) if fmt == 'json' else fmt, name, text
+        return
+    if extension not in FORMATS:
+        raise ValueError("Поддерживаются файлы .csv, .jsonl, .json и архив .zip из /export")
+    if stem not in VALIDATORS:
+        raise ValueError(f"Имя файла задаёт трекер: {', '.join(f'{table}{extension}' for table in VALIDATORS)}")
+    with open(path, encoding='utf-8-sig', newline='') as text:
+        fmt = FORMATS[extension]
+        yield stem, _json_kind(text) if fmt == 'json' else fmt, os.path.basename(filename), text
+
+
+def _json_kind(text) -> str:
+    """Формат файла .json: массив объектов ('json') или объект на строку ('jsonl'); поток возвращается в начало"""
+    char = text.read(1)
+    while char and char.isspace():
+        char = text.read(1)
+    text.seek(0)
+    return 'json' if char == '[' else 'jsonl'
+
+
+def _rows(text, fmt: str):
+    """(номер строки, запись) по одной: словарь для CSV, исходная строка для JSON Lines,
+    разобранный элемент с его номером для массива JSON"""
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'json':
+        yield from _json_array(text)
+    else:
+        for number, line in enumerate(text, start=1):
+            if line.strip():
+                yield number, line
+
+
+def _json_array(text):
+    """Элементы массива JSON верхнего уровня по одному; файл читается частями по JSON_CHUNK символов"""
+    decoder = json.JSONDecoder()
+    buffer = text.read(JSON_CHUNK)
+    pos = buffer.index('[') + 1
+    number, eof, after_value = 0, False, False
+    while True:
+        while pos < len(buffer) and buffer[pos].isspace():
+            pos += 1
+        if pos == len(buffer):
+            if eof:
+                raise ValueError("Массив JSON не закрыт")
+            buffer, pos = text.read(JSON_CHUNK), 0
+            eof = not buffer
+            continue
+
+        char = buffer[pos]
+        if after_value:
+            if char == ']':
+                return
+            if char != ',':
+                raise ValueError(f"После элемента {number} массива JSON ожидается запятая")
+            pos += 1
+            after_value = False
+            continue
+        if char == ']' and not number:
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+            # Число на границе части может быть прочитано не целиком: нужен символ после элемента
+            complete = end < len(buffer) or eof
+        except json.JSONDecodeError:
+            if eof:
+                raise ValueError(f"Элемент {number + 1} массива JSON не читается") from None
+            complete = False
+        if not complete:
+            chunk = text.read(JSON_CHUNK)
+            buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+            continue
+        number += 1
+        pos, after_value = end, True
+        yield number, item
+
+
+async def _write_batch(user_id: int, table: str, rows: list):
+    """Пачка проверенных строк одной таблицы в одной транзакции писателя"""
+    if table == 'activity':
+        # Шаги за день суммируются, тренировка - признак дня (как в add_steps и add_workout)
+        days = {}
+        for day, steps, workout in rows:
+            total = days.setdefault(day, [0, 0])
+            total[0] += steps
+            total[1] = max(total[1], workout)
+        rows = [(day, steps, workout) for day, (steps, workout) in days.items()]
+    elif table == 'weight':
+        # Вес - одно значение за день, последнее в файле заменяет прежнее (как в add_weight)
+        rows = list(dict(rows).items())
+
+    async def insert(db):
+        if table == 'calories':
+            await db.executemany('INSERT INTO calories (user_id, date, calories) VALUES (?, ?, ?)',
+                                 [(user_id, *row) for row in rows])
+        elif table == 'water':
+            await db.executemany('INSERT INTO water (user_id, date, amount, created_at) VALUES (?, ?, ?, ?)',
+                                 [(user_id, *row) for row in rows])
+        elif table == 'activity':
+            await db.executemany('''
+                UPDATE activity SET steps = COALESCE(steps, 0) + ?, workout = MAX(COALESCE(workout, 0), ?)
+                WHERE user_id = ? AND date = ?
+            ''', [(steps, workout, user_id, day) for day, steps, workout in rows])
+            await db.executemany('''
+                INSERT INTO activity (user_id, date, steps, workout)
+                SELECT ?, ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM activity WHERE user_id = ? AND date = ?)
+            ''', [(user_id, day, steps, workout, user_id, day) for day, steps, workout in rows])
+        elif table == 'weight':
+            await db.executemany('UPDATE weight SET weight = ? WHERE user_id = ? AND date = ?',
+                                 [(weight, user_id, day) for day, weight in rows])
+            await db.executemany('''
+                INSERT INTO weight (user_id, date, weight)
+                SELECT ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM weight WHERE user_id = ? AND date = ?)
+            ''', [(user_id, day, weight, user_id, day) for day, weight in rows])
+        else:
+            await db.executemany('INSERT INTO notes (user_id, date, type, content) VALUES (?, ?, ?, ?)',
+                                 [(user_id, *row) for row in rows])
+
+    await storage.write(insert)
+
+
+async def import_file(user_id: int, path: str, filename: str = None, progress=None) -> dict:
+    """Импорт истории пользователя из файла CSV, JSON Lines или JSON либо архива выгрузки /export
+
+    Трекер задаётся именем файла (calories.csv, weight.jsonl, notes.json, ...),
+    колонки - как в выгрузке; файл .json - массив объектов или объект на строку. Файл читается и проверяется построчно, подходящие строки
+    записываются пачками по IMPORT_BATCH_SIZE через executemany, одна пачка -
+    одна транзакция; ошибочные строки пропускаются. После каждой пачки
+    вызывается await progress(строк записано). Дневная статистика и итоги
+    периодов пересчитываются один раз в конце (и при ошибке чтения файла,
+    если часть строк уже записана: тогда ошибка пересчёта только пишется
+    в лог, наружу уходит ошибка импорта).
+    Возвращает {'rows': {таблица: строк}, 'skipped', 'errors': [первые IMPORT_MAX_ERRORS], 'days'}.
+    """
+    result = {'rows': {}, 'skipped': 0, 'errors': [], 'days': 0}
+    written, completed = 0, False
+    try:
+        for table, fmt, name, text in _sources(path, filename or path):
+            validate = VALIDATORS[table]
+            count = result['rows'].get(table, 0)
+            batch = []
+            for number, row in _rows(text, fmt):
+                try:
+                    if fmt == 'jsonl':
+                        try:
+                            row = json.loads(row)
+                        except json.JSONDecodeError:
+                            raise ValueError("строка не JSON") from None
+                    if fmt != 'csv' and not isinstance(row, dict):
+                        raise ValueError("ожидается объект JSON")
+                    batch.append(validate(row))
+                except ValueError as e:
+                    result['skipped'] += 1
+                    if len(result['errors']) < IMPORT_MAX_ERRORS:
+                        result['errors'].append(f"{name}:{number}: {e}")
+                    continue
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    await _write_batch(user_id, table, batch)
+                    count += len(batch)
+                    written += len(batch)
+                    batch = []
+                    if progress:
+                        await progress(written)
+            if batch:
+                await _write_batch(user_id, table, batch)
+                count += len(batch)
+                written += len(batch)
+                if progress:
+                    await progress(written)
+            result['rows'][table] = count
+        completed = True
+    except (csv.Error, UnicodeDecodeError, zipfile.BadZipFile) as e:
+        raise ValueError(f"Файл не читается: {e}") from e
+    finally:
+        if written:
+            totals.invalidate(user_id)
+            try:
+                result['days'] = await rollups.rebuild(user_id)
+            except Exception:
+                if completed:
+                    raise
+                logger.exception("Ошибка пересчёта статистики после прерванного импорта")
+    return result
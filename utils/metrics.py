@@ -0,0 +1,276 @@
+import asyncio
+import hmac
+import logging
+import time
+from bisect import bisect_left
+
+from aiogram import BaseMiddleware
+
+from config import METRICS_PATH, METRICS_PORT, METRICS_HOST, METRICS_LOG_INTERVAL, METRICS_TOKEN
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм задержки, секунды
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Монотонный счётчик с метками"""
+
+    type = 'counter'
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in sorted(self._values.items()):
+            yield self.name, labels, value
+
+    def render(self):
+        for name, labels, value in self.samples():
+            yield f'{name}{_format_labels(self.label_names, labels)} {_format_value(value)}'
+
+
+class Histogram:
+    """Гистограмма наблюдений с метками: число попаданий в корзины, сумма и количество
+
+    Процентили в сводке для журнала оцениваются по границам корзин (сверху).
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.bounds = tuple(sorted(buckets))
+        self._series = {}  # метки -> [счётчики корзин (последняя - +Inf), сумма, количество]
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.bounds) + 1), 0.0, 0]
+        series[0][bisect_left(self.bounds, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def quantile(self, labels, q: float) -> float:
+        """Верхняя граница корзины, в которую попадает доля q наблюдений"""
+        counts, _, count = self._series[labels]
+        target = q * count
+        seen = 0
+        for bound, bucket in zip(self.bounds + (float('inf'),), counts):
+            seen += bucket
+            if seen >= target:
+                return bound
+        return float('inf')
+
+    def series(self):
+        """(метки, сумма, количество) по всем сериям"""
+        return [(labels, total, count) for labels, (_, total, count) in self._series.items()]
+
+    def render(self):
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket in zip(self.bounds + (float('inf'),), counts):
+                cumulative += bucket
+                le = f'le="{_format_value(bound)}"'
+                yield f'{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}'
+            yield f'{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(total)}'
+            yield f'{self.name}_count{_format_labels(self.label_names, labels)} {count}'
+
+
+class Metrics:
+    """Реестр метрик процесса: счётчики, гистограммы и сборщики текущих значений
+
+    Счётчики и гистограммы обновляются в местах событий (обработчики, запросы
+    к базе, напоминания). Сборщики - функции без аргументов, которые при
+    выгрузке возвращают [(имя, тип, описание, {метки: значение})] из уже
+    существующих счётчиков модулей (кэш итогов, очередь отправки), поэтому
+    не добавляют работы на пути апдейта. Выгрузка - текстовый формат
+    Prometheus (render, handle для aiohttp) и сводка для журнала (summary),
+    которую фоновая задача пишет раз в log_interval секунд. В режиме polling
+    выгрузку отдаёт отдельный сервер на port (в режиме webhook - сервер
+    webhook по тому же path, только при заданном token). С token запрос без
+    заголовка "Authorization: Bearer <token>" получает 401.
+    """
+
+    def __init__(self, log_interval: float = METRICS_LOG_INTERVAL, port: int = METRICS_PORT,
+                 host: str = METRICS_HOST, path: str = METRICS_PATH, token: str = METRICS_TOKEN):
+        self.log_interval = log_interval
+        self.port = port
+        self.host = host
+        self.path = path
+        self.token = token
+        self._metrics = {}
+        self._collectors = []
+        self._task = None
+        self._runner = None
+
+    def counter(self, name: str, help: str, labels=()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def _add(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Метрика {metric.name!r} уже зарегистрирована")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def register(self, collector):
+        """Сборщик текущих значений, вызывается при каждой выгрузке"""
+        self._collectors.append(collector)
+        return collector
+
+    def _collected(self):
+        for collector in self._collectors:
+            try:
+                yield from collector()
+            except Exception as e:
+                logger.error("Ошибка сборщика метрик %s: %s", collector, e)
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.render())
+        for name, type_, help, values in self._collected():
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {type_}')
+            for labels, value in values.items():
+                # Метки сборщика - кортеж пар (имя, значение)
+                names, label_values = zip(*labels) if labels else ((), ())
+                lines.append(f'{name}{_format_labels(names, label_values)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    async def handle(self, request):
+        """GET /metrics для aiohttp"""
+        from aiohttp import web
+        authorization = request.headers.get('Authorization', '').encode()
+        if self.token and not hmac.compare_digest(authorization, f'Bearer {self.token}'.encode()):
+            return web.Response(status=401, headers={'WWW-Authenticate': 'Bearer'})
+        return web.Response(body=self.render().encode(), headers={'Content-Type': CONTENT_TYPE})
+
+    def summary(self, top: int = 5) -> str:
+        """Краткая сводка: самые затратные серии гистограмм (n, p50, p99) и ненулевые значения сборщиков"""
+        parts = []
+        for metric in self._metrics.values():
+            if isinstance(metric, Histogram):
+                series = sorted(metric.series(), key=lambda item: item[1], reverse=True)[:top]
+                if series:
+                    parts.append(f"{metric.name}: " + ', '.join(
+                        f"{'/'.join(map(str, labels)) or 'всего'} n={count} "
+                        f"p50≤{metric.quantile(labels, 0.5) * 1000:g}ms p99≤{metric.quantile(labels, 0.99) * 1000:g}ms"
+                        for labels, _, count in series
+                    ))
+            else:
+                values = list(metric.samples())
+                if values:
+                    parts.append(f"{metric.name}: " + ', '.join(
+                        f"{'/'.join(map(str, labels)) or 'всего'}={_format_value(value)}" for _, labels, value in values
+                    ))
+        for name, _, _, values in self._collected():
+            # Нулевые значения в сводке не показываются
+            values = {labels: value for labels, value in values.items() if value}
+            if values:
+                parts.append(f"{name}: " + ', '.join(
+                    f"{'/'.join(str(value) for _, value in labels) or 'всего'}={_format_value(value)}"
+                    for labels, value in values.items()
+                ))
+        return '; '.join(parts)
+
+    async def start(self):
+        """Запуск периодической сводки в журнал и сервера выгрузки на port (0 - без них)"""
+        if self.log_interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._log_loop())
+        if self.port and self.path and self._runner is None:
+            # Сервер aiohttp нужен только с METRICS_PORT, поэтому импортируется здесь
+            from aiohttp import web
+            app = web.Application()
+            app.router.add_get(self.path, self.handle)
+            self._runner = web.AppRunner(app, access_log=None)
+            await self._runner.setup()
+            await web.TCPSite(self._runner, self.host, self.port).start()
+            logger.info("Метрики доступны на %s:%s%s", self.host, self.port, self.path)
+
+    async def stop(self):
+        """Остановка сводки и сервера выгрузки; итоговая сводка пишется в журнал"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+        logger.info("Метрики: %s", self.summary())
+
+    async def _log_loop(self):
+        while True:
+            await asyncio.sleep(self.log_interval)
+            logger.info("Метрики: %s", self.summary())
+
+
+class HandlerTimer(BaseMiddleware):
+    """Внутренний middleware: время каждого обработчика aiogram в гистограмме по имени функции"""
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    async def __call__(self, handler, event, data):
+        callback = data['handler'].callback
+        name = getattr(callback, '__qualname__', None) or type(callback).__name__
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            self.histogram.observe(time.perf_counter() - started, name)
+
+
+# Единый экземпляр на процесс
+metrics = Metrics()
+
+HANDLER_SECONDS = metrics.histogram('bot_handler_seconds', 'Время обработчика aiogram', ('handler',))
+MENU_ACTION_SECONDS = metrics.histogram(
+    'bot_menu_action_seconds', 'Время обработчика кнопки, ввода или inline-кнопки меню', ('action',)
+)
+DB_WAIT_SECONDS = metrics.histogram(
+    'bot_db_wait_seconds', 'Ожидание соединения: читателя из пула или очереди писателя до начала задания', ('kind',)
+)
+DB_QUERY_SECONDS = metrics.histogram(
+    'bot_db_query_seconds', 'Время запросов к базе по вызывающей функции (для записей - задание в транзакции)',
+    ('kind', 'caller')
+)
+DB_COMMIT_SECONDS = metrics.histogram('bot_db_commit_seconds', 'Время фиксации пачки заданий писателя')
+REMINDERS_SENT = metrics.counter('bot_reminders_sent_total', 'Отправлено напоминаний', ('kind',))
+REMINDERS_FAILED = metrics.counter('bot_reminders_failed_total', 'Напоминаний с ошибкой отправки', ('kind',))
@@ -0,0 +1,507 @@
+import asyncio
+import logging
+import sqlite3
+import time
+
+from config import DB_MIGRATION_BATCH, REMINDER_WATER_INTERVAL, REMINDER_MOTIVATION_INTERVAL
+from .coach import DEFAULT_COACH_ANSWERS
+from .content import CONTENT_TABLES
+from .rollups import (DAILY_ROLLUP_SELECT, DAILY_WEIGHT_UPSERT, PERIOD_COLUMNS, PERIOD_ROLLUP_SELECT,
+                      STATISTICS_COLUMNS)
+from .faq import DEFAULT_FAQ
+from .motivation import DEFAULT_MOTIVATION
+from .storage import storage
+
+logger = logging.getLogger(__name__)
+
+# Целевая схема таблиц; {name} позволяет создать копию таблицы при конвертации
+TABLES = {
+    'users': '''
+        CREATE TABLE IF NOT EXISTS {name} (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT,
+            first_name TEXT,
+            last_name TEXT,
+            daily_calories_limit INTEGER DEFAULT 2000,
+            daily_water_limit INTEGER DEFAULT 2000,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    'calories': '''
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            date DATE,
+            calories INTEGER,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    ''',
+    'water': '''
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            date DATE,
+            amount INTEGER,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    ''',
+    'activity': '''
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            date DATE,
+            steps INTEGER DEFAULT 0,
+            workout BOOLEAN DEFAULT FALSE,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    ''',
+    'weight': '''
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            date DATE,
+            weight REAL,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    ''',
+    'notes': '''
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            date DATE,
+            type TEXT CHECK(type IN ('plan', 'thought')),
+            content TEXT,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    ''',
+    'goals': '''
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            title TEXT,
+            description TEXT,
+            target_date DATE,
+            completed BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    ''',
+    'statistics': '''
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            date DATE,
+            calories_consumed INTEGER DEFAULT 0,
+            water_consumed INTEGER DEFAULT 0,
+            steps_taken INTEGER DEFAULT 0,
+            workouts_completed INTEGER DEFAULT 0,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    ''',
+    'motivation': '''
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            content TEXT NOT NULL,
+            type TEXT CHECK(type IN ('general', 'nutrition', 'fitness'))
+        )
+    ''',
+    'coach_answers': '''
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            question TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            category TEXT CHECK(category IN ('nutrition', 'fitness', 'motivation', 'general'))
+        )
+    ''',
+    'faq': '''
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            question TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            category TEXT CHECK(category IN ('nutrition', 'fitness', 'motivation', 'general'))
+        )
+    ''',
+    'user_questions': '''
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            question TEXT,
+            date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    ''',
+}
+
+# Первичный ключ, в который при конвертации копируется rowid старой таблицы
+PRIMARY_KEYS = {'users': 'user_id'}
+
+# Как получить колонку новой схемы из старых схем:
+# таблица -> колонка -> (колонка старой таблицы, SQL-выражение над старыми колонками)
+LEGACY_COLUMNS = {
+    'users': {'user_id': ('id', 'id')},
+    'activity': {'workout': ('minutes', 'COALESCE(minutes, 0) > 0')},
+    'weight': {'weight': ('value', 'value')},
+    'notes': {
+        'content': ('text', 'text'),
+        'type': ('type', "CASE WHEN type IN ('plan', 'thought') THEN type END"),
+    },
+    'motivation': {
+        'content': ('text', 'text'),
+        'type': ('category', "CASE WHEN category IN ('general', 'nutrition', 'fitness') THEN category ELSE 'general' END"),
+    },
+    'user_questions': {'date': ('created_at', 'created_at')},
+}
+
+INDEXES = [
+    # Основные запросы трекеров: WHERE user_id = ? AND date ...
+    # Значения включены в индекс, чтобы сумма за день читалась без обращения к таблице
+    'CREATE INDEX IF NOT EXISTS idx_calories_user_date ON calories (user_id, date, calories)',
+    'CREATE INDEX IF NOT EXISTS idx_water_user_date ON water (user_id, date, amount)',
+    'CREATE INDEX IF NOT EXISTS idx_activity_user_date ON activity (user_id, date, steps, workout)',
+    'CREATE INDEX IF NOT EXISTS idx_weight_user_date ON weight (user_id, date, weight)',
+    'CREATE INDEX IF NOT EXISTS idx_notes_user_date ON notes (user_id, date)',
+    'CREATE INDEX IF NOT EXISTS idx_statistics_user_date ON statistics (user_id, date)',
+    'CREATE INDEX IF NOT EXISTS idx_motivation_type ON motivation (type, content)',
+    'CREATE INDEX IF NOT EXISTS idx_coach_answers_question ON coach_answers (question)',
+    'CREATE INDEX IF NOT EXISTS idx_faq_category ON faq (category, id)',
+]
+
+# Базовый контент для пустых таблиц: (таблица, запрос вставки, строки)
+CONTENT_SEEDS = [
+    ('motivation', 'INSERT INTO motivation (content, type) VALUES (?, ?)', DEFAULT_MOTIVATION),
+    ('faq', 'INSERT INTO faq (question, answer, category) VALUES (?, ?, ?)', DEFAULT_FAQ),
+    ('coach_answers', 'INSERT INTO coach_answers (question, answer, category) VALUES (?, ?, ?)', DEFAULT_COACH_ANSWERS),
+]
+
+# Дневная статистика с UNIQUE (user_id, date), которую собирает миграция 8
+STATISTICS_ROLLUP_TABLE = '''
+    CREATE TABLE IF NOT EXISTS statistics_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        date DATE,
+        calories_consumed INTEGER DEFAULT 0,
+        water_consumed INTEGER DEFAULT 0,
+        steps_taken INTEGER DEFAULT 0,
+        workouts_completed INTEGER DEFAULT 0,
+        UNIQUE (user_id, date),
+        FOREIGN KEY (user_id) REFERENCES users (user_id)
+    )
+'''
+
+# Упорядоченный список миграций: (версия, описание, функция)
+MIGRATIONS = []
+
+# Границы ключей для обхода пачками: до первого и после последнего возможного ключа
+MIN_KEY, MAX_KEY = -2 ** 63, 2 ** 63 - 1
+
+
+def migration(version: int, description: str):
+    """Регистрация миграции схемы
+
+    Функция миграции выполняет долгую часть сама, короткими транзакциями
+    (convert_table, in_batches), так что прерванная миграция при следующем
+    запуске продолжается с места остановки, и возвращает fn(db) для последней
+    транзакции или None. В той же транзакции записывается версия схемы.
+    """
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return register
+
+
+async def table_columns(table: str):
+    """Список колонок таблицы (пустой, если таблицы нет)"""
+    rows = await storage.fetchall(f'PRAGMA table_info({table})')
+    return [row[1] for row in rows]
+
+
+def target_columns(table: str):
+    """Список колонок целевой схемы таблицы"""
+    db = sqlite3.connect(':memory:')
+    try:
+        db.execute(TABLES[table].format(name=table))
+        return [row[1] for row in db.execute(f'PRAGMA table_info({table})')]
+    finally:
+        db.close()
+
+
+def _column_map(table: str, target, legacy):
+    """Сопоставление колонок новой схемы выражениям над старой таблицей"""
+    mapping = {}
+    aliases = LEGACY_COLUMNS.get(table, {})
+    for column in target:
+        if column in aliases and aliases[column][0] in legacy:
+            mapping[column] = aliases[column][1]
+        elif column in legacy:
+            mapping[column] = column
+    return mapping
+
+
+async def convert_table(table: str, batch_size: int = None):
+    """Приведение таблицы к целевой схеме
+
+    Несовместимая таблица копируется в {table}_new пачками по batch_size строк,
+    каждая пачка — отдельная короткая транзакция. Копирование продолжается
+    с места остановки, если процесс был прерван. В конце старая таблица
+    заменяется новой в одной транзакции.
+    """
+    batch_size = batch_size or DB_MIGRATION_BATCH
+    create_sql = TABLES[table]
+    legacy = await table_columns(table)
+    if not legacy:
+        await storage.execute(create_sql.format(name=table))
+        return
+
+    new_table = f'{table}_new'
+    target = target_columns(table)
+    if set(target) <= set(legacy) and not await table_columns(new_table):
+        return
+    await storage.execute(create_sql.format(name=new_table))
+
+    pk = PRIMARY_KEYS.get(table, 'id')
+    mapping = _column_map(table, target, legacy)
+    mapping.pop(pk, None)
+    columns = ', '.join([pk] + list(mapping))
+    expressions = ', '.join(['rowid'] + list(mapping.values()))
+    logger.info("Конвертация таблицы %s: %s -> %s", table, ', '.join(legacy), ', '.join(target))
+
+    copied = 0
+    while True:
+        async def copy_batch(db):
+            async with db.execute(f'SELECT COALESCE(MAX({pk}), -1) FROM {new_table}') as cursor:
+                last = (await cursor.fetchone())[0]
+            async with db.execute(f'''
+                INSERT INTO {new_table} ({columns})
+                SELECT {expressions} FROM {table}
+                WHERE rowid > ? ORDER BY rowid LIMIT ?
+            ''', (last, batch_size)) as cursor:
+                return cursor.rowcount
+        count = await storage.write(copy_batch)
+        copied += count
+        if count < batch_size:
+            break
+        # Даём циклу обработать другие задачи между пачками
+        await asyncio.sleep(0)
+
+    async def swap(db):
+        await db.execute(f'DROP TABLE {table}')
+        await db.execute(f'ALTER TABLE {new_table} RENAME TO {table}')
+    await storage.write(swap)
+    logger.info("Таблица %s сконвертирована, строк: %s", table, copied)
+
+
+async def in_batches(keys_sql: str, step, after=MIN_KEY, batch_size: int = None):
+    """Обработка диапазонов ключей по возрастанию, каждая пачка - отдельная короткая транзакция
+
+    keys_sql выбирает до :limit ключей больше :after по возрастанию; step(db, bounds)
+    обрабатывает ключи из полуинтервала (bounds['after'], bounds['upto']]. Последняя
+    пачка продолжается до MAX_KEY, поэтому диапазоны покрывают все ключи, в том числе
+    отсутствующие в keys_sql. Чтобы продолжить прерванную обработку, after - последний
+    ключ, уже обработанный в базе. Возвращает число пачек.
+    """
+    batch_size = batch_size or DB_MIGRATION_BATCH
+    batches = 0
+    while True:
+        async def run_batch(db):
+            async with db.execute(keys_sql, {'after': after, 'limit': batch_size}) as cursor:
+                keys = await cursor.fetchall()
+            upto = keys[-1][0] if len(keys) == batch_size else MAX_KEY
+            await step(db, {'after': after, 'upto': upto})
+            return upto
+        after = await storage.write(run_batch)
+        batches += 1
+        if after == MAX_KEY:
+            return batches
+        # Даём циклу обработать другие задачи между пачками
+        await asyncio.sleep(0)
+
+
+@migration(1, 'базовая схема и конвертация старых таблиц')
+async def _baseline():
+    for table in TABLES:
+        await convert_table(table)
+
+
+@migration(2, 'индексы для запросов трекеров')
+async def _indexes():
+    async def create(db):
+        for sql in INDEXES:
+            await db.execute(sql)
+    return create
+
+
+@migration(3, 'базовый контент: мотивация, FAQ, ответы тренера')
+async def _seed_content():
+    async def seed(db):
+        for table, sql, rows in CONTENT_SEEDS:
+            async with db.execute(f'SELECT 1 FROM {table} LIMIT 1') as cursor:
+                if await cursor.fetchone():
+                    continue
+            await db.executemany(sql, rows)
+    return seed
+
+
+@migration(4, 'состояние диалогов пользователей')
+async def _user_state():
+    async def create(db):
+        await db.execute('''
+            CREATE TABLE IF NOT EXISTS user_state (
+                chat_id INTEGER,
+                user_id INTEGER,
+                state TEXT,
+                expires_at REAL,
+                PRIMARY KEY (chat_id, user_id)
+            )
+        ''')
+        await db.execute('CREATE INDEX IF NOT EXISTS idx_user_state_expires ON user_state (expires_at)')
+    return create
+
+
+@migration(5, 'расписания напоминаний для всех пользователей')
+async def _reminder_schedule():
+    now = time.time()
+
+    async def create_schedule(db):
+        await db.execute('''
+            CREATE TABLE IF NOT EXISTS reminder_schedule (
+                user_id INTEGER,
+                kind TEXT,
+                interval REAL,
+                next_at REAL,
+                PRIMARY KEY (user_id, kind)
+            )
+        ''')
+        # Уже зарегистрированные пользователи получают расписание по умолчанию;
+        # первое срабатывание разнесено по интервалу, чтобы не отправлять всё сразу
+        for kind, interval in (('water', REMINDER_WATER_INTERVAL), ('motivation', REMINDER_MOTIVATION_INTERVAL)):
+            await db.execute('''
+                INSERT OR IGNORE INTO reminder_schedule (user_id, kind, interval, next_at)
+                SELECT user_id, ?, ?, ? + abs(random() % ?) FROM users
+            ''', (kind, interval, now, interval))
+    return create_schedule
+
+
+@migration(6, 'время записи воды для напоминаний')
+async def _water_created_at():
+    if 'created_at' not in await table_columns('water'):
+        await storage.execute('ALTER TABLE water ADD COLUMN created_at REAL')
+
+    async def add_timestamp(db, bounds):
+        # Для старых записей известна только дата: считаем их сделанными в полночь
+        await db.execute('''
+            UPDATE water SET created_at = CAST(strftime('%s', date, 'utc') AS REAL)
+            WHERE id > :after AND id <= :upto AND created_at IS NULL
+        ''', bounds)
+    await in_batches('SELECT id FROM water WHERE id > :after ORDER BY id LIMIT :limit', add_timestamp)
+
+    async def create_index(db):
+        await db.execute('CREATE INDEX IF NOT EXISTS idx_water_user_created ON water (user_id, created_at, amount)')
+    return create_index
+
+
+@migration(7, 'версии справочного контента для кэша')
+async def _content_version():
+    async def create_versions(db):
+        await db.execute('''
+            CREATE TABLE IF NOT EXISTS content_version (
+                name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        for table in CONTENT_TABLES:
+            await db.execute('INSERT OR IGNORE INTO content_version (name, version) VALUES (?, 1)', (table,))
+            for event in ('INSERT', 'UPDATE', 'DELETE'):
+                await db.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()}
+                    AFTER {event} ON {table}
+                    BEGIN
+                        UPDATE content_version SET version = version + 1 WHERE name = '{table}';
+                    END
+                ''')
+    return create_versions
+
+
+@migration(8, 'статистика как дневные итоги: UNIQUE (user_id, date) и пересчёт из записей')
+async def _statistics_rollup():
+    # Старые строки могли дублироваться и хранить последнее значение вместо суммы,
+    # поэтому таблица собирается заново из записей трекеров пачками пользователей;
+    # уже собранные пользователи при повторном запуске пропускаются
+    await storage.execute(STATISTICS_ROLLUP_TABLE)
+    done = (await storage.fetchone('SELECT MAX(user_id) FROM statistics_new'))[0]
+
+    async def rollup(db, bounds):
+        await db.execute(f'''
+            INSERT INTO statistics_new (user_id, date, {', '.join(STATISTICS_COLUMNS)})
+            {DAILY_ROLLUP_SELECT.format(where='WHERE user_id > :after AND user_id <= :upto')}
+        ''', bounds)
+    await in_batches('SELECT user_id FROM users WHERE user_id > :after ORDER BY user_id LIMIT :limit',
+                     rollup, MIN_KEY if done is None else done)
+
+    async def swap(db):
+        await db.execute('DROP TABLE statistics')
+        await db.execute('ALTER TABLE statistics_new RENAME TO statistics')
+    return swap
+
+
+@migration(9, 'недельные и месячные итоги для истории')
+async def _statistics_periods():
+    async def create_periods(db):
+        if 'weight' not in columns:
+            await db.execute('ALTER TABLE statistics ADD COLUMN weight REAL')
+        await db.execute('''
+            CREATE TABLE IF NOT EXISTS statistics_periods (
+                user_id INTEGER,
+                period TEXT CHECK(period IN ('week', 'month')),
+                start DATE,
+                calories_consumed INTEGER DEFAULT 0,
+                water_consumed INTEGER DEFAULT 0,
+                steps_taken INTEGER DEFAULT 0,
+                workouts_completed INTEGER DEFAULT 0,
+                weight_total REAL DEFAULT 0,
+                weight_days INTEGER DEFAULT 0,
+                PRIMARY KEY (user_id, period, start)
+            )
+        ''')
+    columns = await table_columns('statistics')
+    await storage.write(create_periods)
+
+    # Вес за день переносится в статистику заново (повтор безопасен), итоги периодов -
+    # пачками пользователей, начиная после последнего уже посчитанного
+    async def weights(db, bounds):
+        await db.execute(DAILY_WEIGHT_UPSERT.format(where='WHERE id > :after AND id <= :upto'), bounds)
+    await in_batches('SELECT id FROM weight WHERE id > :after ORDER BY id LIMIT :limit', weights)
+    done = (await storage.fetchone('SELECT MAX(user_id) FROM statistics_periods'))[0]
+
+    async def periods(db, bounds):
+        await db.execute(f'''
+            INSERT INTO statistics_periods (user_id, period, start, {', '.join(PERIOD_COLUMNS)})
+            {PERIOD_ROLLUP_SELECT.format(where='WHERE user_id > :after AND user_id <= :upto')}
+        ''', bounds)
+    await in_batches('SELECT user_id FROM users WHERE user_id > :after ORDER BY user_id LIMIT :limit',
+                     periods, MIN_KEY if done is None else done)
+
+
+async def get_version() -> int:
+    """Текущая версия схемы"""
+    row = await storage.fetchone('PRAGMA user_version')
+    return row[0]
+
+
+async def migrate():
+    """Применение всех новых миграций по порядку (один раз при запуске)"""
+    current = await get_version()
+    for version, description, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version <= current:
+            continue
+        logger.info("Миграция схемы %s: %s", version, description)
+        finish = await fn()
+
+        async def commit(db):
+            if finish:
+                await finish(db)
+            # Версия меняется в одной транзакции с последним шагом: после сбоя миграция
+            # либо применена целиком, либо продолжается при следующем запуске
+            await db.execute(f'PRAGMA user_version = {version}')
+        await storage.write(commit, durable=True)
+        current = version
+    return current
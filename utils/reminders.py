@@ -1,97 +1,269 @@
 import asyncio
+import heapq
+import json
 import logging
-from datetime import datetime, timedelta
+import time
+from collections import defaultdict
 from aiogram import Bot
-from .database import DB_PATH
-import aiosqlite
-from utils.motivation import get_random_motivation, get_random_nutrition_tip, get_random_fitness_tip
+from aiogram.exceptions import TelegramForbiddenError
+from config import REMINDER_WATER_INTERVAL, REMINDER_MOTIVATION_INTERVAL, REMINDER_CONCURRENCY, REMINDER_BATCH
+from .content import content
+from .metrics import REMINDERS_SENT, REMINDERS_FAILED
+from .send_queue import REMINDER, priority
+from .storage import storage
+
+logger = logging.getLogger(__name__)
+
+# Расписание по умолчанию для нового пользователя: вид напоминания -> интервал, секунды
+DEFAULT_SCHEDULE = {
+    'water': REMINDER_WATER_INTERVAL,
+    'motivation': REMINDER_MOTIVATION_INTERVAL,
+}
+
+# Напоминание о воде уходит, если за последние 2 часа выпито меньше 200 мл
+WATER_CHECK_WINDOW = 7200  # секунды
+WATER_CHECK_MIN = 200  # мл
+
 
 class Reminders:
-    def __init__(self, bot: Bot):
+    """Планировщик напоминаний для всех пользователей
+
+    Время следующего срабатывания каждой пары (user_id, вид) хранится в куче,
+    которую обслуживает одна задача asyncio. Расписания сохраняются в таблицу
+    reminder_schedule и восстанавливаются при запуске. При изменении расписания
+    старая запись в куче не удаляется, а пропускается при извлечении.
+    Отбор получателей и отправка идут отдельными задачами (одновременных
+    отправок не больше REMINDER_CONCURRENCY), поэтому медленная рассылка не
+    задерживает следующие срабатывания.
+    """
+
+    def __init__(self, bot: Bot, clock=time.time, persist: bool = True):
         self.bot = bot
-        self.user_id = None
-        self.water_task = None
-        self.motivation_task = None
-        self.water_hours = list(range(8, 21, 4))  # 8:00, 12:00, 16:00, 20:00
+        self.clock = clock
+        self.persist = persist
+        self.fired = 0
+        self.handlers = {
+            'water': self.send_water_reminder,
+            'motivation': self.send_motivation,
+        }
+        # Отбор получателей одним запросом на пачку пользователей (по умолчанию - все)
+        self.selectors = {
+            'water': self.select_thirsty,
+        }
+        self._schedules = {}  # (user_id, вид) -> (интервал, время срабатывания)
+        self._heap = []
+        self._task = None
+        self._dispatches = set()  # задачи рассылки наступивших напоминаний
+        self._wakeup = None
+        self._limit = None
 
-    def set_user(self, user_id: int):
-        """Установка пользователя для напоминаний"""
-        self.user_id = user_id
+    def __len__(self):
+        return len(self._schedules)
 
     async def start(self):
-        """Запуск напоминаний"""
-        if self.water_task:
-            self.water_task.cancel()
-        if self.motivation_task:
-            self.motivation_task.cancel()
-
-        # Запускаем напоминания о воде каждые 2 часа
-        self.water_task = asyncio.create_task(self.water_reminder())
-        
-        # Запускаем мотивационные сообщения каждые 4 часа
-        self.motivation_task = asyncio.create_task(self.motivation_reminder())
+        """Восстановление расписаний из базы и запуск планировщика"""
+        self._wakeup = asyncio.Event()
+        self._limit = asyncio.Semaphore(REMINDER_CONCURRENCY)
+        if self.persist:
+            await self.load()
+        self._task = asyncio.create_task(self._run())
 
     async def stop(self):
-        """Остановка напоминаний"""
-        if self.water_task:
-            self.water_task.cancel()
-        if self.motivation_task:
-            self.motivation_task.cancel()
+        """Остановка планировщика и незавершённых рассылок"""
+        tasks = list(self._dispatches)
+        if self._task:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
-    async def water_reminder(self):
-        """Напоминание о воде"""
+    async def load(self):
+        """Загрузка всех расписаний из базы"""
+        rows = await storage.fetchall('SELECT user_id, kind, interval, next_at FROM reminder_schedule')
+        for user_id, kind, interval, next_at in rows:
+            self.schedule(user_id, kind, interval, next_at)
+        logger.info("Восстановлено расписаний напоминаний: %s", len(rows))
+        return len(rows)
+
+    def schedule(self, user_id: int, kind: str, interval: float, next_at: float = None):
+        """Установка расписания в памяти (без записи в базу)"""
+        if next_at is None:
+            next_at = self.clock() + interval
+        self._schedules[(user_id, kind)] = (interval, next_at)
+        heapq.heappush(self._heap, (next_at, user_id, kind))
+        # Устаревшие записи копятся в куче при каждом изменении расписания
+        if len(self._heap) > 2 * len(self._schedules) + 64:
+            self._rebuild()
+        if self._wakeup is not None and self._heap[0][0] == next_at:
+            self._wakeup.set()
+
+    def unschedule(self, user_id: int, kind: str = None):
+        """Удаление расписаний пользователя из памяти (запись в куче станет устаревшей)"""
+        kinds = [kind] if kind else list(self.handlers)
+        for item in kinds:
+            self._schedules.pop((user_id, item), None)
+
+    async def add_user(self, user_id: int):
+        """Расписание по умолчанию для пользователя, если его ещё нет"""
+        rows = []
+        for kind, interval in DEFAULT_SCHEDULE.items():
+            if (user_id, kind) in self._schedules:
+                continue
+            self.schedule(user_id, kind, interval)
+            rows.append((user_id, kind, interval, self._schedules[(user_id, kind)][1]))
+        if rows and self.persist:
+            await storage.executemany('''
+                INSERT OR IGNORE INTO reminder_schedule (user_id, kind, interval, next_at)
+                VALUES (?, ?, ?, ?)
+            ''', rows)
+
+    async def set_schedule(self, user_id: int, kind: str, interval: float):
+        """Изменение интервала напоминания пользователя"""
+        self.schedule(user_id, kind, interval)
+        if self.persist:
+            await storage.execute('''
+                INSERT INTO reminder_schedule (user_id, kind, interval, next_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (user_id, kind) DO UPDATE SET
+                    interval = excluded.interval, next_at = excluded.next_at
+            ''', (user_id, kind, interval, self._schedules[(user_id, kind)][1]))
+
+    async def remove_user(self, user_id: int, kind: str = None):
+        """Отключение напоминаний пользователя (всех или одного вида)"""
+        self.unschedule(user_id, kind)
+        if not self.persist:
+            return
+        if kind:
+            await storage.execute('DELETE FROM reminder_schedule WHERE user_id = ? AND kind = ?', (user_id, kind))
+        else:
+            await storage.execute('DELETE FROM reminder_schedule WHERE user_id = ?', (user_id,))
+
+    def next_fire(self):
+        """Время ближайшего срабатывания или None"""
+        heap = self._heap
+        while heap:
+            next_at, user_id, kind = heap[0]
+            current = self._schedules.get((user_id, kind))
+            if current is not None and current[1] == next_at:
+                return next_at
+            heapq.heappop(heap)
+        return None
+
+    def pop_due(self, now: float = None):
+        """Извлечение наступивших напоминаний и планирование следующих
+
+        Возвращает список (user_id, вид, время следующего срабатывания).
+        Пропущенные срабатывания (например, во время простоя) не накапливаются:
+        следующее назначается через интервал от текущего момента.
+        """
+        if now is None:
+            now = self.clock()
+        heap = self._heap
+        due = []
+        while heap and heap[0][0] <= now:
+            next_at, user_id, kind = heapq.heappop(heap)
+            current = self._schedules.get((user_id, kind))
+            if current is None or current[1] != next_at:
+                continue
+            interval = current[0]
+            following = next_at + interval
+            if following <= now:
+                following = now + interval
+            self._schedules[(user_id, kind)] = (interval, following)
+            due.append((user_id, kind, following))
+        # Новые записи добавляются после извлечения, чтобы не сработать дважды за проход
+        for user_id, kind, following in due:
+            heapq.heappush(heap, (following, user_id, kind))
+        return due
+
+    def _rebuild(self):
+        self._heap = [(next_at, user_id, kind) for (user_id, kind), (_, next_at) in self._schedules.items()]
+        heapq.heapify(self._heap)
+
+    async def _run(self):
         while True:
+            next_at = self.next_fire()
+            delay = None if next_at is None else next_at - self.clock()
+            if delay is None or delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            due = self.pop_due()
             try:
-                # Проверяем, сколько воды выпито за последние 2 часа
-                async with aiosqlite.connect(DB_PATH) as db:
-                    two_hours_ago = (datetime.now() - timedelta(hours=2)).strftime('%Y-%m-%d %H:%M:%S')
-                    async with db.execute('''
-                        SELECT SUM(amount) FROM water 
-                        WHERE user_id = ? AND datetime(date || ' ' || time) > ?
-                    ''', (self.user_id, two_hours_ago)) as cursor:
-                        amount = await cursor.fetchone()
-                        amount = amount[0] if amount[0] else 0
-
-                if amount < 200:  # Если выпито меньше 200 мл за 2 часа
-                    await self.bot.send_message(
-                        self.user_id,
-                        "💧 Не забывай пить воду! За последние 2 часа ты выпил(а) мало воды."
+                if self.persist:
+                    await storage.executemany(
+                        'UPDATE reminder_schedule SET next_at = ? WHERE user_id = ? AND kind = ?',
+                        [(following, user_id, kind) for user_id, kind, following in due]
                     )
             except Exception as e:
-                logging.error(f"Error in water reminder: {e}")
+                logger.error("Error in reminder scheduler: %s", e)
+            by_kind = defaultdict(list)
+            for user_id, kind, _ in due:
+                by_kind[kind].append(user_id)
+            # Рассылка - отдельной задачей: куча обслуживается дальше, отправки ограничивает self._limit
+            for kind, user_ids in by_kind.items():
+                task = asyncio.create_task(self._dispatch(kind, user_ids))
+                self._dispatches.add(task)
+                task.add_done_callback(self._dispatches.discard)
 
-            await asyncio.sleep(7200)  # 2 часа
+    async def _dispatch(self, kind: str, user_ids: list):
+        """Отбор получателей пачками и отправка, не дожидаясь отбора всех пачек"""
+        select = self.selectors.get(kind)
+        try:
+            for start in range(0, len(user_ids), REMINDER_BATCH):
+                batch = user_ids[start:start + REMINDER_BATCH]
+                recipients = await select(batch) if select else batch
+                await asyncio.gather(*(self._fire(user_id, kind) for user_id in recipients))
+        except Exception as e:
+            logger.error("Error in %s reminder dispatch: %s", kind, e)
 
-    async def motivation_reminder(self):
-        """Мотивационные сообщения"""
-        while True:
+    async def _fire(self, user_id: int, kind: str):
+        async with self._limit:
             try:
-                # Получаем случайную мотивацию из базы данных
-                async with aiosqlite.connect(DB_PATH) as db:
-                    async with db.execute('''
-                        SELECT content FROM motivation 
-                        ORDER BY RANDOM() LIMIT 1
-                    ''') as cursor:
-                        motivation = await cursor.fetchone()
-                        if motivation:
-                            await self.bot.send_message(
-                                self.user_id,
-                                f"💪 {motivation[0]}"
-                            )
+                # Напоминания уступают очередь ответам на сообщения пользователей
+                with priority(REMINDER):
+                    await self.handlers[kind](user_id)
+                self.fired += 1
+                REMINDERS_SENT.inc(kind)
+            except TelegramForbiddenError:
+                # Пользователь заблокировал бота: напоминания больше не нужны
+                REMINDERS_FAILED.inc(kind)
+                await self.remove_user(user_id)
             except Exception as e:
-                logging.error(f"Error in motivation reminder: {e}")
+                REMINDERS_FAILED.inc(kind)
+                logger.error("Error in %s reminder for %s: %s", kind, user_id, e)
 
-            await asyncio.sleep(14400)  # 4 часа
+    async def select_thirsty(self, user_ids: list):
+        """Пользователи из списка, выпившие мало воды за последние 2 часа"""
+        # Один запрос на всю пачку: для каждого пользователя - поиск по индексу (user_id, created_at)
+        rows = await storage.fetchall('''
+            SELECT due.value FROM json_each(?) AS due
+            WHERE (
+                SELECT COALESCE(SUM(amount), 0) FROM water
+                WHERE water.user_id = due.value AND water.created_at > ?
+            ) < ?
+        ''', (json.dumps(user_ids), self.clock() - WATER_CHECK_WINDOW, WATER_CHECK_MIN))
+        return [row[0] for row in rows]
 
-    async def send_water_reminder(self):
-        if self.user_id:
+    async def send_water_reminder(self, user_id: int):
+        """Напоминание о воде"""
+        await self.bot.send_message(
+            user_id,
+            "💧 Не забывай пить воду! За последние 2 часа ты выпил(а) мало воды."
+        )
+
+    async def send_motivation(self, user_id: int):
+        """Мотивационное сообщение"""
+        # Случайная фраза любого типа из кэша контента
+        await content.ensure_loaded()
+        motivation = content.random_motivation()
+        if motivation:
             await self.bot.send_message(
-                self.user_id,
-                "💧 Не забудь попить воды! Это важно для метаболизма и самочувствия."
+                user_id,
+                f"💪 {motivation}"
             )
-
-    async def send_morning_motivation(self):
-        if self.user_id:
-            tip = get_random_nutrition_tip() if datetime.datetime.now().hour % 2 == 0 else get_random_fitness_tip()
-            msg = f"🌅 Доброе утро!\n\n{get_random_motivation()}\n\nСовет дня: {tip}"
-            await self.bot.send_message(self.user_id, msg) 
\ No newline at end of file
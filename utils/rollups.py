@@ -0,0 +1,155 @@
+from datetime import datetime, timedelta
+
+from .storage import storage
+
+# Колонки дневной статистики, которые пересчитываются из записей трекеров
+STATISTICS_COLUMNS = ('calories_consumed', 'water_consumed', 'steps_taken', 'workouts_completed')
+
+# Периоды накопительных итогов в statistics_periods
+PERIODS = ('week', 'month')
+
+# Дневные итоги из исходных записей; workout - признак тренировки за день, поэтому MAX
+DAILY_ROLLUP_SELECT = '''
+    SELECT user_id, date, SUM(calories), SUM(water), SUM(steps), MAX(workout)
+    FROM (
+        SELECT user_id, date, calories, 0 AS water, 0 AS steps, 0 AS workout FROM calories {where}
+        UNION ALL
+        SELECT user_id, date, 0, amount, 0, 0 FROM water {where}
+        UNION ALL
+        SELECT user_id, date, 0, 0, COALESCE(steps, 0), COALESCE(workout, 0) FROM activity {where}
+    )
+    GROUP BY user_id, date
+'''
+
+# Вес за день (одна запись в день) в дневную статистику
+DAILY_WEIGHT_UPSERT = '''
+    INSERT INTO statistics (user_id, date, weight)
+    SELECT user_id, date, weight FROM weight {where}
+    ORDER BY id
+    ON CONFLICT (user_id, date) DO UPDATE SET weight = excluded.weight
+'''
+
+# Недельные (с понедельника) и месячные итоги из дневной статистики
+PERIOD_ROLLUP_SELECT = '''
+    SELECT user_id, 'week', date(date, 'weekday 0', '-6 days'),
+           SUM(calories_consumed), SUM(water_consumed), SUM(steps_taken), SUM(workouts_completed),
+           COALESCE(SUM(weight), 0), COUNT(weight)
+    FROM statistics {where}
+    GROUP BY 1, 2, 3
+    UNION ALL
+    SELECT user_id, 'month', date(date, 'start of month'),
+           SUM(calories_consumed), SUM(water_consumed), SUM(steps_taken), SUM(workouts_completed),
+           COALESCE(SUM(weight), 0), COUNT(weight)
+    FROM statistics {where}
+    GROUP BY 1, 2, 3
+'''
+
+PERIOD_COLUMNS = STATISTICS_COLUMNS + ('weight_total', 'weight_days')
+
+
+def period_start(period: str, date: str) -> str:
+    """Начало недели (понедельник) или месяца для даты YYYY-MM-DD"""
+    day = datetime.strptime(date, '%Y-%m-%d').date()
+    if period == 'week':
+        day -= timedelta(days=day.weekday())
+    else:
+        day = day.replace(day=1)
+    return day.isoformat()
+
+
+def _check(columns):
+    unknown = set(columns) - set(STATISTICS_COLUMNS)
+    if unknown:
+        raise ValueError(f"Неизвестные колонки статистики: {', '.join(sorted(unknown))}")
+
+
+async def _bump_periods(db, user_id: int, date: str, deltas: dict):
+    """Прибавление изменений дня к недельным и месячным итогам"""
+    deltas = {column: delta for column, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    columns = list(deltas)
+    await db.executemany(f'''
+        INSERT INTO statistics_periods (user_id, period, start, {', '.join(columns)})
+        VALUES (?, ?, ?, {', '.join('?' * len(columns))})
+        ON CONFLICT (user_id, period, start) DO UPDATE SET
+            {', '.join(f'{column} = {column} + excluded.{column}' for column in columns)}
+    ''', [(user_id, period, period_start(period, date), *deltas.values()) for period in PERIODS])
+
+
+async def _day_values(db, user_id: int, date: str, columns):
+    async with db.execute(
+        f'SELECT {", ".join(columns)} FROM statistics WHERE user_id = ? AND date = ?',
+        (user_id, date)
+    ) as cursor:
+        row = await cursor.fetchone()
+    return dict(zip(columns, row)) if row else {}
+
+
+async def increment(db, user_id: int, date: str, **deltas):
+    """Прибавление к дневной статистике и итогам периодов (на соединении писателя, в транзакции записи)"""
+    _check(deltas)
+    columns = list(deltas)
+    await db.execute(f'''
+        INSERT INTO statistics (user_id, date, {', '.join(columns)})
+        VALUES (?, ?, {', '.join('?' * len(columns))})
+        ON CONFLICT (user_id, date) DO UPDATE SET
+            {', '.join(f'{column} = {column} + excluded.{column}' for column in columns)}
+    ''', (user_id, date, *deltas.values()))
+    await _bump_periods(db, user_id, date, deltas)
+
+
+async def assign(db, user_id: int, date: str, **values):
+    """Установка значений дневной статистики (например, после сброса за день)"""
+    _check(values)
+    columns = list(values)
+    # Итоги периодов меняются на разницу между новым и прежним значением дня
+    previous = await _day_values(db, user_id, date, columns)
+    await db.execute(f'''
+        INSERT INTO statistics (user_id, date, {', '.join(columns)})
+        VALUES (?, ?, {', '.join('?' * len(columns))})
+        ON CONFLICT (user_id, date) DO UPDATE SET
+            {', '.join(f'{column} = excluded.{column}' for column in columns)}
+    ''', (user_id, date, *values.values()))
+    await _bump_periods(db, user_id, date, {
+        column: value - (previous.get(column) or 0) for column, value in values.items()
+    })
+
+
+async def set_weight(db, user_id: int, date: str, weight):
+    """Вес за день в статистике и итогах периодов (None - вес удалён)"""
+    previous = (await _day_values(db, user_id, date, ('weight',))).get('weight')
+    await db.execute('''
+        INSERT INTO statistics (user_id, date, weight)
+        VALUES (?, ?, ?)
+        ON CONFLICT (user_id, date) DO UPDATE SET weight = excluded.weight
+    ''', (user_id, date, weight))
+    await _bump_periods(db, user_id, date, {
+        'weight_total': (weight or 0) - (previous or 0),
+        'weight_days': (weight is not None) - (previous is not None),
+    })
+
+
+async def rebuild(user_id: int = None):
+    """Пересчёт дневной статистики и итогов периодов из исходных записей одной транзакцией
+
+    Возвращает число дней статистики после пересчёта.
+    """
+    where, params = ('WHERE user_id = ?', (user_id,)) if user_id is not None else ('', ())
+
+    async def recompute(db):
+        await db.execute(f'DELETE FROM statistics {where}', params)
+        await db.execute(f'''
+            INSERT INTO statistics (user_id, date, {', '.join(STATISTICS_COLUMNS)})
+            {DAILY_ROLLUP_SELECT.format(where=where)}
+        ''', params * 3)
+        await db.execute(DAILY_WEIGHT_UPSERT.format(where=where or 'WHERE true'), params)
+        await db.execute(f'DELETE FROM statistics_periods {where}', params)
+        await db.execute(f'''
+            INSERT INTO statistics_periods (user_id, period, start, {', '.join(PERIOD_COLUMNS)})
+            {PERIOD_ROLLUP_SELECT.format(where=where)}
+        ''', params * 2)
+        async with db.execute(f'SELECT COUNT(*) FROM statistics {where}', params) as cursor:
+            return (await cursor.fetchone())[0]
+
+    return await storage.write(recompute)
@@ -0,0 +1,235 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+
+from config import SEND_GLOBAL_RATE, SEND_CHAT_RATE, SEND_CHAT_BURST, SEND_GROUP_RATE, SEND_MAX_RETRIES
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты исходящих сообщений: меньше - раньше
+INTERACTIVE = 0
+REMINDER = 1
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', REMINDER: 'reminder'}
+
+# Приоритет запросов текущей задачи; ответы в обработчиках идут с INTERACTIVE
+send_priority = ContextVar('send_priority', default=INTERACTIVE)
+
+
+@contextmanager
+def priority(level: int):
+    """Отправка сообщений внутри блока с заданным приоритетом"""
+    token = send_priority.set(level)
+    try:
+        yield
+    finally:
+        send_priority.reset(token)
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше capacity про запас"""
+
+    def __init__(self, rate: float, capacity: float, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Резервирует токен и возвращает, сколько секунд ждать до него (0 - сразу)"""
+        self._refill()
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def delay(self) -> float:
+        """Сколько секунд ждать до появления токена"""
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+    def pause(self, seconds: float):
+        """Обнуляет запас так, чтобы следующий токен появился не раньше чем через seconds"""
+        self._refill()
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+    @property
+    def idle(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+class SendQueue(BaseRequestMiddleware):
+    """Очередь исходящих сообщений с ограничением скорости и приоритетами
+
+    Подключается как middleware сессии бота, поэтому через неё проходят и
+    message.answer в обработчиках, и напоминания. Методы с chat_id сначала ждут
+    токен своего чата, затем встают в общую очередь с приоритетом, из которой
+    одна задача выдаёт глобальные токены. TelegramRetryAfter приостанавливает
+    выдачу на указанное время, после чего запрос повторяется.
+    """
+
+    def __init__(self, global_rate: float = SEND_GLOBAL_RATE, chat_rate: float = SEND_CHAT_RATE,
+                 chat_burst: float = SEND_CHAT_BURST, group_rate: float = SEND_GROUP_RATE,
+                 max_retries: int = SEND_MAX_RETRIES,
+                 clock=time.monotonic, sleep=asyncio.sleep):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        self.clock = clock
+        self.sleep = sleep
+        self.retries = 0
+        self._seq = itertools.count()
+        self._global = None
+        self._chats = {}
+        self._waiters = []  # (приоритет, порядковый номер, future)
+        self._task = None
+        self._wakeup = None
+        self._metrics = {
+            level: {'sent': 0, 'waiting': 0, 'max_waiting': 0, 'wait': deque(maxlen=1000), 'latency': deque(maxlen=1000)}
+            for level in PRIORITY_NAMES
+        }
+
+    async def start(self):
+        """Запуск выдачи токенов"""
+        # Без запаса: пачка в global_rate сообщений сверх ровного потока уже нарушает лимит за секунду
+        self._global = TokenBucket(self.global_rate, 1, self.clock)
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Остановка выдачи токенов; ожидающие запросы отправляются без ограничений"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for _, _, future in self._waiters:
+            if not future.done():
+                future.set_result(None)
+        self._waiters.clear()
+
+    async def __call__(self, make_request, bot, method):
+        chat_id = getattr(method, 'chat_id', None)
+        if chat_id is None or self._task is None:
+            return await make_request(bot, method)
+
+        level = send_priority.get()
+        metrics = self._metrics[level]
+        seq = next(self._seq)
+        started = self.clock()
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(chat_id, level, seq, metrics)
+            if attempt == 0:
+                metrics['wait'].append(self.clock() - started)
+            try:
+                result = await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                logger.warning("Лимит Telegram для чата %s: пауза %s с", chat_id, e.retry_after)
+                self._global.pause(e.retry_after)
+                self._chat_bucket(chat_id).pause(e.retry_after)
+                continue
+            metrics['sent'] += 1
+            metrics['latency'].append(self.clock() - started)
+            return result
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # Полные вёдра неактивных чатов ничего не ограничивают, их можно забыть
+            if len(self._chats) >= 10000:
+                self._chats = {key: value for key, value in self._chats.items() if not value.idle}
+            # Отрицательный chat_id - группа, для групп лимит Telegram строже
+            rate = self.group_rate if isinstance(chat_id, int) and chat_id < 0 else self.chat_rate
+            bucket = self._chats[chat_id] = TokenBucket(rate, self.chat_burst, self.clock)
+        return bucket
+
+    async def _acquire(self, chat_id, level, seq, metrics):
+        if self._task is None:
+            return
+        delay = self._chat_bucket(chat_id).reserve()
+        if delay > 0:
+            await self.sleep(delay)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (level, seq, future))
+        metrics['waiting'] += 1
+        metrics['max_waiting'] = max(metrics['max_waiting'], metrics['waiting'])
+        self._wakeup.set()
+        try:
+            await future
+        finally:
+            metrics['waiting'] -= 1
+
+    async def _run(self):
+        while True:
+            if not self._waiters:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            delay = self._global.delay()
+            if delay > 0:
+                await self.sleep(delay)
+                continue
+            _, _, future = heapq.heappop(self._waiters)
+            # Запрос мог быть отменён, пока ждал очереди
+            if not future.done():
+                self._global.take()
+                future.set_result(None)
+
+    def stats(self) -> dict:
+        """Глубина очереди и задержки отправки по приоритетам (p50/p99, секунды)"""
+        def percentile(values, q):
+            if not values:
+                return 0.0
+            values = sorted(values)
+            return values[min(len(values) - 1, int(len(values) * q))]
+
+        stats = {
+            PRIORITY_NAMES[level]: {
+                'sent': m['sent'],
+                'waiting': m['waiting'],
+                'max_waiting': m['max_waiting'],
+                'wait_p50': percentile(m['wait'], 0.5),
+                'wait_p99': percentile(m['wait'], 0.99),
+                'latency_p50': percentile(m['latency'], 0.5),
+                'latency_p99': percentile(m['latency'], 0.99),
+            }
+            for level, m in self._metrics.items()
+        }
+        stats['retries'] = self.retries
+        return stats
+
+    def collect(self):
+        """Значения для реестра метрик: глубина очереди и отправлено по приоритетам"""
+        def by_priority(key):
+            return {(('priority', PRIORITY_NAMES[level]),): m[key] for level, m in self._metrics.items()}
+        return [
+            ('bot_send_queue_waiting', 'gauge', 'Запросов в очереди отправки', by_priority('waiting')),
+            ('bot_send_queue_max_waiting', 'gauge', 'Наибольшая глубина очереди отправки', by_priority('max_waiting')),
+            ('bot_send_queue_sent_total', 'counter', 'Отправлено через очередь', by_priority('sent')),
+            ('bot_send_queue_retries_total', 'counter', 'Повторов после RetryAfter', {(): self.retries}),
+        ]
+
+
+# Единый экземпляр на процесс
+send_queue = SendQueue()
@@ -0,0 +1,70 @@
+import os
+import re
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Каталог с bot.py: модули бота импортируются оттуда, откуда бы ни запускали профилирование
+ROOT = Path(__file__).resolve().parent.parent
+
+_IMPORT_LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)')
+
+
+class StartupTimer:
+    """Время этапов запуска: импорт модулей бота и шаги инициализации по порядку"""
+
+    def __init__(self):
+        self.imports = None  # секунды импорта bot.py
+        self.phases = {}  # этап -> секунды
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    def summary(self) -> str:
+        """Этапы инициализации одной строкой для журнала"""
+        total = sum(self.phases.values())
+        return f"{total:.3f} с (" + ', '.join(f"{name} {seconds:.3f}" for name, seconds in self.phases.items()) + ")"
+
+
+def import_breakdown(module: str = 'bot', top: int = 10):
+    """Время импорта module по пакетам верхнего уровня: [(пакет, секунды)] по убыванию и общее время
+
+    Импорт выполняется в отдельном интерпретаторе с -X importtime из каталога
+    бота, поэтому учитываются все модули, даже уже загруженные в текущий процесс.
+    Если импорт не удался, RuntimeError с выводом интерпретатора.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(ROOT), os.environ.get('PYTHONPATH')])))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, env=env, cwd=ROOT
+    )
+    by_package = {}
+    total = 0
+    # Журнал бота пишется в stdout, трассировка ошибки - в stderr вместе со строками importtime
+    output = result.stdout.splitlines()
+    for line in result.stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match is None:
+            if not line.startswith('import time:'):
+                output.append(line)
+            continue
+        self_us, cumulative_us, name = match.groups()
+        package = name.split('.')[0]
+        by_package[package] = by_package.get(package, 0) + int(self_us) / 1e6
+        if name == module:
+            total = int(cumulative_us) / 1e6
+    if result.returncode != 0 or not total:
+        raise RuntimeError(f"импорт {module} завершился с кодом {result.returncode}:\n" + '\n'.join(output[-20:]))
+    ranked = sorted(by_package.items(), key=lambda item: item[1], reverse=True)
+    return ranked[:top], total
+
+
+# Единый экземпляр на процесс
+startup_timer = StartupTimer()
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import sys
+import time
+from collections import OrderedDict
+
+from config import STATE_TTL, STATE_MAX_SIZE, STATE_PERSIST
+from .storage import storage
+
+logger = logging.getLogger(__name__)
+
+
+class StateStore:
+    """Состояние диалога пользователя по ключу (chat_id, user_id)
+
+    Хранит в памяти только ожидаемый ввод (например, "subtract_calories") и время
+    истечения. Записи упорядочены по последнему обращению, поэтому вытеснение по
+    размеру (LRU) и по TTL снимает записи с головы за O(1). При persist=True
+    состояние дублируется в таблицу user_state и восстанавливается при запуске.
+    Обращение продлевает TTL; в базу продлённое время записывается не чаще раза
+    в половину TTL, поэтому после перезапуска диалог живёт не меньше ttl/2 от
+    последнего обращения.
+    """
+
+    def __init__(self, ttl: float = STATE_TTL, max_size: int = STATE_MAX_SIZE,
+                 persist: bool = STATE_PERSIST, clock=time.time):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.persist = persist
+        self.clock = clock
+        self.evictions = 0
+        self._entries = OrderedDict()  # (chat_id, user_id) -> (состояние, истекает, истекает в базе)
+        self._touches = set()  # задачи записи продлённого времени в базу
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, chat_id: int, user_id: int):
+        """Текущее состояние пользователя или None"""
+        key = (chat_id, user_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        now = self.clock()
+        if entry[1] <= now:
+            del self._entries[key]
+            return None
+        # Обращение продлевает TTL, поэтому порядок записей совпадает с порядком истечения
+        expires_at = now + self.ttl
+        saved = entry[2]
+        if self.persist and saved - now < self.ttl / 2:
+            saved = expires_at
+            task = asyncio.create_task(self._touch(chat_id, user_id, expires_at))
+            self._touches.add(task)
+            task.add_done_callback(self._touches.discard)
+        self._entries[key] = (entry[0], expires_at, saved)
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    async def _touch(self, chat_id: int, user_id: int, expires_at: float):
+        """Запись продлённого времени истечения; новое состояние или сброс не перезаписываются"""
+        try:
+            await storage.execute('''
+                UPDATE user_state SET expires_at = ?
+                WHERE chat_id = ? AND user_id = ? AND expires_at < ?
+            ''', (expires_at, chat_id, user_id, expires_at))
+        except Exception as e:
+            logger.warning("Не удалось продлить состояние диалога %s: %s", user_id, e)
+
+    async def set(self, chat_id: int, user_id: int, state: str):
+        """Установка состояния пользователя"""
+        key = (chat_id, user_id)
+        expires_at = self.clock() + self.ttl
+        self._entries[key] = (sys.intern(state), expires_at, expires_at)
+        self._entries.move_to_end(key)
+        self._evict()
+        if self.persist:
+            await storage.execute('''
+                INSERT INTO user_state (chat_id, user_id, state, expires_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (chat_id, user_id) DO UPDATE SET
+                    state = excluded.state, expires_at = excluded.expires_at
+            ''', (chat_id, user_id, state, expires_at))
+
+    async def clear(self, chat_id: int, user_id: int):
+        """Сброс состояния пользователя"""
+        existed = self._entries.pop((chat_id, user_id), None) is not None
+        if self.persist and existed:
+            await storage.execute(
+                'DELETE FROM user_state WHERE chat_id = ? AND user_id = ?',
+                (chat_id, user_id)
+            )
+
+    def _evict(self):
+        now = self.clock()
+        entries = self._entries
+        while entries:
+            key, (_, expires_at, _) = next(iter(entries.items()))
+            if len(entries) <= self.max_size and expires_at > now:
+                break
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def purge(self):
+        """Удаление истёкших записей из памяти"""
+        self._evict()
+
+    def collect(self):
+        """Значения для реестра метрик"""
+        return [
+            ('bot_states_entries', 'gauge', 'Диалогов с ожидаемым вводом в памяти', {(): len(self._entries)}),
+            ('bot_states_evictions_total', 'counter', 'Вытеснений состояний диалогов', {(): self.evictions}),
+        ]
+
+    async def load(self):
+        """Восстановление незавершённых диалогов из базы (при запуске)"""
+        if not self.persist:
+            return 0
+        now = self.clock()
+        await storage.execute('DELETE FROM user_state WHERE expires_at <= ?', (now,))
+        rows = await storage.fetchall('''
+            SELECT chat_id, user_id, state, expires_at
+            FROM user_state
+            WHERE expires_at > ?
+            ORDER BY expires_at
+        ''', (now,))
+        for chat_id, user_id, state, expires_at in rows:
+            self._entries[(chat_id, user_id)] = (sys.intern(state), expires_at, expires_at)
+        self._evict()
+        return len(rows)
+
+
+# Единый экземпляр на процесс
+states = StateStore()
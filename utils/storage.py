@@ -0,0 +1,303 @@
+import asyncio
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+import aiosqlite
+
+from config import (
+    DB_PATH, DB_READ_POOL_SIZE, DB_JOURNAL_MODE, DB_SYNCHRONOUS, DB_AUTO_VACUUM, DB_MMAP_SIZE,
+    DB_CACHE_SIZE, DB_BUSY_TIMEOUT, DB_GROUP_COMMIT_WINDOW, DB_GROUP_COMMIT_MAX,
+)
+from .metrics import DB_WAIT_SECONDS, DB_QUERY_SECONDS, DB_COMMIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+def _caller(frame) -> str:
+    """Имя вызывающей функции для метрик: модуль.функция"""
+    return f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_name}"
+
+
+class _Reader:
+    """Соединение читателя на время блока async with; ожидание пула и время блока попадают в метрики"""
+
+    __slots__ = ('storage', 'caller', 'conn', 'started')
+
+    def __init__(self, storage, caller: str):
+        self.storage = storage
+        self.caller = caller
+
+    async def __aenter__(self):
+        self.storage._check_started()
+        queued = time.perf_counter()
+        self.conn = await self.storage._pool.get()
+        self.started = time.perf_counter()
+        DB_WAIT_SECONDS.observe(self.started - queued, 'read')
+        return self.conn
+
+    async def __aexit__(self, *exc_info):
+        self.storage._pool.put_nowait(self.conn)
+        DB_QUERY_SECONDS.observe(time.perf_counter() - self.started, 'read', self.caller)
+
+
+class Storage:
+    """Общий менеджер подключений к базе: один писатель и пул читателей
+
+    Записи выполняются в фоновой задаче писателя. Задания, пришедшие в пределах
+    окна group_window, объединяются в одну транзакцию (group commit): каждое
+    задание выполняется в своей точке сохранения, а вызывающий получает
+    результат только после COMMIT всей пачки.
+
+    Ожидание соединения (пула читателей или очереди писателя) и время каждого
+    чтения и задания записи попадают в метрики по вызывающей функции.
+    """
+
+    def __init__(
+        self,
+        path: str = DB_PATH,
+        readers: int = DB_READ_POOL_SIZE,
+        journal_mode: str = DB_JOURNAL_MODE,
+        synchronous: str = DB_SYNCHRONOUS,
+        auto_vacuum: str = DB_AUTO_VACUUM,
+        mmap_size: int = DB_MMAP_SIZE,
+        cache_size: int = DB_CACHE_SIZE,
+        busy_timeout: int = DB_BUSY_TIMEOUT,
+        group_window: float = DB_GROUP_COMMIT_WINDOW,
+        group_max: int = DB_GROUP_COMMIT_MAX,
+    ):
+        self.path = path
+        self.readers = readers
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.auto_vacuum = auto_vacuum
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size
+        self.busy_timeout = busy_timeout
+        self.group_window = group_window
+        self.group_max = group_max
+        self.commits = 0
+        self.writes = 0
+        self._writer = None
+        self._writer_task = None
+        self._queue = None
+        self._pool = None
+        self._connections = []
+
+    @property
+    def started(self) -> bool:
+        return self._writer is not None
+
+    async def start(self, path: str = None):
+        """Открытие соединений (один раз при запуске бота)"""
+        if self.started:
+            return
+        if path:
+            self.path = path
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Примитивы asyncio создаём здесь, чтобы они были привязаны к циклу бота
+        self._queue = asyncio.Queue()
+        self._pool = asyncio.Queue()
+
+        # Транзакциями писателя управляем сами (BEGIN/COMMIT), поэтому autocommit
+        self._writer = await aiosqlite.connect(self.path, isolation_level=None)
+        # Режим очистки действует для новой базы; существующую переводит только vacuum()
+        await self._writer.execute(f'PRAGMA auto_vacuum = {self.auto_vacuum}')
+        await self._writer.execute(f'PRAGMA journal_mode = {self.journal_mode}')
+        await self._writer.execute(f'PRAGMA synchronous = {self.synchronous}')
+        await self._apply_pragmas(self._writer)
+
+        uri = f"{Path(self.path).resolve().as_uri()}?mode=ro"
+        for _ in range(max(1, self.readers)):
+            conn = await aiosqlite.connect(uri, uri=True)
+            await self._apply_pragmas(conn)
+            self._connections.append(conn)
+            self._pool.put_nowait(conn)
+
+        self._writer_task = asyncio.create_task(self._write_loop())
+
+    async def _apply_pragmas(self, conn):
+        await conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout)}')
+        await conn.execute(f'PRAGMA cache_size = {int(self.cache_size)}')
+        await conn.execute(f'PRAGMA mmap_size = {int(self.mmap_size)}')
+
+    async def close(self):
+        """Закрытие всех соединений (при остановке бота)"""
+        if not self.started:
+            return
+        # Дожидаемся записи всех уже поставленных заданий
+        self._queue.put_nowait(None)
+        await self._writer_task
+        self._writer_task = None
+        for conn in self._connections:
+            await conn.close()
+        self._connections = []
+        await self._writer.close()
+        self._writer = None
+
+    async def vacuum(self, auto_vacuum: str = None):
+        """Полный VACUUM на соединении писателя вне транзакции; auto_vacuum - новый режим очистки
+
+        Пересобирает файл базы целиком и блокирует запись до конца, поэтому
+        выполняется без работающего бота (python manage.py vacuum).
+        """
+        self._check_started()
+        if auto_vacuum:
+            await self._writer.execute(f'PRAGMA auto_vacuum = {auto_vacuum}')
+        await self._writer.execute('VACUUM')
+        # В режиме WAL новая копия базы сначала пишется в журнал; переносим её в файл сразу
+        await self._writer.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+    async def set_trace_callback(self, callback):
+        """callback(sql) для каждой выполненной команды на всех соединениях (None - отключить)
+
+        Вызывается из потоков соединений aiosqlite, а не из цикла событий.
+        """
+        self._check_started()
+        for conn in [self._writer, *self._connections]:
+            await conn.set_trace_callback(callback)
+
+    def collect(self):
+        """Значения для реестра метрик"""
+        return [
+            ('bot_db_commits_total', 'counter', 'Зафиксировано транзакций писателя', {(): self.commits}),
+            ('bot_db_writes_total', 'counter', 'Выполнено заданий записи', {(): self.writes}),
+            ('bot_db_write_queue', 'gauge', 'Заданий в очереди писателя', {(): self._queue.qsize() if self._queue else 0}),
+            ('bot_db_readers_idle', 'gauge', 'Свободных соединений читателей', {(): self._pool.qsize() if self._pool else 0}),
+        ]
+
+    def _check_started(self):
+        if not self.started:
+            raise RuntimeError("Хранилище не запущено: вызовите storage.start()")
+
+    def read(self):
+        """Соединение только для чтения из пула (async with)"""
+        return _Reader(self, _caller(sys._getframe(1)))
+
+    async def fetchone(self, sql: str, params=()):
+        """Выполнение запроса на чтение с одной строкой результата"""
+        async with _Reader(self, _caller(sys._getframe(1))) as db:
+            async with db.execute(sql, params) as cursor:
+                return await cursor.fetchone()
+
+    async def fetchall(self, sql: str, params=()):
+        """Выполнение запроса на чтение со всеми строками результата"""
+        async with _Reader(self, _caller(sys._getframe(1))) as db:
+            async with db.execute(sql, params) as cursor:
+                return await cursor.fetchall()
+
+    async def write(self, fn, durable: bool = False):
+        """Выполнение fn(db) на соединении писателя в транзакции
+
+        Возвращает результат fn после фиксации транзакции. С durable=True пачка,
+        в которую попало задание, фиксируется с synchronous=FULL.
+        fn не должна сама вызывать storage.write — это приведёт к взаимоблокировке.
+        """
+        return await self._submit(fn, durable, _caller(sys._getframe(1)))
+
+    async def _submit(self, fn, durable: bool, caller: str):
+        self._check_started()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((fn, durable, future, caller, time.perf_counter()))
+        return await future
+
+    async def execute(self, sql: str, params=(), durable: bool = False):
+        """Выполнение одного запроса на запись, возвращает число изменённых строк"""
+        async def run(db):
+            async with db.execute(sql, params) as cursor:
+                return cursor.rowcount
+        return await self._submit(run, durable, _caller(sys._getframe(1)))
+
+    async def executemany(self, sql: str, seq_of_params, durable: bool = False):
+        """Выполнение запроса на запись для набора параметров"""
+        async def run(db):
+            async with db.executemany(sql, seq_of_params) as cursor:
+                return cursor.rowcount
+        return await self._submit(run, durable, _caller(sys._getframe(1)))
+
+    async def _write_loop(self):
+        """Фоновая задача писателя: собирает задания в пачки и фиксирует их"""
+        stopping = False
+        while not stopping:
+            job = await self._queue.get()
+            if job is None:
+                break
+            batch = [job]
+            # Даём соседним записям несколько миллисекунд, чтобы попасть в ту же транзакцию
+            if self.group_window > 0 and len(batch) < self.group_max:
+                await asyncio.sleep(self.group_window)
+            while len(batch) < self.group_max and not self._queue.empty():
+                job = self._queue.get_nowait()
+                if job is None:
+                    stopping = True
+                    break
+                batch.append(job)
+            try:
+                await self._commit_batch(batch)
+            except Exception as e:
+                # Ошибка отката или восстановления synchronous не должна останавливать писателя:
+                # иначе все следующие storage.write ждали бы вечно
+                logger.error("Ошибка фиксации пачки записей: %s", e)
+                for _, _, future, _, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    async def _commit_batch(self, batch):
+        db = self._writer
+        batch = [job for job in batch if not job[2].cancelled()]
+        if not batch:
+            return
+        durable = any(job[1] for job in batch)
+        results = []
+        try:
+            if durable and self.synchronous.upper() != 'FULL':
+                await db.execute('PRAGMA synchronous = FULL')
+            await db.execute('BEGIN IMMEDIATE')
+            for fn, _, _, caller, queued_at in batch:
+                started = time.perf_counter()
+                DB_WAIT_SECONDS.observe(started - queued_at, 'write')
+                await db.execute('SAVEPOINT job')
+                try:
+                    result = await fn(db)
+                except Exception as e:
+                    # Ошибка одного задания не отменяет остальные в пачке
+                    await db.execute('ROLLBACK TO job')
+                    await db.execute('RELEASE job')
+                    results.append((False, e))
+                else:
+                    await db.execute('RELEASE job')
+                    results.append((True, result))
+                DB_QUERY_SECONDS.observe(time.perf_counter() - started, 'write', caller)
+            started = time.perf_counter()
+            await db.execute('COMMIT')
+            DB_COMMIT_SECONDS.observe(time.perf_counter() - started)
+        except Exception as e:
+            if db.in_transaction:
+                await db.execute('ROLLBACK')
+            for _, _, future, _, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            if durable and self.synchronous.upper() != 'FULL':
+                await db.execute(f'PRAGMA synchronous = {self.synchronous}')
+
+        self.commits += 1
+        self.writes += len(batch)
+        for (_, _, future, _, _), (ok, value) in zip(batch, results):
+            if future.done():
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+
+# Единый экземпляр на процесс
+storage = Storage()
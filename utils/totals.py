@@ -0,0 +1,174 @@
+from collections import OrderedDict
+
+from config import TOTALS_CACHE_SIZE
+from .storage import storage
+
+
+class TodayTotals:
+    """Итоги трекеров за сегодня по ключу (user_id, трекер): лимит и потреблено
+
+    Чтение из кэша не обращается к базе. Изменения (добавление, сброс, новый
+    лимит) применяются внутри заданий писателя, в том же порядке, что и записи.
+    При промахе итоги читает соединение из пула читателей, не становясь в
+    очередь писателя; чтобы такое заполнение не затёрло более свежее значение,
+    у ключа с идущими заполнениями есть поколение, которое увеличивается в
+    начале и в конце каждой записи и при удалении ключа. Заполнение сохраняется,
+    только если поколение не изменилось и запись по ключу сейчас не идёт.
+    Если транзакция не удалась, ключ удаляется из кэша. При смене дня
+    потреблённое обнуляется, лимит сохраняется. Размер ограничен max_size,
+    вытесняются давно не читанные.
+    """
+
+    def __init__(self, max_size: int = TOTALS_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale_fills = 0
+        self._entries = OrderedDict()  # (user_id, трекер) -> [день, лимит, потреблено]
+        self._fills = {}  # ключ с идущими заполнениями -> [поколение, заполнений]
+        self._writing = {}  # ключ -> записей в работе
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def lookup(self, user_id: int, tracker: str, day: str):
+        """Итоги за день из кэша ({'limit', 'left'}) или None при промахе"""
+        key = (user_id, tracker)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] != day:
+            # Новый день: записей за него ещё не было, лимит прежний
+            entry[0] = day
+            entry[2] = 0
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return {'limit': entry[1], 'left': max(0, entry[1] - entry[2])}
+
+    async def fill(self, user_id: int, tracker: str, day: str, read):
+        """Чтение итогов при промахе соединением читателя и сохранение, если их не обогнала запись
+
+        read(db) возвращает (лимит, потреблено) или None, если пользователя нет.
+        Возвращает {'limit', 'left'} или None.
+        """
+        key = (user_id, tracker)
+        fill = self._fills.setdefault(key, [0, 0])
+        fill[1] += 1
+        generation = fill[0]
+        try:
+            async with storage.read() as db:
+                loaded = await read(db)
+        finally:
+            fill[1] -= 1
+            if not fill[1]:
+                del self._fills[key]
+        if loaded is None:
+            return None
+        limit, consumed = loaded
+        if fill[0] == generation and key not in self._writing:
+            self.put(user_id, tracker, day, limit, consumed)
+        else:
+            # Запись началась или завершилась во время чтения: снимок мог её не увидеть
+            self.stale_fills += 1
+        return {'limit': limit, 'left': max(0, limit - consumed)}
+
+    def put(self, user_id: int, tracker: str, day: str, limit: int, consumed: int):
+        """Сохранение итогов в кэш"""
+        key = (user_id, tracker)
+        self._entries[key] = [day, limit, consumed]
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def apply(self, user_id: int, tracker: str, day: str = None, delta: int = None,
+              consumed: int = None, limit: int = None):
+        """Изменение итогов вслед за записью (вызывается внутри задания storage.write)"""
+        entry = self._entries.get((user_id, tracker))
+        if entry is None:
+            return
+        if day is not None and entry[0] != day:
+            # Запись за другой день, чем в кэше: проще перечитать
+            del self._entries[(user_id, tracker)]
+            return
+        if delta is not None:
+            entry[2] += delta
+        if consumed is not None:
+            entry[2] = consumed
+        if limit is not None:
+            entry[1] = limit
+
+    @staticmethod
+    def _keys(user_id: int, tracker: str = None):
+        return [(user_id, tracker)] if tracker else [(user_id, 'calories'), (user_id, 'water')]
+
+    def _bump(self, keys):
+        """Новое поколение ключей: идущие по ним заполнения не будут сохранены"""
+        for key in keys:
+            fill = self._fills.get(key)
+            if fill is not None:
+                fill[0] += 1
+
+    def invalidate(self, user_id: int = None, tracker: str = None):
+        """Удаление итогов пользователя (одного трекера или всех), без аргументов - всего кэша"""
+        if user_id is None:
+            self._entries.clear()
+            self._bump(list(self._fills))
+            return
+        keys = self._keys(user_id, tracker)
+        for key in keys:
+            self._entries.pop(key, None)
+        self._bump(keys)
+
+    async def write(self, user_id: int, tracker: str, fn):
+        """storage.write с удалением итогов из кэша, если транзакция не удалась
+
+        На время записи (tracker=None - обоих трекеров) заполнения из читателя не сохраняются.
+        """
+        keys = self._keys(user_id, tracker)
+        for key in keys:
+            self._writing[key] = self._writing.get(key, 0) + 1
+        self._bump(keys)
+        try:
+            return await storage.write(fn)
+        except BaseException:
+            self.invalidate(user_id, tracker)
+            raise
+        finally:
+            for key in keys:
+                self._writing[key] -= 1
+                if not self._writing[key]:
+                    del self._writing[key]
+            self._bump(keys)
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hit_rate, 4),
+            'evictions': self.evictions,
+            'stale_fills': self.stale_fills,
+        }
+
+    def collect(self):
+        """Значения для реестра метрик"""
+        return [
+            ('bot_totals_cache_hits_total', 'counter', 'Попаданий в кэш итогов за сегодня', {(): self.hits}),
+            ('bot_totals_cache_misses_total', 'counter', 'Промахов кэша итогов за сегодня', {(): self.misses}),
+            ('bot_totals_cache_evictions_total', 'counter', 'Вытеснений из кэша итогов', {(): self.evictions}),
+            ('bot_totals_cache_stale_fills_total', 'counter', 'Заполнений кэша итогов, отброшенных из-за записи',
+             {(): self.stale_fills}),
+            ('bot_totals_cache_entries', 'gauge', 'Записей в кэше итогов', {(): len(self._entries)}),
+        ]
+
+
+# Единый экземпляр на процесс
+totals = TodayTotals()
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+from aiogram import BaseMiddleware
+
+from config import UPDATE_CONCURRENCY, UPDATE_DRAIN_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+
+class UserQueue(BaseMiddleware):
+    """Параллельная обработка апдейтов разных пользователей с порядком внутри пользователя
+
+    Подключается как внешний middleware апдейтов диспетчера. Апдейты одного
+    пользователя встают в его очередь (FIFO-замок) и обрабатываются строго по
+    одному в порядке поступления, поэтому ввод числа после нажатия кнопки
+    видит установленное ею состояние, а записи трекеров применяются по порядку.
+    Апдейты разных пользователей идут параллельно, но одновременно
+    обрабатывается не больше concurrency апдейтов; место занимается только
+    когда подошла очередь пользователя. Очереди без апдейтов удаляются.
+    Задачи апдейтов, прошедших через middleware, запоминаются, чтобы при
+    остановке дождаться их до закрытия базы.
+    """
+
+    def __init__(self, concurrency: int = UPDATE_CONCURRENCY, clock=time.monotonic):
+        self.concurrency = concurrency
+        self.clock = clock
+        self.processed = 0
+        self.active = 0
+        self.max_active = 0
+        self.max_depth = 0
+        self._semaphore = None
+        self._tasks = set()  # задачи апдейтов в очереди или в обработке
+        self._queues = {}  # ключ пользователя -> [замок, апдейтов в очереди вместе с обрабатываемым]
+        self._wait = deque(maxlen=1000)
+        self._latency = deque(maxlen=1000)
+
+    async def start(self):
+        """Включение ограничения; до запуска апдейты проходят без очередей"""
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    async def stop(self, timeout: float = UPDATE_DRAIN_TIMEOUT):
+        """Ожидание апдейтов в очереди и в обработке (не дольше timeout), затем отключение ограничения
+
+        Диспетчер в режиме handle_as_tasks не ждёт задачи апдейтов при остановке,
+        поэтому их дожидаемся здесь - до закрытия базы.
+        """
+        await self.drain(timeout)
+        self._semaphore = None
+
+    @property
+    def in_flight(self) -> int:
+        """Апдейтов в очереди и в обработке"""
+        return len(self._tasks)
+
+    async def drain(self, timeout: float = UPDATE_DRAIN_TIMEOUT):
+        """Ожидание апдейтов в очереди и в обработке, не дольше timeout; возвращает, сколько не дождались"""
+        pending = self._tasks - {asyncio.current_task()}
+        if not pending:
+            return 0
+        logger.info("Ожидание обработки апдейтов: %s", len(pending))
+        _, not_done = await asyncio.wait(pending, timeout=timeout)
+        if not_done:
+            logger.warning("Не обработано апдейтов к остановке: %s", len(not_done))
+        return len(not_done)
+
+    @staticmethod
+    def _key(data):
+        user = data.get('event_from_user')
+        if user is not None:
+            return user.id
+        chat = data.get('event_chat')
+        return chat.id if chat is not None else None
+
+    async def __call__(self, handler, event, data):
+        semaphore = self._semaphore
+        if semaphore is None:
+            return await handler(event, data)
+
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        try:
+            return await self._enqueue(handler, event, data, semaphore)
+        finally:
+            self._tasks.discard(task)
+
+    async def _enqueue(self, handler, event, data, semaphore):
+        key = self._key(data)
+        queued_at = self.clock()
+        if key is None:
+            async with semaphore:
+                return await self._handle(handler, event, data, queued_at)
+
+        entry = self._queues.get(key)
+        if entry is None:
+            entry = self._queues[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        self.max_depth = max(self.max_depth, entry[1])
+        try:
+            async with entry[0]:
+                async with semaphore:
+                    return await self._handle(handler, event, data, queued_at)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._queues[key]
+
+    async def _handle(self, handler, event, data, queued_at):
+        started = self.clock()
+        self._wait.append(started - queued_at)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            return await handler(event, data)
+        finally:
+            self.active -= 1
+            self.processed += 1
+            self._latency.append(self.clock() - started)
+
+    def stats(self) -> dict:
+        """Обработано апдейтов, пики параллельности и очереди, ожидание и обработка (p50/p99, секунды)"""
+        def percentile(values, q):
+            if not values:
+                return 0.0
+            values = sorted(values)
+            return values[min(len(values) - 1, int(len(values) * q))]
+
+        return {
+            'processed': self.processed,
+            'active': self.active,
+            'max_active': self.max_active,
+            'users_queued': len(self._queues),
+            'max_depth': self.max_depth,
+            'wait_p50': percentile(self._wait, 0.5),
+            'wait_p99': percentile(self._wait, 0.99),
+            'latency_p50': percentile(self._latency, 0.5),
+            'latency_p99': percentile(self._latency, 0.99),
+        }
+
+    def collect(self):
+        """Значения для реестра метрик"""
+        return [
+            ('bot_updates_processed_total', 'counter', 'Обработано апдейтов', {(): self.processed}),
+            ('bot_updates_active', 'gauge', 'Апдейтов в обработке', {(): self.active}),
+            ('bot_updates_users_queued', 'gauge', 'Пользователей с апдейтами в очереди', {(): len(self._queues)}),
+        ]
+
+
+# Единый экземпляр на процесс
+user_queue = UserQueue()
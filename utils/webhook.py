@@ -0,0 +1,67 @@
+import logging
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+
+from config import WEBHOOK_DRAIN_TIMEOUT
+from .metrics import metrics
+from .user_queue import user_queue
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PATH = '/health'
+
+
+def create_app(dispatcher: Dispatcher, bot: Bot, path: str, secret_token: str, url: str = None,
+               background: bool = True, drain_timeout: float = WEBHOOK_DRAIN_TIMEOUT,
+               updates=user_queue) -> web.Application:
+    """Приложение aiohttp для приёма апдейтов по webhook
+
+    Запросы без заголовка X-Telegram-Bot-Api-Secret-Token с secret_token
+    отклоняются с 401. При background=True апдейт подтверждается сразу, а
+    обрабатывается в отдельной задаче, поэтому Telegram не ждёт обработчиков.
+    При запуске выполняется startup диспетчера и, если передан url, setWebhook;
+    при остановке приложение дожидается принятых апдейтов (не дольше
+    drain_timeout), затем выполняет shutdown диспетчера и закрывает сессию бота.
+    Принятые апдейты считает updates - middleware очередей апдейтов диспетчера.
+    GET /health отвечает 200, пока бот принимает апдейты, и 503 до запуска и во время остановки.
+    GET metrics.path (по умолчанию /metrics) отдаёт метрики в формате Prometheus, только если
+    задан METRICS_TOKEN: порт webhook публичный, поэтому без токена выгрузки нет.
+    """
+    app = web.Application()
+    handler = SimpleRequestHandler(dispatcher, bot, handle_in_background=background, secret_token=secret_token)
+    # Готовность меняется после запуска приложения, поэтому хранится не в app
+    state = {'ready': False}
+
+    async def health(request: web.Request) -> web.Response:
+        return web.json_response(
+            {'status': 'ok' if state['ready'] else 'starting', 'in_flight': updates.in_flight},
+            status=200 if state['ready'] else 503
+        )
+
+    async def on_startup(app: web.Application):
+        await dispatcher.emit_startup(bot=bot)
+        if url:
+            await bot.set_webhook(
+                url.rstrip('/') + path,
+                secret_token=secret_token,
+                allowed_updates=dispatcher.resolve_used_update_types()
+            )
+            logger.info("Webhook установлен: %s%s", url.rstrip('/'), path)
+        state['ready'] = True
+
+    async def on_shutdown(app: web.Application):
+        state['ready'] = False
+        # Апдейты, уже подтверждённые Telegram, повторно не придут: обрабатываем их до закрытия базы
+        await updates.drain(drain_timeout)
+        await dispatcher.emit_shutdown(bot=bot)
+        await bot.session.close()
+
+    app.router.add_post(path, handler.handle)
+    app.router.add_get(HEALTH_PATH, health)
+    if metrics.path and metrics.token:
+        app.router.add_get(metrics.path, metrics.handle)
+    app.on_startup.append(on_startup)
+    app.on_shutdown.append(on_shutdown)
+    return app
@@ -1,33 +1,23 @@
-import aiosqlite
 from datetime import datetime
-from .database import DB_PATH
-
-async def init_db():
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS weight (
-                date TEXT PRIMARY KEY,
-                value REAL
-            )
-        ''')
-        await db.commit()
+from . import history, rollups
+from .storage import storage
 
 async def add_weight(user_id: int, weight: float):
     """Добавление веса"""
     today = datetime.now().strftime('%Y-%m-%d')
-    async with aiosqlite.connect(DB_PATH) as db:
+    async def update(db):
         # Проверяем существование записи
         async with db.execute('''
-            SELECT id FROM weight 
+            SELECT id FROM weight
             WHERE user_id = ? AND date = ?
         ''', (user_id, today)) as cursor:
             exists = await cursor.fetchone()
-            
+
             if exists:
                 # Обновляем существующую запись
                 await db.execute('''
-                    UPDATE weight 
-                    SET weight = ? 
+                    UPDATE weight
+                    SET weight = ?
                     WHERE user_id = ? AND date = ?
                 ''', (weight, user_id, today))
             else:
@@ -36,38 +26,35 @@ async def add_weight(user_id: int, weight: float):
                     INSERT INTO weight (user_id, date, weight)
                     VALUES (?, ?, ?)
                 ''', (user_id, today, weight))
-        
-        await db.commit()
+
+        # Обновляем статистику в той же транзакции
+        await rollups.set_weight(db, user_id, today, weight)
+
+    await storage.write(update)
 
 async def get_today(user_id: int):
     """Получение веса за сегодня"""
     today = datetime.now().strftime('%Y-%m-%d')
-    async with aiosqlite.connect(DB_PATH) as db:
-        async with db.execute('''
-            SELECT weight 
-            FROM weight 
-            WHERE user_id = ? AND date = ?
-        ''', (user_id, today)) as cursor:
-            row = await cursor.fetchone()
-            return row[0] if row else None
+    row = await storage.fetchone('''
+        SELECT weight
+        FROM weight
+        WHERE user_id = ? AND date = ?
+    ''', (user_id, today))
+    return row[0] if row else None
 
 async def get_history(user_id: int, days: int = 14):
-    """Получение истории веса"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        async with db.execute('''
-            SELECT date, weight
-            FROM weight
-            WHERE user_id = ? AND date >= date('now', ? || ' days')
-            ORDER BY date DESC
-        ''', (user_id, f'-{days}')) as cursor:
-            return await cursor.fetchall()
+    """Получение истории веса: (дата, вес) от новых к старым"""
+    return [(day['start'], day['weight']) for day in await history.get_series(user_id, days) if day['weight'] is not None]
 
 async def reset_weight(user_id: int):
     """Сброс веса за сегодня"""
     today = datetime.now().strftime('%Y-%m-%d')
-    async with aiosqlite.connect(DB_PATH) as db:
+    async def reset(db):
         await db.execute('''
-            DELETE FROM weight 
+            DELETE FROM weight
             WHERE user_id = ? AND date = ?
         ''', (user_id, today))
-        await db.commit() 
\ No newline at end of file
+        # Обновляем статистику в той же транзакции
+        await rollups.set_weight(db, user_id, today, None)
+
+    await storage.write(reset)